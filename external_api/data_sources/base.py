@@ -10,7 +10,7 @@ from typing import Any, Dict, List
 import os
 
 
-EXCLUDE_METHODS = ['get_capabilities', 'get_api_info', 'source_name', 'get_source_info']
+EXCLUDE_METHODS = ['get_capabilities', 'get_api_info', 'source_name', 'get_source_info', 'aclose']
 
 class BaseAPI(ABC):
     """
@@ -3,16 +3,89 @@ Booking.com flight search data source implementation
 """
 
 import asyncio
+import copy
+import json
 import logging
-from datetime import datetime
-from typing import Any, Dict, Optional
+import os
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 
 import aiohttp
 
 from .base import BaseAPI
+from .json_stream import JsonArrayStream
+from .local_cache import TtlCache
 
 logger = logging.getLogger("booking_source")
 
+# 目的地ID几乎不会变化，缓存30天
+DESTINATION_CACHE_TTL = 30 * 86400
+# 机票价格变化快，价格矩阵的单元格只缓存15分钟
+FLIGHT_PRICE_CACHE_TTL = 15 * 60
+# 价格矩阵单次最多搜索的日期组合数
+MAX_PRICE_MATRIX_CELLS = 400
+
+# 流式读取机票响应的分块大小
+FLIGHT_STREAM_CHUNK_SIZE = 64 * 1024
+
+# 酒店详情（按酒店、日期与入住人数）缓存1小时
+HOTEL_DETAIL_CACHE_TTL = 3600
+# 解析酒店详情的线程池大小
+PARSE_WORKERS = 4
+
+# 多页酒店合并后本地重排使用的排序键；bayesian_review_score 的排序键依赖合并后的全部酒店，见 bayesian_review_sort_key；
+# 未列出的排序方式（如 distance、popularity）保留上游顺序
+HOTEL_SORT_KEYS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "price": lambda h: (h["price"]["amount"] is None, h["price"]["amount"] or 0),
+    "class_descending": lambda h: (h["rating"] is None, -(h["rating"] or 0)),
+    "class_ascending": lambda h: (h["rating"] is None, h["rating"] or 0),
+}
+
+
+_parse_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_parse_executor() -> ThreadPoolExecutor:
+    """Get the worker pool shared by all BookingSource instances for parsing large payloads"""
+    global _parse_executor
+    if _parse_executor is None:
+        _parse_executor = ThreadPoolExecutor(max_workers=PARSE_WORKERS, thread_name_prefix="booking-parse")
+    return _parse_executor
+
+
+def bayesian_review_sort_key(hotels: List[Dict[str, Any]]) -> Callable[[Dict[str, Any]], Any]:
+    """Build a sort key ranking hotels by their Bayesian average review score, best first
+
+    Each score is shrunk towards the review-weighted mean score m of hotels, weighted by the mean review count C:
+    (C * m + score * n) / (C + n) for a hotel with n reviews, so a 10.0 from one review does not outrank a 9.2 from
+    thousands. Hotels without a review score are placed last.
+    """
+    rated = [(h["review_score"], h["review_count"] or 0) for h in hotels if h["review_score"] is not None]
+    total_reviews = sum(count for _, count in rated)
+    if not total_reviews:
+        return lambda h: (h["review_score"] is None, -(h["review_score"] or 0))
+    prior_score = sum(score * count for score, count in rated) / total_reviews
+    prior_weight = total_reviews / len(rated)
+
+    def _key(hotel: Dict[str, Any]) -> Any:
+        if hotel["review_score"] is None:
+            return (True, 0)
+        count = hotel["review_count"] or 0
+        return (False, -(prior_weight * prior_score + hotel["review_score"] * count) / (prior_weight + count))
+
+    return _key
+
+
+def normalize_destination_name(name: str) -> str:
+    """Normalize a destination name into a cache key: case, accents, punctuation and whitespace are ignored"""
+    decomposed = unicodedata.normalize("NFKD", name)
+    without_accents = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^\w]+", " ", without_accents.casefold()).split())
+
 
 class BookingSource(BaseAPI):
     """Booking.com data source"""
@@ -29,6 +102,12 @@ class BookingSource(BaseAPI):
             "X-Biz-Id": "matrix-agent",
             "X-Request-Timeout": str(config["timeout"] - 5),
         }
+        # 目的地名称到目的地信息的缓存，配置了 cache_dir 时持久化
+        destinations_path = os.path.join(config["cache_dir"], "booking_destinations.json") if config.get("cache_dir") else None
+        self.destination_cache = TtlCache(ttl=DESTINATION_CACHE_TTL, max_entries=10000, path=destinations_path)
+        self._pending_destinations: Dict[str, asyncio.Future] = {}
+        self.flight_price_cache = TtlCache(ttl=FLIGHT_PRICE_CACHE_TTL, max_entries=5000)
+        self.hotel_detail_cache = TtlCache(ttl=HOTEL_DETAIL_CACHE_TTL, max_entries=2000)
 
     @property
     def source_name(self) -> str:
@@ -135,104 +214,458 @@ class BookingSource(BaseAPI):
         #     ...     print(f"Search successful")
         # """
         try:
-            # Build request parameters
-            params = {
-                "fromId": f"{from_code}.AIRPORT",
-                "toId": f"{to_code}.AIRPORT",
-                "departDate": depart_date,
-                "stops": stops,
-                "pageNo": page_no,
-                "adults": adults,
-                "sort": sort,
-                "cabinClass": cabin_class,
-                "currency_code": currency_code,
-            }
-
-            # Add optional parameters
-            if return_date:
-                params["returnDate"] = return_date
-            if children:
-                params["children"] = children
-
-            request_url = f"{self.proxy_url}/api/v1/flights/searchFlights"
+            params = self._build_flight_params(
+                from_code, to_code, depart_date, return_date, stops, page_no, adults, children, sort, cabin_class, currency_code
+            )
 
             logger.info("Starting flight search")
 
             # Send request
-            try:
-                async with aiohttp.ClientSession(trust_env=True) as session:
-                    async with session.get(request_url, headers=self.headers, params=params, timeout=self._timeout) as response:
-                        # Check response status
-                        response.raise_for_status()
-                        data = await response.json()
-
-            except asyncio.TimeoutError:
-                error_msg = f"Request timeout (timeout={self._timeout}s)"
-                logger.error(error_msg)
-                return {"success": False, "error": error_msg}
-            except aiohttp.ClientError as e:
-                error_msg = f"Request failed: {str(e)}"
-                logger.error(error_msg)
-                return {"success": False, "error": error_msg}
-
-            # Check if API response has error
-            if not data.get("status"):
-                error_msg = data.get("message", "Unknown error")
-                logger.error(f"API returned error: {error_msg}")
-                return {"success": False, "error": error_msg}
+            async with aiohttp.ClientSession(trust_env=True) as session:
+                offers_result = await self._fetch_flight_offers(session, params)
+            if not offers_result["success"]:
+                return offers_result
 
             # 检查是否存在错误
-            if not data.get("data", {}).get("flightOffers"):
+            if not offers_result["data"]:
                 logger.error("No flight offers found")
                 return {"success": True, "data": {"flights": []}}
 
             # Simplify response data structure
-            simplified_flights = []
-            for offer in data["data"]["flightOffers"]:
-                legs_info = []
-                stops_count = 0
-
-                total_time = 0
-                for segment in offer["segments"]:
-                    # Get flight number and stop info
-                    for leg in segment["legs"]:
-                        flight_number = f"{leg['flightInfo']['carrierInfo']['marketingCarrier']}{leg['flightInfo']['flightNumber']}"
-                        # Count stops
-                        stops_count += len(leg.get("flightStops", []))
-
-                        # Add segment info
-                        legs_info.append(
+            simplified_flights = [self._simplify_flight_offer(offer) for offer in offers_result["data"]]
+
+            return {"success": True, "data": {"flights": simplified_flights}}
+
+        except Exception as e:
+            error_msg = f"Error occurred while searching flights: {str(e)}"
+            logger.error(error_msg)
+            logger.exception(e)
+            return {"success": False, "error": error_msg}
+
+    async def search_top_flights(
+        self,
+        from_code: str,
+        to_code: str,
+        depart_date: str,
+        return_date: Optional[str] = None,
+        top_k: int = 10,
+        by: str = "price",
+        stops: str = "none",
+        adults: int = 1,
+        children: Optional[str] = None,
+        cabin_class: str = "ECONOMY",
+        currency_code: str = "USD",
+    ) -> Dict[str, Any]:
+        """
+        Search for the top_k cheapest or fastest flights
+
+        The response is parsed while it downloads and only the best top_k offers are kept. Since results are requested
+        sorted by the same criterion, the download stops as soon as top_k offers have arrived.
+
+        Args:
+            from_code(str): Departure airport code, e.g.: PEK
+            to_code(str): Destination airport code, e.g.: CAN
+            depart_date(str): Departure date, format: YYYY-MM-DD
+            return_date(Optional[str]): Return date, format: YYYY-MM-DD (optional)
+            top_k(int): Number of flights to return, default is 10
+            by(str): Ranking criterion, options: price (cheapest first), duration (fastest first)
+            stops(str): Number of stops, options: none, 0, 1, 2
+            adults(int): Number of adults, default is 1
+            children(Optional[str]): Children's ages, comma separated, e.g.: 0,17 (optional)
+            cabin_class(str): Cabin class, options: ECONOMY, PREMIUM_ECONOMY, BUSINESS, FIRST
+            currency_code(str): Currency code, default USD
+
+        Returns:
+            Dict[str, Any]: Dictionary containing flight search results, e.g.
+            {
+                "success": True,                   # Whether successful
+                "data": {
+                    "flights": [...],              # Best flights first, same fields as search_flights
+                    "scanned": 10                  # Number of offers parsed from the response
+                }
+            }
+        """
+        if by not in ("price", "duration"):
+            return {"success": False, "error": f"Unsupported ranking criterion: {by}, options: price, duration"}
+
+        try:
+            sort = "CHEAPEST" if by == "price" else "FASTEST"
+            # 上游已按同一标准排序，前 top_k 条即为结果；本地再按同一键做稳定排序，防止上游顺序不严格
+            ranked = []
+            async for offer in self._iter_raw_flight_offers(
+                self._build_flight_params(from_code, to_code, depart_date, return_date, stops, 1, adults, children, sort, cabin_class, currency_code),
+                limit=top_k,
+            ):
+                if by == "price":
+                    price = offer["priceBreakdown"]["total"]
+                    rank = float(price["units"]) + float(price["nanos"]) / 1_000_000_000
+                else:
+                    rank = sum(leg["totalTime"] for segment in offer["segments"] for leg in segment["legs"])
+                ranked.append((rank, len(ranked), self._simplify_flight_offer(offer)))
+
+            ranked.sort(key=lambda item: item[:2])
+            best = [flight for _, _, flight in ranked]
+            return {"success": True, "data": {"flights": best, "scanned": len(best)}}
+
+        except asyncio.TimeoutError:
+            error_msg = f"Request timeout (timeout={self._timeout}s)"
+            logger.error(error_msg)
+            return {"success": False, "error": error_msg}
+        except aiohttp.ClientError as e:
+            error_msg = f"Request failed: {str(e)}"
+            logger.error(error_msg)
+            return {"success": False, "error": error_msg}
+        except ValueError as e:
+            # API 返回的错误信息，已在流式解析中记录
+            return {"success": False, "error": str(e)}
+        except Exception as e:
+            error_msg = f"Error occurred while searching flights: {str(e)}"
+            logger.error(error_msg)
+            logger.exception(e)
+            return {"success": False, "error": error_msg}
+
+    async def iter_flight_offers(
+        self,
+        from_code: str,
+        to_code: str,
+        depart_date: str,
+        return_date: Optional[str] = None,
+        stops: str = "none",
+        page_no: int = 1,
+        adults: int = 1,
+        children: Optional[str] = None,
+        sort: str = "BEST",
+        cabin_class: str = "ECONOMY",
+        currency_code: str = "USD",
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream simplified flight offers while the response is still downloading
+
+        Offers have the same fields as search_flights and are yielded as soon as each one has been received, so the
+        whole response is never held in memory. The download stops once limit offers were yielded or the consumer
+        stops. Raises ValueError when the API returns an error, other arguments are the same as search_flights.
+        """
+        params = self._build_flight_params(
+            from_code, to_code, depart_date, return_date, stops, page_no, adults, children, sort, cabin_class, currency_code
+        )
+        async for offer in self._iter_raw_flight_offers(params, limit=limit):
+            yield self._simplify_flight_offer(offer)
+
+    async def _iter_raw_flight_offers(self, params: Dict[str, Any], limit: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the raw flightOffers items of a flight search response as they are downloaded"""
+        request_url = f"{self.proxy_url}/api/v1/flights/searchFlights"
+        stream = JsonArrayStream("flightOffers")
+        yielded = 0
+
+        logger.info("Starting streamed flight search")
+
+        async with aiohttp.ClientSession(trust_env=True) as session:
+            async with session.get(request_url, headers=self.headers, params=params, timeout=self._timeout) as response:
+                response.raise_for_status()
+                async for chunk in response.content.iter_chunked(FLIGHT_STREAM_CHUNK_SIZE):
+                    for offer in stream.feed(chunk):
+                        yield offer
+                        yielded += 1
+                        if limit is not None and yielded >= limit:
+                            return
+                    if stream.done:
+                        # 数组已结束，剩余内容无需下载
+                        return
+
+        document = stream.finish()
+        if document is not None and not document.get("status"):
+            error_msg = document.get("message", "Unknown error")
+            logger.error(f"API returned error: {error_msg}")
+            raise ValueError(error_msg)
+
+    async def search_flight_price_matrix(
+        self,
+        from_code: str,
+        to_code: str,
+        depart_start: str,
+        depart_end: str,
+        return_start: Optional[str] = None,
+        return_end: Optional[str] = None,
+        min_stay: int = 0,
+        max_stay: Optional[int] = None,
+        stops: str = "none",
+        adults: int = 1,
+        children: Optional[str] = None,
+        cabin_class: str = "ECONOMY",
+        currency_code: str = "USD",
+        max_concurrency: int = 4,
+        requests_per_second: float = 4.0,
+    ) -> Dict[str, Any]:
+        """
+        Search the cheapest flight price of every departure/return date combination in date ranges, as a calendar grid
+
+        Date pairs whose return is before the departure, or whose stay is outside [min_stay, max_stay] days, are skipped.
+        Each date pair is searched concurrently within the rate limits and only its price summary is kept; recently
+        searched date pairs are served from cache.
+
+        Args:
+            from_code(str): Departure airport code, e.g.: PEK
+            to_code(str): Destination airport code, e.g.: CAN
+            depart_start(str): First departure date, format: YYYY-MM-DD
+            depart_end(str): Last departure date, format: YYYY-MM-DD
+            return_start(Optional[str]): First return date, format: YYYY-MM-DD, omit both return dates for one-way flights
+            return_end(Optional[str]): Last return date, format: YYYY-MM-DD
+            min_stay(int): Minimum number of days between departure and return, default is 0
+            max_stay(Optional[int]): Maximum number of days between departure and return, optional
+            stops(str): Number of stops, options: none, 0, 1, 2
+            adults(int): Number of adults, default is 1
+            children(Optional[str]): Children's ages, comma separated, e.g.: 0,17 (optional)
+            cabin_class(str): Cabin class, options: ECONOMY, PREMIUM_ECONOMY, BUSINESS, FIRST
+            currency_code(str): Currency code, default USD
+            max_concurrency(int): Maximum number of concurrent searches, default is 4
+            requests_per_second(float): Maximum number of searches started per second, default is 4
+
+        Returns:
+            Dict[str, Any]: Dictionary containing the price matrix, e.g.
+            {
+                "success": True,                   # Whether successful
+                "data": {
+                    "depart_dates": ["2025-04-19", "2025-04-20"],  # Grid rows
+                    "return_dates": ["2025-04-26", "2025-04-27"],  # Grid columns, null for one-way flights
+                    "grid": [                      # grid[row][column], null for skipped or failed date pairs
+                        [
                             {
-                                "flight_number": flight_number,
-                                "from": leg["departureAirport"]["code"],
-                                "to": leg["arrivalAirport"]["code"],
-                                "departure": leg["departureTime"],
-                                "arrival": leg["arrivalTime"],
-                                "total_time": self._format_duration(leg["totalTime"]),  # Segment flight time
-                            }
-                        )
-                        total_time += leg["totalTime"]
-                # Handle price
-                price = offer["priceBreakdown"]["total"]
-                total_amount = float(price["units"]) + float(price["nanos"]) / 1_000_000_000
+                                "min_price": 1423.5,       # Cheapest total price
+                                "currency": "USD",         # Currency
+                                "offers": 12,              # Number of offers found
+                                "stops": 0,                # Stops of the cheapest offer
+                                "total_time": "6 hours 5 minutes"  # Flight time of the cheapest offer
+                            },
+                            null
+                        ]
+                    ],
+                    "cheapest": {"depart_date": "2025-04-19", "return_date": "2025-04-26", "min_price": 1423.5, ...},
+                    "failed_cells": [              # Date pairs whose search failed
+                        {"depart_date": "2025-04-20", "return_date": "2025-04-27", "error": "..."}
+                    ],
+                    "stats": {"cells": 4, "pruned": 1, "cached": 0, "fetched": 3}
+                }
+            }
+        """
+        if requests_per_second <= 0:
+            return {"success": False, "error": f"requests_per_second must be positive, got {requests_per_second}"}
+        if max_concurrency < 1:
+            return {"success": False, "error": f"max_concurrency must be at least 1, got {max_concurrency}"}
 
-                simplified_flights.append(
-                    {
-                        "stops": stops_count,
-                        "segments": legs_info,
-                        "total_time": self._format_duration(total_time),
-                        "price": {"currency": price["currencyCode"], "amount": total_amount},
-                    }
+        try:
+            depart_dates = self._date_range(depart_start, depart_end)
+            if (return_start is None) != (return_end is None):
+                return {"success": False, "error": "return_start and return_end must be given together"}
+            return_dates = self._date_range(return_start, return_end) if return_start and return_end else None
+
+            # 剪枝：返程早于出发或停留天数不符合要求的组合不发请求
+            cells = []
+            pruned = 0
+            for row, depart_date in enumerate(depart_dates):
+                for column, return_date in enumerate(return_dates or [None]):
+                    if return_date is not None:
+                        stay = (datetime.strptime(return_date, "%Y-%m-%d") - datetime.strptime(depart_date, "%Y-%m-%d")).days
+                        if stay < min_stay or (max_stay is not None and stay > max_stay):
+                            pruned += 1
+                            continue
+                    cells.append((row, column, depart_date, return_date))
+
+            if len(cells) > MAX_PRICE_MATRIX_CELLS:
+                return {"success": False, "error": f"Too many date combinations ({len(cells)}), at most {MAX_PRICE_MATRIX_CELLS} are allowed"}
+
+            semaphore = asyncio.Semaphore(max_concurrency)
+            pacing = {"next_start": 0.0}
+            counters = {"cached": 0, "fetched": 0}
+
+            async def _search_cell(session: aiohttp.ClientSession, depart_date: str, return_date: Optional[str]) -> Dict[str, Any]:
+                params = self._build_flight_params(
+                    from_code, to_code, depart_date, return_date, stops, 1, adults, children, "CHEAPEST", cabin_class, currency_code
+                )
+                cache_key = json.dumps(params, sort_keys=True)
+                cached = self.flight_price_cache.get(cache_key)
+                if cached is not None:
+                    counters["cached"] += 1
+                    # 返回副本，避免调用方修改网格时改动缓存
+                    return {"success": True, "data": copy.deepcopy(cached)}
+
+                async with semaphore:
+                    # 按 requests_per_second 均匀错开请求的发起时间
+                    loop = asyncio.get_running_loop()
+                    start_at = max(loop.time(), pacing["next_start"])
+                    pacing["next_start"] = start_at + 1 / requests_per_second
+                    await asyncio.sleep(start_at - loop.time())
+                    offers_result = await self._fetch_flight_offers(session, params)
+                if not offers_result["success"]:
+                    return offers_result
+
+                counters["fetched"] += 1
+                summary = self._summarize_flight_offers(offers_result["data"])
+                self.flight_price_cache.set(cache_key, copy.deepcopy(summary))
+                return {"success": True, "data": summary}
+
+            async with aiohttp.ClientSession(trust_env=True) as session:
+                results = await asyncio.gather(*[_search_cell(session, d, r) for _, _, d, r in cells])
+
+            grid: List[List[Optional[Dict[str, Any]]]] = [[None] * len(return_dates or [None]) for _ in depart_dates]
+            failed_cells = []
+            cheapest = None
+            for (row, column, depart_date, return_date), result in zip(cells, results):
+                if not result["success"]:
+                    failed_cells.append({"depart_date": depart_date, "return_date": return_date, "error": result["error"]})
+                    continue
+                grid[row][column] = result["data"]
+                if result["data"]["min_price"] is not None and (cheapest is None or result["data"]["min_price"] < cheapest["min_price"]):
+                    cheapest = {"depart_date": depart_date, "return_date": return_date, **result["data"]}
+
+            if cells and len(failed_cells) == len(cells):
+                error_msg = "All flight searches failed:\n" + "\n".join(
+                    [f"{f['depart_date']}/{f['return_date']}: {f['error']}" for f in failed_cells]
                 )
+                return {"success": False, "error": error_msg}
 
-            return {"success": True, "data": {"flights": simplified_flights}}
+            return {
+                "success": True,
+                "data": {
+                    "depart_dates": depart_dates,
+                    "return_dates": return_dates,
+                    "grid": grid,
+                    "cheapest": cheapest,
+                    "failed_cells": failed_cells,
+                    "stats": {"cells": len(cells), "pruned": pruned, **counters},
+                },
+            }
 
         except Exception as e:
-            error_msg = f"Error occurred while searching flights: {str(e)}"
+            error_msg = f"Error occurred while searching flight price matrix: {str(e)}"
             logger.error(error_msg)
             logger.exception(e)
             return {"success": False, "error": error_msg}
 
+    def _build_flight_params(
+        self,
+        from_code: str,
+        to_code: str,
+        depart_date: str,
+        return_date: Optional[str],
+        stops: str,
+        page_no: int,
+        adults: int,
+        children: Optional[str],
+        sort: str,
+        cabin_class: str,
+        currency_code: str,
+    ) -> Dict[str, Any]:
+        """Build the request parameters of a flight search"""
+        # Build request parameters
+        params = {
+            "fromId": f"{from_code}.AIRPORT",
+            "toId": f"{to_code}.AIRPORT",
+            "departDate": depart_date,
+            "stops": stops,
+            "pageNo": page_no,
+            "adults": adults,
+            "sort": sort,
+            "cabinClass": cabin_class,
+            "currency_code": currency_code,
+        }
+
+        # Add optional parameters
+        if return_date:
+            params["returnDate"] = return_date
+        if children:
+            params["children"] = children
+        return params
+
+    async def _fetch_flight_offers(self, session: aiohttp.ClientSession, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Request flight offers, returning the raw offer list as data"""
+        request_url = f"{self.proxy_url}/api/v1/flights/searchFlights"
+
+        try:
+            async with session.get(request_url, headers=self.headers, params=params, timeout=self._timeout) as response:
+                # Check response status
+                response.raise_for_status()
+                data = await response.json()
+
+        except asyncio.TimeoutError:
+            error_msg = f"Request timeout (timeout={self._timeout}s)"
+            logger.error(error_msg)
+            return {"success": False, "error": error_msg}
+        except aiohttp.ClientError as e:
+            error_msg = f"Request failed: {str(e)}"
+            logger.error(error_msg)
+            return {"success": False, "error": error_msg}
+
+        # Check if API response has error
+        if not data.get("status"):
+            error_msg = data.get("message", "Unknown error")
+            logger.error(f"API returned error: {error_msg}")
+            return {"success": False, "error": error_msg}
+
+        return {"success": True, "data": data.get("data", {}).get("flightOffers") or []}
+
+    def _simplify_flight_offer(self, offer: Dict[str, Any]) -> Dict[str, Any]:
+        """Simplify a raw flight offer"""
+        legs_info = []
+        stops_count = 0
+
+        total_time = 0
+        for segment in offer["segments"]:
+            # Get flight number and stop info
+            for leg in segment["legs"]:
+                flight_number = f"{leg['flightInfo']['carrierInfo']['marketingCarrier']}{leg['flightInfo']['flightNumber']}"
+                # Count stops
+                stops_count += len(leg.get("flightStops", []))
+
+                # Add segment info
+                legs_info.append(
+                    {
+                        "flight_number": flight_number,
+                        "from": leg["departureAirport"]["code"],
+                        "to": leg["arrivalAirport"]["code"],
+                        "departure": leg["departureTime"],
+                        "arrival": leg["arrivalTime"],
+                        "total_time": self._format_duration(leg["totalTime"]),  # Segment flight time
+                    }
+                )
+                total_time += leg["totalTime"]
+        # Handle price
+        price = offer["priceBreakdown"]["total"]
+        total_amount = float(price["units"]) + float(price["nanos"]) / 1_000_000_000
+
+        return {
+            "stops": stops_count,
+            "segments": legs_info,
+            "total_time": self._format_duration(total_time),
+            "price": {"currency": price["currencyCode"], "amount": total_amount},
+        }
+
+    def _summarize_flight_offers(self, offers: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Reduce flight offers to the price summary of the cheapest one"""
+        summary: Dict[str, Any] = {"min_price": None, "currency": None, "offers": len(offers), "stops": None, "total_time": None}
+        for offer in offers:
+            price = offer["priceBreakdown"]["total"]
+            amount = float(price["units"]) + float(price["nanos"]) / 1_000_000_000
+            if summary["min_price"] is None or amount < summary["min_price"]:
+                legs = [leg for segment in offer["segments"] for leg in segment["legs"]]
+                summary.update(
+                    {
+                        "min_price": amount,
+                        "currency": price["currencyCode"],
+                        "stops": sum(len(leg.get("flightStops", [])) for leg in legs),
+                        "total_time": self._format_duration(sum(leg["totalTime"] for leg in legs)),
+                    }
+                )
+        return summary
+
+    def _date_range(self, start: str, end: str) -> List[str]:
+        """List the dates from start to end inclusive, format: YYYY-MM-DD"""
+        start_day = datetime.strptime(start, "%Y-%m-%d")
+        days = (datetime.strptime(end, "%Y-%m-%d") - start_day).days
+        if days < 0:
+            raise ValueError(f"End date {end} is before start date {start}")
+        return [(start_day + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days + 1)]
+
     async def _search_hotel_destinations(self, query: str) -> Dict[str, Any]:
         """
         Search for hotel destinations
@@ -325,6 +758,92 @@ class BookingSource(BaseAPI):
             logger.exception(e)
             return {"success": False, "error": error_msg}
 
+    async def warm_up_destinations(self, dest_names: List[str], max_concurrency: int = 5) -> Dict[str, Any]:
+        """
+        Pre-resolve destination names into the destination cache, so later hotel searches for them need a single request
+
+        Args:
+            dest_names(List[str]): Destination names, e.g.: ["shanghai", "Paris", "São Paulo"]
+            max_concurrency(int): Maximum number of concurrent requests, default is 5
+
+        Returns:
+            Dict[str, Any]: Dictionary containing the resolved destinations, e.g.
+            {
+                "success": True,                   # False only if every destination failed
+                "data": {
+                    "destinations": {              # Matched destination by requested name
+                        "shanghai": {"name": "Shanghai", "dest_id": "-1924465", "search_type": "city", ...}
+                    },
+                    "cached": 0,                   # Number of names already cached
+                    "fetched": 1,                  # Number of names resolved through the API
+                    "failed": [                    # Names that could not be resolved
+                        {"dest_name": "atlantis", "error": "No matching destination found: atlantis"}
+                    ]
+                }
+            }
+        """
+        try:
+            semaphore = asyncio.Semaphore(max_concurrency)
+            names = list(dict.fromkeys(dest_names))
+            cached = [name for name in names if self.destination_cache.get(normalize_destination_name(name)) is not None]
+
+            async def _resolve(name: str) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self._resolve_destination(name)
+
+            results = await asyncio.gather(*[_resolve(name) for name in names])
+
+            destinations = {}
+            failed = []
+            for name, result in zip(names, results):
+                if result["success"]:
+                    destinations[name] = result["data"]
+                else:
+                    failed.append({"dest_name": name, "error": result["error"]})
+
+            if names and not destinations:
+                error_msg = "All destinations failed to resolve:\n" + "\n".join([f"{f['dest_name']}: {f['error']}" for f in failed])
+                return {"success": False, "error": error_msg}
+
+            return {
+                "success": True,
+                "data": {"destinations": destinations, "cached": len(cached), "fetched": len(destinations) - len(cached), "failed": failed},
+            }
+
+        except Exception as e:
+            error_msg = f"Error occurred while warming up destinations: {str(e)}"
+            logger.error(error_msg)
+            logger.exception(e)
+            return {"success": False, "error": error_msg}
+
+    async def _resolve_destination(self, dest_name: str) -> Dict[str, Any]:
+        """Resolve a destination name to its best matching destination, through the destination cache"""
+        key = normalize_destination_name(dest_name)
+        destination = self.destination_cache.get(key)
+        if destination is not None:
+            # 返回副本，避免调用方修改结果时改动缓存
+            return {"success": True, "data": copy.deepcopy(destination)}
+
+        # 同一目的地的并发解析共用一次请求
+        pending = self._pending_destinations.get(key)
+        if pending is None:
+            pending = self._pending_destinations[key] = asyncio.ensure_future(self._search_hotel_destinations(dest_name))
+            pending.add_done_callback(lambda _: self._pending_destinations.pop(key, None))
+        dest_result = await asyncio.shield(pending)
+        if not dest_result["success"]:
+            return dest_result
+
+        if not dest_result["data"]["destinations"]:
+            return {"success": False, "error": f"No matching destination found: {dest_name}"}
+
+        # 使用第一个匹配的目的地
+        destination = dest_result["data"]["destinations"][0]
+        if self.destination_cache.get(key) is None:
+            self.destination_cache.set(key, copy.deepcopy(destination))
+            self.destination_cache.save()
+        # 并发解析同一目的地的调用共享同一个请求结果，各自返回副本
+        return {"success": True, "data": copy.deepcopy(destination)}
+
     async def _search_hotels_by_destid(
         self,
         dest_id: str,
@@ -341,6 +860,7 @@ class BookingSource(BaseAPI):
         currency_code: str = "USD",
         sort_by: str = "bayesian_review_score",
         categories_filter: Optional[str] = None,
+        session: Optional[aiohttp.ClientSession] = None,
     ) -> Dict[str, Any]:
         """
         Search for hotels
@@ -372,6 +892,7 @@ class BookingSource(BaseAPI):
                 - class::3: Three stars
                 - class::4: Four stars
                 - class::5: Five stars
+            session(Optional[aiohttp.ClientSession]): Session to send the request with, a new one by default
 
         Returns:
             Dict[str, Any]: Dictionary containing hotel search results, e.g.
@@ -449,8 +970,8 @@ class BookingSource(BaseAPI):
 
             # 发送请求
             try:
-                async with aiohttp.ClientSession(trust_env=True) as session:
-                    async with session.get(request_url, headers=self.headers, params=params, timeout=self._timeout) as response:
+                async with self._use_session(session) as request_session:
+                    async with request_session.get(request_url, headers=self.headers, params=params, timeout=self._timeout) as response:
                         # 检查响应状态
                         response.raise_for_status()
                         data = await response.json()
@@ -595,16 +1116,12 @@ class BookingSource(BaseAPI):
         #     ...     print(f"Search successful")
         # """
         try:
-            # 先搜索目的地信息
-            dest_result = await self._search_hotel_destinations(dest_name)
+            # 先解析目的地信息（优先使用目的地缓存）
+            dest_result = await self._resolve_destination(dest_name)
             if not dest_result["success"]:
                 return dest_result
 
-            if not dest_result["data"]["destinations"]:
-                return {"success": False, "error": f"No matching destination found: {dest_name}"}
-
-            # 使用第一个匹配的目的地
-            destination = dest_result["data"]["destinations"][0]
+            destination = dest_result["data"]
             dest_id = destination["dest_id"]
             search_type = destination["search_type"].upper()
 
@@ -648,6 +1165,221 @@ class BookingSource(BaseAPI):
             logger.exception(e)
             return {"success": False, "error": error_msg}
 
+    async def search_hotels_multi_page(
+        self,
+        dest_name: str,
+        arrival_date: str,
+        departure_date: str,
+        pages: int = 5,
+        adults: int = 1,
+        children_age: Optional[str] = None,
+        room_qty: int = 1,
+        price_min: Optional[float] = None,
+        price_max: Optional[float] = None,
+        languagecode: str = "en-us",
+        currency_code: str = "USD",
+        sort_by: str = "bayesian_review_score",
+        categories_filter: Optional[str] = None,
+        max_concurrency: int = 5,
+    ) -> Dict[str, Any]:
+        """
+        Search for hotels by destination name across several result pages at once
+
+        Pages 1 to pages are fetched concurrently, hotels are de-duplicated by hotel_id and re-sorted by sort_by.
+        bayesian_review_score ranks by review score shrunk towards the mean of the merged hotels by review count.
+
+        Args:
+            dest_name(str): Destination name, e.g.: shanghai
+            arrival_date(str): Check-in date, format: YYYY-MM-DD
+            departure_date(str): Check-out date, format: YYYY-MM-DD
+            pages(int): Number of result pages to fetch, default is 5
+            adults(int): Number of adults, default is 1
+            children_age(Optional[str]): Children's ages, comma separated, e.g.: 0,17
+            room_qty(int): Number of rooms, default is 1
+            price_min(Optional[float]): Minimum price, optional
+            price_max(Optional[float]): Maximum price, optional
+            languagecode(str): Language code, default en-us
+            currency_code(str): Currency code, default USD
+            sort_by(str): Sort method, same options as search_hotels_by_dest_name
+            categories_filter(Optional[str]): Star rating filter, same options as search_hotels_by_dest_name
+            max_concurrency(int): Maximum number of concurrent page requests, default is 5
+
+        Returns:
+            Dict[str, Any]: Dictionary containing hotel search results, e.g.
+            {
+                "success": True,                   # False only if every page failed
+                "data": {
+                    "destination": {"name": "Shanghai", "dest_id": "-1924465", "search_type": "city"},
+                    "hotels": [...],               # Merged hotel list, same fields as search_hotels_by_dest_name
+                    "pages_fetched": 5,            # Number of pages fetched successfully
+                    "failed_pages": [              # Pages whose request failed
+                        {"page_number": 4, "error": "..."}
+                    ]
+                }
+            }
+        """
+        try:
+            dest_result = await self._resolve_destination(dest_name)
+            if not dest_result["success"]:
+                return dest_result
+            destination = dest_result["data"]
+
+            hotels: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+            failed_pages = []
+            pages_fetched = 0
+            search_args = self._hotel_search_args(
+                arrival_date, departure_date, adults, children_age, room_qty, price_min, price_max, languagecode, currency_code, sort_by, categories_filter
+            )
+            async for page_number, result in self._iter_hotel_pages(destination, pages, max_concurrency, search_args):
+                if not result["success"]:
+                    failed_pages.append({"page_number": page_number, "error": result["error"]})
+                    continue
+                pages_fetched += 1
+                for position, hotel in enumerate(result["data"]["hotels"]):
+                    # 同一酒店出现在多页时保留靠前页中的记录
+                    rank = (page_number, position)
+                    if hotel["hotel_id"] not in hotels or rank < hotels[hotel["hotel_id"]][0]:
+                        hotels[hotel["hotel_id"]] = (rank, hotel)
+
+            if not pages_fetched:
+                failed_pages.sort(key=lambda f: f["page_number"])
+                error_msg = "All hotel pages failed:\n" + "\n".join([f"page {f['page_number']}: {f['error']}" for f in failed_pages])
+                return {"success": False, "error": error_msg}
+
+            # 先按上游顺序排列，再按排序字段做稳定排序
+            ordered = [hotel for _, hotel in sorted(hotels.values(), key=lambda item: item[0])]
+            sort_key = bayesian_review_sort_key(ordered) if sort_by == "bayesian_review_score" else HOTEL_SORT_KEYS.get(sort_by)
+            if sort_key is not None:
+                ordered.sort(key=sort_key)
+
+            return {
+                "success": True,
+                "data": {
+                    "destination": {
+                        "name": destination["name"],
+                        "dest_id": destination["dest_id"],
+                        "search_type": destination["search_type"],
+                    },
+                    "hotels": ordered,
+                    "pages_fetched": pages_fetched,
+                    "failed_pages": sorted(failed_pages, key=lambda f: f["page_number"]),
+                },
+            }
+
+        except Exception as e:
+            error_msg = f"Error occurred while searching hotels: {str(e)}"
+            logger.error(error_msg)
+            logger.exception(e)
+            return {"success": False, "error": error_msg}
+
+    async def iter_hotels_by_dest_name(
+        self,
+        dest_name: str,
+        arrival_date: str,
+        departure_date: str,
+        pages: int = 5,
+        adults: int = 1,
+        children_age: Optional[str] = None,
+        room_qty: int = 1,
+        price_min: Optional[float] = None,
+        price_max: Optional[float] = None,
+        languagecode: str = "en-us",
+        currency_code: str = "USD",
+        sort_by: str = "bayesian_review_score",
+        categories_filter: Optional[str] = None,
+        max_concurrency: int = 5,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream the hotels of several result pages, fetched concurrently, as soon as each page completes
+
+        Hotels are de-duplicated by hotel_id and yielded in page completion order; failed pages are logged and skipped.
+        Raises ValueError if the destination cannot be resolved. Arguments are the same as search_hotels_multi_page.
+        """
+        dest_result = await self._resolve_destination(dest_name)
+        if not dest_result["success"]:
+            raise ValueError(dest_result["error"])
+
+        search_args = self._hotel_search_args(
+            arrival_date, departure_date, adults, children_age, room_qty, price_min, price_max, languagecode, currency_code, sort_by, categories_filter
+        )
+        seen = set()
+        async for page_number, result in self._iter_hotel_pages(dest_result["data"], pages, max_concurrency, search_args):
+            if not result["success"]:
+                logger.warning(f"Skipping hotel page {page_number}: {result['error']}")
+                continue
+            for hotel in result["data"]["hotels"]:
+                if hotel["hotel_id"] not in seen:
+                    seen.add(hotel["hotel_id"])
+                    yield hotel
+
+    @staticmethod
+    def _hotel_search_args(
+        arrival_date: str,
+        departure_date: str,
+        adults: int,
+        children_age: Optional[str],
+        room_qty: int,
+        price_min: Optional[float],
+        price_max: Optional[float],
+        languagecode: str,
+        currency_code: str,
+        sort_by: str,
+        categories_filter: Optional[str],
+    ) -> Dict[str, Any]:
+        """Collect the per-page hotel search arguments shared by the multi-page hotel searches"""
+        return {
+            "arrival_date": arrival_date,
+            "departure_date": departure_date,
+            "adults": adults,
+            "children_age": children_age,
+            "room_qty": room_qty,
+            "price_min": price_min,
+            "price_max": price_max,
+            "languagecode": languagecode,
+            "currency_code": currency_code,
+            "sort_by": sort_by,
+            "categories_filter": categories_filter,
+        }
+
+    async def _iter_hotel_pages(
+        self, destination: Dict[str, Any], pages: int, max_concurrency: int, search_args: Dict[str, Any]
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """Fetch hotel result pages concurrently over one session, yielding (page_number, result) as pages complete
+
+        Pages still in flight are cancelled when the consumer stops early.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def _fetch_page(session: aiohttp.ClientSession, page_number: int) -> Tuple[int, Dict[str, Any]]:
+            async with semaphore:
+                result = await self._search_hotels_by_destid(
+                    dest_id=destination["dest_id"],
+                    search_type=destination["search_type"].upper(),
+                    page_number=page_number,
+                    session=session,
+                    **search_args,
+                )
+            return page_number, result
+
+        async with aiohttp.ClientSession(trust_env=True) as session:
+            tasks = [asyncio.create_task(_fetch_page(session, page_number)) for page_number in range(1, pages + 1)]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    yield await next_done
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    @asynccontextmanager
+    async def _use_session(self, session: Optional[aiohttp.ClientSession] = None) -> AsyncIterator[aiohttp.ClientSession]:
+        """Yield the given session, or a new one closed on exit"""
+        if session is not None:
+            yield session
+        else:
+            async with aiohttp.ClientSession(trust_env=True) as new_session:
+                yield new_session
+
     async def search_hotel_details(
         self,
         hotel_id: str,
@@ -788,14 +1520,157 @@ class BookingSource(BaseAPI):
                 logger.error(f"API returned error: {error_msg}")
                 return {"success": False, "error": error_msg}
 
-            hotel_detail = self._parse_hotel_detail(data.get("data", {}))
-            return {"success": True, "data": hotel_detail}
+            # _parse_hotel_detail 已返回 {"success": True, "data": 酒店详情}，不再额外包装
+            return self._parse_hotel_detail(data.get("data", {}))
+        except Exception as e:
+            error_msg = f"Error occurred while searching hotel details: {str(e)}"
+            logger.error(error_msg)
+            logger.exception(e)
+            return {"success": False, "error": error_msg}
+
+    async def search_hotel_details_batch(
+        self,
+        hotel_ids: List[str],
+        arrival_date: str,
+        departure_date: str,
+        adults: int = 1,
+        children_age: Optional[str] = None,
+        room_qty: int = 1,
+        units: str = "metric",
+        temperature_unit: str = "c",
+        languagecode: str = "en-us",
+        currency_code: str = "EUR",
+        max_concurrency: int = 8,
+    ) -> Dict[str, Any]:
+        """
+        Search for the details of many hotels at once
+
+        Hotels are fetched concurrently and their payloads are parsed in a worker thread pool. Details fetched within
+        the last hour for the same hotel, dates and occupancy are served from cache. Unlike search_hotel_details, the
+        per-hotel entries are not wrapped in {"success", "data"}: hotels holds the details of the hotels that succeeded
+        and failures are listed in failed_hotels.
+
+        Args:
+            hotel_ids(List[str]): Hotel IDs
+            arrival_date(str): Check-in date, format: YYYY-MM-DD
+            departure_date(str): Check-out date, format: YYYY-MM-DD
+            adults(int): Number of adults, default is 1
+            children_age(Optional[str]): Children's ages, comma separated, e.g.: 0,17
+            room_qty(int): Number of rooms, default is 1
+            units(str): Units, default is metric
+            temperature_unit(str): Temperature unit, default is c, options: c or f, where c = Celsius, f = Fahrenheit
+            languagecode(str): Language code, default en-us
+            currency_code(str): Currency code, default EUR
+            max_concurrency(int): Maximum number of concurrent requests, default is 8
+
+        Returns:
+            Dict[str, Any]: Dictionary containing hotel details, e.g.
+            {
+                "success": True,                   # False only if every hotel failed
+                "data": {
+                    "hotels": {                    # Details by hotel ID, each the "data" of a search_hotel_details result
+                        "191605": {"hotel_id": 191605, "hotel_name": "Novotel Mumbai Juhu Beach", ...}
+                    },
+                    "cached": 0,                   # Number of hotels served from cache
+                    "failed_hotels": [             # Hotels whose details could not be fetched
+                        {"hotel_id": "123", "error": "..."}
+                    ]
+                }
+            }
+        """
+        try:
+            semaphore = asyncio.Semaphore(max_concurrency)
+            hotels: Dict[str, Any] = {}
+            failed_hotels = []
+            to_fetch = []
+            for hotel_id in dict.fromkeys(str(hotel_id) for hotel_id in hotel_ids):
+                params = {
+                    "hotel_id": hotel_id,
+                    "arrival_date": arrival_date,
+                    "departure_date": departure_date,
+                    "adults": adults,
+                    "room_qty": room_qty,
+                    "units": units,
+                    "temperature_unit": temperature_unit,
+                    "languagecode": languagecode,
+                    "currency_code": currency_code,
+                }
+                if children_age:
+                    params["children_age"] = children_age
+
+                cached = self.hotel_detail_cache.get(json.dumps(params, sort_keys=True))
+                if cached is not None:
+                    # 返回副本，避免调用方修改结果时改动缓存
+                    hotels[hotel_id] = copy.deepcopy(cached)
+                else:
+                    to_fetch.append(params)
+            cached_count = len(hotels)
+
+            async def _fetch(session: aiohttp.ClientSession, params: Dict[str, Any]) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self._fetch_hotel_detail(session, params)
+
+            if to_fetch:
+                async with aiohttp.ClientSession(trust_env=True) as session:
+                    results = await asyncio.gather(*[_fetch(session, params) for params in to_fetch])
+
+                for params, result in zip(to_fetch, results):
+                    if result["success"]:
+                        hotels[params["hotel_id"]] = result["data"]
+                        self.hotel_detail_cache.set(json.dumps(params, sort_keys=True), copy.deepcopy(result["data"]))
+                    else:
+                        failed_hotels.append({"hotel_id": params["hotel_id"], "error": result["error"]})
+
+            if hotel_ids and not hotels:
+                error_msg = "All hotel detail requests failed:\n" + "\n".join([f"{f['hotel_id']}: {f['error']}" for f in failed_hotels])
+                return {"success": False, "error": error_msg}
+
+            return {"success": True, "data": {"hotels": hotels, "cached": cached_count, "failed_hotels": failed_hotels}}
+
         except Exception as e:
             error_msg = f"Error occurred while searching hotel details: {str(e)}"
             logger.error(error_msg)
             logger.exception(e)
             return {"success": False, "error": error_msg}
 
+    async def _fetch_hotel_detail(self, session: aiohttp.ClientSession, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Request the details of one hotel, decoding and parsing the payload off the event loop"""
+        request_url = f"{self.proxy_url}/api/v1/hotels/getHotelDetails"
+
+        try:
+            async with session.get(request_url, headers=self.headers, params=params, timeout=self._timeout) as response:
+                # 检查响应状态
+                response.raise_for_status()
+                raw = await response.read()
+
+            # 详情数据体积较大，JSON 解码与解析放到线程池中执行，避免阻塞事件循环
+            return await asyncio.get_running_loop().run_in_executor(_get_parse_executor(), self._decode_hotel_detail, raw)
+
+        except asyncio.TimeoutError:
+            error_msg = f"Request timeout (timeout={self._timeout}s)"
+            logger.error(error_msg)
+            return {"success": False, "error": error_msg}
+        except aiohttp.ClientError as e:
+            error_msg = f"Request failed: {str(e)}"
+            logger.error(error_msg)
+            return {"success": False, "error": error_msg}
+        except Exception as e:
+            error_msg = f"Error occurred while parsing hotel details: {str(e)}"
+            logger.error(error_msg)
+            return {"success": False, "error": error_msg}
+
+    def _decode_hotel_detail(self, raw: bytes) -> Dict[str, Any]:
+        """Decode and parse a hotel details payload, runs in the parse worker pool"""
+        data = json.loads(raw)
+
+        # 检查API响应中是否有错误
+        if not data.get("status"):
+            error_msg = data.get("message", "Unknown error")
+            logger.error(f"API returned error: {error_msg}")
+            return {"success": False, "error": error_msg}
+
+        return self._parse_hotel_detail(data.get("data", {}))
+
     def _parse_hotel_detail(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """解析酒店详情"""
         facilities = []
@@ -891,8 +1766,6 @@ class BookingSource(BaseAPI):
 
 
 if __name__ == "__main__":
-    import json
-
     from external_api.data_sources.client import get_client
 
     async def main():
@@ -18,6 +18,12 @@ from .base import EXCLUDE_METHODS, BaseAPI
 
 # 用于在shell中设置LLM_GATEWAY_BASE_URL环境变量
 LLM_GATEWAY_BASE_URL_ENV_NAME = "LLM_GATEWAY_BASE_URL"
+# 用于在shell中设置数据源本地缓存目录
+EXTERNAL_API_CACHE_DIR_ENV_NAME = "EXTERNAL_API_CACHE_DIR"
+# 用于在shell中设置上游响应体调试日志的采样率，例如 "pinterest=0.1,metal=1" 或 "0.01"
+EXTERNAL_API_PAYLOAD_LOG_ENV_NAME = "EXTERNAL_API_PAYLOAD_LOG"
+# 用于在shell中设置上游响应体调试日志文件，未设置时写入 payload_log 日志
+EXTERNAL_API_PAYLOAD_LOG_PATH_ENV_NAME = "EXTERNAL_API_PAYLOAD_LOG_PATH"
 
 logger = logging.getLogger("data_sources_client")
 
@@ -27,6 +33,10 @@ def get_external_api_proxy_url() -> str:
     return f"{base_url}/llm/external-api"
 
 
+def get_external_api_cache_dir() -> str:
+    return os.getenv(EXTERNAL_API_CACHE_DIR_ENV_NAME) or os.path.join(os.path.expanduser("~"), ".cache", "external_api")
+
+
 config = {
     "name": "rapid_api",
     "twitter_base_url": "twitter154.p.rapidapi.com",
@@ -38,6 +48,9 @@ config = {
     "metal_base_url": "live-gold-prices.p.rapidapi.com",
     "serper_base_url": "google.serper.dev",
     "external_api_proxy_url": get_external_api_proxy_url(),
+    "cache_dir": get_external_api_cache_dir(),
+    "payload_log_sample_rates": os.getenv(EXTERNAL_API_PAYLOAD_LOG_ENV_NAME),
+    "payload_log_path": os.getenv(EXTERNAL_API_PAYLOAD_LOG_PATH_ENV_NAME),
     "timeout": 60,
 }
 
@@ -260,6 +273,15 @@ class ApiClient:
             result.append(self.get_function_desc(function_name))
         return "\n".join(result)
 
+    async def aclose(self) -> None:
+        """
+        Release the resources held by the data sources, such as long-lived HTTP clients
+        """
+        for source in self._sources.values():
+            close = getattr(source, "aclose", None)
+            if close is not None:
+                await close()
+
     def __getattr__(self, name: str) -> BaseAPI:
         """
         Get data source instance by attribute access
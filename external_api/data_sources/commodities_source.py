@@ -3,16 +3,33 @@ Commodities data source implementation
 """
 
 import asyncio
+import difflib
 import json
 import logging
-from typing import Any, Dict, Optional
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional
 
 import aiohttp
 
 from .base import BaseAPI
+from .fx_rates import get_fx_provider, get_prices_multi
+from .local_cache import JsonStateStore
+from .price_recorder import DEFAULT_SAMPLE_INTERVAL, PriceRecorder, PriceSampler, create_multi_currency_sampler, recorded_history
 
 logger = logging.getLogger("commodities_source")
 
+# 商品目录（支持的商品与币种）的刷新间隔
+CATALOGUE_REFRESH_INTERVAL = 86400
+# 目录请求失败后再次尝试前的等待时间
+CATALOGUE_RETRY_INTERVAL = 300
+# 商品代码和币种代码的合法格式
+COMMODITY_CODE_PATTERN = re.compile(r"^[A-Z0-9][A-Z0-9_.\-]{0,31}$")
+CURRENCY_CODE_PATTERN = re.compile(r"^[A-Z]{3}$")
+# 多币种换算时按汇率换算的价格字段
+COMMODITY_PRICE_FIELDS = ("open", "high", "low", "prev", "current")
+
 
 class CommoditiesSource(BaseAPI):
     """Commodity price data source"""
@@ -33,6 +50,22 @@ class CommoditiesSource(BaseAPI):
             "X-Biz-Id": "matrix-agent",
             "X-Request-Timeout": str(config["timeout"] - 5),
         }
+        # 商品目录缓存，每日刷新，配置了 cache_dir 时持久化
+        catalogue_path = os.path.join(config["cache_dir"], "commodities_catalogue.json") if config.get("cache_dir") else None
+        self.catalogue_store = JsonStateStore(catalogue_path)
+        self._pending_catalogue: Optional[asyncio.Future] = None
+        # 目录请求失败后，此时间之前不再请求
+        self._catalogue_retry_at = 0.0
+        self._catalogue_refresh_task: Optional[asyncio.Task] = None
+        # 商品代码/币种代码 -> 目录条目
+        self._commodity_index: Dict[str, Any] = {}
+        self._currency_index: Dict[str, Any] = {}
+        self._build_catalogue_index(self.catalogue_store.get("catalogue"))
+        self._fx = get_fx_provider(config)
+        # 本地价格历史，配置了 cache_dir 时启用
+        self.price_recorder: Optional[PriceRecorder] = None
+        if config.get("cache_dir"):
+            self.price_recorder = PriceRecorder(os.path.join(config["cache_dir"], "commodities_history"))
 
     @property
     def source_name(self) -> str:
@@ -45,9 +78,13 @@ class CommoditiesSource(BaseAPI):
             "description": "Commodity price data source, provides price information for commodities such as COCOA, COFFEE, CORN, OIL, SOYBEAN, SUGAR, WHEAT, etc.",
         }
 
-    async def get_supported_commodities(self) -> Dict[str, Any]:
+    async def get_supported_commodities(self, refresh: bool = False) -> Dict[str, Any]:
         """Get the list of supported commodities.
         This method is used to get the list of commodities that can be queried.
+        The list is cached and refreshed once a day; if a refresh fails the previous list is returned.
+
+        Args:
+            refresh(bool): Fetch the list from the API even if the cached one is fresh, default False
 
         Returns:
             Dict[str, Any]: Dictionary containing the list of supported commodities, e.g.
@@ -80,6 +117,58 @@ class CommoditiesSource(BaseAPI):
         #     ... else:
         #     ...     print(f"Failed to get supported commodities: {result['error']}")
         # """
+        catalogue = self.catalogue_store.get("catalogue")
+        if not refresh and catalogue and (self._catalogue_is_fresh(catalogue) or time.time() < self._catalogue_retry_at):
+            return {"success": True, "data": {"commodities": catalogue["commodities"], "currencies": catalogue["currencies"]}}
+
+        # 并发的刷新共用一次请求
+        if self._pending_catalogue is None or self._pending_catalogue.done():
+            self._pending_catalogue = asyncio.ensure_future(self._fetch_supported_commodities())
+        result = await asyncio.shield(self._pending_catalogue)
+        if result["success"]:
+            self._catalogue_retry_at = 0.0
+            catalogue = {"fetched_at": time.time(), **result["data"]}
+            self.catalogue_store.set("catalogue", catalogue)
+            self.catalogue_store.save()
+            self._build_catalogue_index(catalogue)
+            return result
+        self._catalogue_retry_at = time.time() + CATALOGUE_RETRY_INTERVAL
+        if catalogue:
+            logger.warning(f"Using stale commodity catalogue: {result['error']}")
+            return {"success": True, "data": {"commodities": catalogue["commodities"], "currencies": catalogue["currencies"]}}
+        return result
+
+    async def warm_up_catalogue(self) -> Dict[str, Any]:
+        """
+        Load the commodity catalogue ahead of time, so price queries can be validated without waiting for it.
+
+        Returns:
+            Dict[str, Any]: Dictionary containing the catalogue size, e.g.
+            {
+                "success": True,
+                "data": {
+                    "commodities": 52,                  # Number of supported commodities
+                    "currencies": 170,                  # Number of supported currencies
+                    "fetched_at": "2025-04-25 08:00:00" # When the catalogue was fetched from the API
+                }
+            }
+        """
+        result = await self.get_supported_commodities()
+        if not result["success"]:
+            return result
+        catalogue = self.catalogue_store.get("catalogue") or {}
+        fetched_at = catalogue.get("fetched_at")
+        return {
+            "success": True,
+            "data": {
+                "commodities": len(self._commodity_index),
+                "currencies": len(self._currency_index),
+                "fetched_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(fetched_at)) if fetched_at else None,
+            },
+        }
+
+    async def _fetch_supported_commodities(self) -> Dict[str, Any]:
+        """Fetch the list of supported commodities and currencies from the API"""
         try:
             request_url = f"{self.proxy_url}/v1/supported"
 
@@ -164,6 +253,11 @@ class CommoditiesSource(BaseAPI):
         #     ... else:
         #     ...     print(f"Failed to get commodity price: {result['error']}")
         # """
+        validation = await self._validate_price_request(commodity_code, currency_code)
+        if not validation["success"]:
+            return validation
+        commodity_code, currency_code = validation["data"]["commodity_code"], validation["data"]["currency_code"]
+
         try:
             # Build query parameters
             params = {"symbols": commodity_code, "base": currency_code}
@@ -203,6 +297,195 @@ class CommoditiesSource(BaseAPI):
             logger.exception(e)
             return {"success": False, "error": error_msg}
 
+    async def get_commodities_price_multi(self, commodity_code: str, currency_codes: List[str], base_currency: str = "USD") -> Dict[str, Any]:
+        """
+        Get commodity prices in several currencies at once.
+
+        Prices are fetched once in base_currency together with one FX snapshot, and the other currencies are derived
+        locally, so N currencies cost about 2 requests. Currencies without an FX rate are fetched directly.
+        Each currency is tagged with how its prices were obtained.
+
+        Args:
+            commodity_code(str): Commodity code, e.g. "COCOA,CORN,OIL", obtained from get_supported_commodities()
+            currency_codes(List[str]): Currency codes, e.g. ["USD", "EUR", "VND"]
+            base_currency(str): Currency the prices are fetched in, default "USD"
+
+        Returns:
+            Dict[str, Any]: Dictionary containing the prices by currency, e.g.
+            {
+                "success": True,
+                "data": {
+                    "base_currency": "USD",
+                    "prices": {
+                        "USD": {
+                            "rates": {"COCOA": {"open": 9270, "high": 9633, "low": 9201, "prev": 9288, "current": 9590}},
+                            "provenance": {"method": "api"}  # Fetched from the API
+                        },
+                        "EUR": {
+                            "rates": {"COCOA": {"open": 8528.4, "high": 8862.36, "low": 8464.92, "prev": 8544.96, "current": 8822.8}},
+                            "provenance": {              # Derived from the base currency prices
+                                "method": "derived",
+                                "base_currency": "USD",
+                                "fx_rate": 0.92,         # Units of EUR per USD
+                                "fx_as_of": "2025-04-25 08:00:00"  # UTC time of the FX rate
+                            }
+                        }
+                    },
+                    "failed_currencies": [           # Currencies whose prices could not be obtained
+                        {"currency_code": "XYZ", "error": "..."}
+                    ]
+                }
+            }
+        """
+        try:
+            result = await self._get_prices_multi(commodity_code, currency_codes, base_currency)
+        except Exception as e:
+            error_msg = f"Error occurred while getting commodity prices: {str(e)}"
+            logger.error(error_msg)
+            logger.exception(e)
+            return {"success": False, "error": error_msg}
+        if not result["success"]:
+            return result
+
+        prices = {currency: {"rates": entry["records"], "provenance": entry["provenance"]} for currency, entry in result["data"]["prices"].items()}
+        return {"success": True, "data": {**result["data"], "prices": prices}}
+
+    async def _get_prices_multi(self, commodity_code: str, currency_codes: List[str], base_currency: str = "USD") -> Dict[str, Any]:
+        """Get commodity price records by currency, see fx_rates.get_prices_multi"""
+        return await get_prices_multi(
+            self._fx,
+            lambda currency: self.get_commodities_price(commodity_code, currency),
+            lambda result: result["data"]["rates"],
+            COMMODITY_PRICE_FIELDS,
+            currency_codes,
+            base_currency,
+        )
+
+    def create_price_sampler(
+        self, commodity_code: str, currency_codes: Optional[List[str]] = None, interval: float = DEFAULT_SAMPLE_INTERVAL
+    ) -> PriceSampler:
+        """Create a sampler recording current commodity prices into the local price history.
+        Each round requests the prices once through get_commodities_price_multi and appends one sample per commodity
+        and currency, so get_commodities_price_history can answer without any request.
+
+        Args:
+            commodity_code(str): Commodity codes to record, e.g. "COCOA,CORN,OIL"
+            currency_codes(List[str]): Currency codes to record, defaults to ["USD"]
+            interval(float): Seconds between rounds, defaults to 300
+
+        Returns:
+            PriceSampler: Sampler; start() runs it in the background, stop() stops it, run(max_rounds) runs in place
+
+        Raises:
+            ValueError: cache_dir is not configured
+        """
+        currencies = currency_codes or ["USD"]
+        return create_multi_currency_sampler(
+            self.price_recorder, lambda: self._get_prices_multi(commodity_code, currencies), "current", self._history_symbol, interval
+        )
+
+    async def get_commodities_price_history(
+        self,
+        commodity_code: str,
+        currency_code: str = "USD",
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        interval: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Get the recorded current price history of a commodity, read from the local price history without any request.
+
+        History exists only for the commodities and currencies recorded by a sampler from create_price_sampler().
+
+        Args:
+            commodity_code(str): A single commodity code, e.g. "COCOA"
+            currency_code(str): Currency code, e.g. "USD"
+            start(str): Start time (UTC, inclusive), "YYYY-MM-DD HH:MM:SS" or "YYYY-MM-DD", defaults to the oldest sample
+            end(str): End time (UTC, exclusive), same format, defaults to the latest sample
+            interval(str): OHLC bucket size, one of "1m", "5m", "15m", "30m", "1h", "4h", "1d", "1wk"; raw samples if omitted
+
+        Returns:
+            Dict[str, Any]: Dictionary containing the history, e.g.
+            {
+                "success": True,
+                "data": {
+                    "symbol": "COCOA/USD",
+                    "interval": "1d",
+                    "count": 1,
+                    "bars": [                  # "samples": [{"time": ..., "price": ...}] when interval is omitted
+                        {"time": "2025-04-25 00:00:00", "open": 9270.0, "high": 9633.0, "low": 9201.0, "close": 9590.0, "samples": 288}
+                    ]
+                }
+            }
+        """
+        return recorded_history(self.price_recorder, self._history_symbol(commodity_code, currency_code), start, end, interval)
+
+    @staticmethod
+    def _history_symbol(commodity_code: str, currency_code: str) -> str:
+        """Symbol of a commodity in the price history, normalised the same way when recording and reading"""
+        return f"{commodity_code.strip().upper()}/{currency_code.strip().upper()}"
+
+    @staticmethod
+    def _catalogue_is_fresh(catalogue: Optional[Dict[str, Any]]) -> bool:
+        return bool(catalogue) and time.time() - catalogue["fetched_at"] < CATALOGUE_REFRESH_INTERVAL
+
+    def _schedule_catalogue_refresh(self) -> None:
+        """Start a background catalogue refresh if the catalogue is missing or stale, unless a recent fetch failed"""
+        if self._catalogue_is_fresh(self.catalogue_store.get("catalogue")) or time.time() < self._catalogue_retry_at:
+            return
+        if self._catalogue_refresh_task is not None and not self._catalogue_refresh_task.done():
+            return
+        self._catalogue_refresh_task = asyncio.ensure_future(self.get_supported_commodities(refresh=True))
+
+    def _build_catalogue_index(self, catalogue: Optional[Dict[str, Any]]) -> None:
+        """Index the catalogue entries by commodity and currency code"""
+        if not catalogue:
+            return
+        self._commodity_index = self._index_entries(catalogue.get("commodities"), "commodity_code")
+        self._currency_index = self._index_entries(catalogue.get("currencies"), "currency_code")
+
+    def _index_entries(self, entries: Any, code_key: str) -> Dict[str, Any]:
+        # 目录条目可能是列表，也可能是以代码为键的字典
+        if isinstance(entries, dict):
+            return {str(code).upper(): entry for code, entry in entries.items()}
+        return {str(entry[code_key]).upper(): entry for entry in entries or [] if isinstance(entry, dict) and entry.get(code_key)}
+
+    async def _validate_price_request(self, commodity_code: str, currency_code: str) -> Dict[str, Any]:
+        """Normalize and check the codes of a price query against the catalogue before any price request
+
+        Malformed codes are rejected without any request. Unknown codes are rejected while the catalogue is fresh;
+        while it is missing or stale the codes are passed through and the API decides. A missing or stale catalogue
+        is refreshed in the background, so validation never waits for the catalogue request.
+        """
+        codes = [code.strip().upper() for code in str(commodity_code or "").split(",") if code.strip()]
+        currency = str(currency_code or "").strip().upper()
+        if not codes:
+            return {"success": False, "error": "commodity_code is required, e.g. \"COCOA,CORN,OIL\""}
+        malformed = [code for code in codes if not COMMODITY_CODE_PATTERN.match(code)]
+        if malformed:
+            return {"success": False, "error": f"Invalid commodity code format: {malformed}"}
+        if not CURRENCY_CODE_PATTERN.match(currency):
+            return {"success": False, "error": f"Invalid currency code format: {currency_code!r}, expected a 3-letter code such as USD"}
+
+        # 目录缺失或过期时只在后台刷新，价格请求不等待目录
+        self._schedule_catalogue_refresh()
+        # 过期目录可能缺少上游新增的代码，只用最新的目录拒绝未知代码
+        if not self._catalogue_is_fresh(self.catalogue_store.get("catalogue")):
+            return {"success": True, "data": {"commodity_code": ",".join(dict.fromkeys(codes)), "currency_code": currency}}
+        if self._commodity_index:
+            unknown = [code for code in codes if code not in self._commodity_index]
+            if unknown:
+                return {"success": False, "error": self._unknown_codes_error("commodity", unknown, self._commodity_index)}
+        if self._currency_index and currency not in self._currency_index:
+            return {"success": False, "error": self._unknown_codes_error("currency", [currency], self._currency_index)}
+        return {"success": True, "data": {"commodity_code": ",".join(dict.fromkeys(codes)), "currency_code": currency}}
+
+    def _unknown_codes_error(self, kind: str, unknown: List[str], index: Dict[str, Any]) -> str:
+        suggestions = {code: difflib.get_close_matches(code, list(index), n=3) for code in unknown}
+        hints = "; ".join(f"{code}: did you mean {', '.join(matches)}?" for code, matches in suggestions.items() if matches)
+        message = f"Unknown {kind} codes: {unknown}, see get_supported_commodities() for the supported codes"
+        return f"{message} ({hints})" if hints else message
+
 
 if __name__ == "__main__":
     from external_api.data_sources.client import get_client
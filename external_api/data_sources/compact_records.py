@@ -0,0 +1,262 @@
+"""
+Column-oriented storage for large result sets of parsed records such as tweets and pins
+"""
+
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+# 记录中缺失字段的占位符，转换回 dict 时跳过该字段
+_MISSING = object()
+
+Column = Union[array, List[Any]]
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and -(2**63) <= value < 2**63
+
+
+def _freeze(value: Any) -> Any:
+    """Build a hashable key from nested dicts/lists"""
+    if isinstance(value, dict):
+        return tuple((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return ("__list__",) + tuple(_freeze(v) for v in value)
+    return value
+
+
+def _copy(value: Any) -> Any:
+    """Copy nested dicts/lists so callers cannot mutate shared objects"""
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+def _intern_strings(value: Any) -> Any:
+    """Intern the strings of a shared object, they repeat across many records"""
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict):
+        return {sys.intern(k): _intern_strings(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_intern_strings(v) for v in value]
+    return value
+
+
+class CompactRecords(Sequence):
+    """Read-only list of records stored column by column
+
+    Integer fields are stored in typed arrays, dict fields holding only integers (e.g. public_metrics) are split
+    into one integer array per key, and shared_fields (e.g. the author of a tweet) are interned: identical objects are
+    stored once and referenced by index. Other fields are kept as plain lists. Records are converted back to the
+    original dict shape lazily, one at a time, on indexing or iteration.
+    """
+
+    def __init__(self, records: Iterable[Dict[str, Any]] = (), shared_fields: Sequence[str] = ()):
+        """Initialize the result set
+
+        Args:
+            records: Records to store, all expected to share the same dict shape
+            shared_fields: Top-level fields whose values are interned and shared across records
+        """
+        self.shared_fields = tuple(shared_fields)
+        self._keys: List[str] = []
+        self._columns: Dict[str, Column] = {}
+        # 仅含整数的嵌套字段：字段名 -> 子字段列表，子字段各自存放在 "字段名.子字段" 列中
+        self._nested: Dict[str, List[str]] = {}
+        # 共享字段：字段名 -> (对象表, 对象键 -> 表中位置)
+        self._shared: Dict[str, Tuple[List[Any], Dict[Any, int]]] = {}
+        self._length = 0
+        self.extend(records)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return [self._record(i) for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("record index out of range")
+        return self._record(index)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(self._length):
+            yield self._record(i)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Convert every record back to its dict shape"""
+        return list(self)
+
+    def column(self, name: str) -> Column:
+        """Get the raw column of a top-level field, or of a nested integer field as "public_metrics.like_count" """
+        if name in self._shared:
+            table, _ = self._shared[name]
+            return [None if i < 0 else table[i] for i in self._columns[name]]
+        return self._columns[name]
+
+    def extend(self, records: Iterable[Dict[str, Any]]) -> None:
+        for record in records:
+            self.append(record)
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Store one record"""
+        for key in record:
+            if key not in self._columns and key not in self._nested:
+                self._add_field(key, record[key])
+
+        for key in self._keys:
+            value = record.get(key, _MISSING)
+            if key in self._nested:
+                self._append_nested(key, value)
+            elif key in self._shared:
+                self._append_shared(key, value)
+            else:
+                self._append_value(key, value)
+        self._length += 1
+
+    def _add_field(self, key: str, value: Any) -> None:
+        """Create the column(s) of a field first seen in the current record, backfilled as missing"""
+        self._keys.append(key)
+        if key in self.shared_fields:
+            self._shared[key] = ([], {})
+            self._columns[key] = array("l", [-1] * self._length)
+        elif isinstance(value, dict) and value and all(_is_int(v) for v in value.values()) and self._length == 0:
+            self._nested[key] = list(value)
+            for sub_key in value:
+                self._columns[f"{key}.{sub_key}"] = array("q")
+        elif _is_int(value) and self._length == 0:
+            self._columns[key] = array("q")
+        else:
+            self._columns[key] = [_MISSING] * self._length
+
+    def _append_value(self, key: str, value: Any) -> None:
+        column = self._columns[key]
+        if isinstance(column, array):
+            if _is_int(value):
+                column.append(value)
+                return
+            # 出现非整数值，整列退化为普通列表
+            column = self._columns[key] = list(column)
+        column.append(value)
+
+    def _append_nested(self, key: str, value: Any) -> None:
+        sub_keys = self._nested[key]
+        if isinstance(value, dict) and list(value) == sub_keys and all(_is_int(v) for v in value.values()):
+            for sub_key in sub_keys:
+                self._columns[f"{key}.{sub_key}"].append(value[sub_key])
+            return
+        # 结构不一致，整个嵌套字段退化为普通列表
+        self._columns[key] = [self._nested_value(key, i) for i in range(self._length)]
+        for sub_key in sub_keys:
+            del self._columns[f"{key}.{sub_key}"]
+        del self._nested[key]
+        self._columns[key].append(value)
+
+    def _append_shared(self, key: str, value: Any) -> None:
+        if value is _MISSING:
+            self._columns[key].append(-1)
+            return
+        table, index = self._shared[key]
+        frozen = _freeze(value)
+        position = index.get(frozen)
+        if position is None:
+            position = index[frozen] = len(table)
+            table.append(_intern_strings(_copy(value)))
+        self._columns[key].append(position)
+
+    def _nested_value(self, key: str, i: int) -> Dict[str, int]:
+        return {sub_key: self._columns[f"{key}.{sub_key}"][i] for sub_key in self._nested[key]}
+
+    def _record(self, i: int) -> Dict[str, Any]:
+        """Rebuild the dict of record i"""
+        record: Dict[str, Any] = {}
+        for key in self._keys:
+            if key in self._nested:
+                record[key] = self._nested_value(key, i)
+            elif key in self._shared:
+                position = self._columns[key][i]
+                if position >= 0:
+                    record[key] = _copy(self._shared[key][0][position])
+            else:
+                value = self._columns[key][i]
+                if value is not _MISSING:
+                    record[key] = _copy(value)
+        return record
+
+    def stats(self) -> Dict[str, Any]:
+        """Get storage statistics: records, columns and the number of distinct shared objects per shared field"""
+        return {
+            "records": self._length,
+            "columns": len(self._columns),
+            "shared": {key: len(table) for key, (table, _) in self._shared.items()},
+        }
+
+
+def _benchmark(count: int = 200000, authors: int = 2000) -> Optional[Dict[str, Any]]:
+    """Compare the memory used by count parsed tweets as dicts and as CompactRecords"""
+    import gc
+    import random
+    import tracemalloc
+
+    from .twitter_source import TwitterSource
+
+    source = TwitterSource({"timeout": 30, "external_api_proxy_url": "", "twitter_base_url": ""})
+    random.seed(0)
+    users = [
+        {"user_id": 10**9 + i, "name": f"User {i}", "username": f"user_{i}", "follower_count": random.randint(0, 10**6)}
+        for i in range(authors)
+    ]
+    raw = [
+        {
+            "tweet_id": 10**18 + i,
+            "creation_date": "Thu Mar 13 18:08:35 +0000 2025",
+            "text": f"tweet number {i} " + "lorem ipsum " * random.randint(1, 10),
+            "user": users[random.randrange(authors)],
+            "retweet_count": random.randint(0, 1000),
+            "favorite_count": random.randint(0, 10000),
+            "views": random.randint(0, 10**6),
+        }
+        for i in range(count)
+    ]
+
+    def _measure(build: Any) -> Tuple[Any, int]:
+        gc.collect()
+        tracemalloc.start()
+        result = build()
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return result, size
+
+    # 逐页解析后累积，模拟批量采集
+    def _as_dicts() -> List[Dict[str, Any]]:
+        tweets: List[Dict[str, Any]] = []
+        for start in range(0, count, 100):
+            tweets.extend(source._parse_search_results(raw[start : start + 100]))
+        return tweets
+
+    def _as_compact() -> CompactRecords:
+        tweets = CompactRecords(shared_fields=("author",))
+        for start in range(0, count, 100):
+            tweets.extend(source._parse_search_results(raw[start : start + 100]))
+        return tweets
+
+    dicts, dict_bytes = _measure(_as_dicts)
+    compact, compact_bytes = _measure(_as_compact)
+    assert compact[count // 2] == dicts[count // 2]
+    return {
+        "records": count,
+        "dict_bytes": dict_bytes,
+        "compact_bytes": compact_bytes,
+        "ratio": round(dict_bytes / compact_bytes, 2),
+        "compact_stats": compact.stats(),
+    }
+
+
+if __name__ == "__main__":
+    # python -m external_api.data_sources.compact_records
+    print(_benchmark())
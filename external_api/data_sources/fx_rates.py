@@ -0,0 +1,236 @@
+"""
+FX snapshots and local currency conversion of price records, shared by the commodity and metal sources
+"""
+
+import asyncio
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+import numpy as np
+
+from .local_cache import TtlCache
+
+logger = logging.getLogger("fx_rates")
+
+# 汇率快照的缓存时间
+FX_SNAPSHOT_TTL = 300
+
+# 按币种请求价格的函数：currency -> {"success": bool, "data": ...} 或 {"success": False, "error": str}
+PriceFetcher = Callable[[str], Awaitable[Dict[str, Any]]]
+
+
+def convert_records(
+    records: Dict[str, Dict[str, Any]], fields: Sequence[str], factors: Dict[str, float], decimals: int = 6
+) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Convert the numeric fields of price records into several currencies at once
+
+    Args:
+        records: Price records by symbol, e.g. {"COCOA": {"open": 9270, "current": 9590}}
+        fields: Numeric fields to convert, other fields are copied unchanged
+        factors: Units of each target currency per unit of the records' currency, e.g. {"EUR": 0.92}
+        decimals: Decimals kept in converted values
+
+    Returns:
+        Converted records by currency then symbol; fields that are missing or not numeric stay as they were
+    """
+    symbols = list(records)
+    currencies = list(factors)
+    values = np.full((len(symbols), len(fields)), np.nan)
+    for i, symbol in enumerate(symbols):
+        for j, field in enumerate(fields):
+            try:
+                values[i, j] = float(records[symbol][field])
+            except (KeyError, TypeError, ValueError):
+                pass
+    scale = np.array([factors[currency] for currency in currencies], dtype=float)
+    # 一次广播计算所有币种 x 品种 x 字段
+    converted = np.round(scale[:, None, None] * values[None, :, :], decimals)
+
+    result: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for c, currency in enumerate(currencies):
+        by_symbol = {}
+        for i, symbol in enumerate(symbols):
+            record = dict(records[symbol])
+            for j, field in enumerate(fields):
+                if not np.isnan(converted[c, i, j]):
+                    record[field] = float(converted[c, i, j])
+            by_symbol[symbol] = record
+        result[currency] = by_symbol
+    return result
+
+
+class FxRateProvider:
+    """FX rates read from the commodities market data API, where currency codes can be quoted like commodities
+
+    A quote of currency X in base B gives the price of one X in B, so one unit of B is worth 1 / price units of X.
+    Rates are cached per (base, currency) for ttl seconds, so a snapshot only requests the missing currencies.
+    """
+
+    def __init__(self, config: Dict[str, Any], ttl: float = FX_SNAPSHOT_TTL):
+        self._timeout = config["timeout"]
+        self.proxy_url = config["external_api_proxy_url"]
+        self._headers = {
+            "X-Original-Host": config["commodities_base_url"],
+            "X-Biz-Id": "matrix-agent",
+            "X-Request-Timeout": str(config["timeout"] - 5),
+        }
+        self.cache = TtlCache(ttl, max_entries=1000)
+
+    async def snapshot(self, base: str, currencies: List[str]) -> Dict[str, Any]:
+        """Get the value of one unit of base in each currency
+
+        Returns:
+            Dict[str, Any]: Snapshot, e.g.
+            {
+                "base": "USD",
+                "rates": {"EUR": 0.92, "VND": 25400.0},   # Units of currency per unit of base
+                "as_of": "2025-04-25 08:00:00",           # UTC time of the oldest rate used
+                "missing": ["XYZ"],                      # Currencies without a usable rate
+                "fetched": 1                              # Number of API requests made (0 or 1)
+            }
+
+        Raises:
+            Exceptions of the HTTP request, when rates had to be fetched and the request failed
+        """
+        base = base.upper()
+        rates: Dict[str, float] = {}
+        stamps: List[float] = []
+        to_fetch = []
+        for currency in dict.fromkeys(c.upper() for c in currencies):
+            if currency == base:
+                rates[currency] = 1.0
+                continue
+            cached = self.cache.get(f"{base}/{currency}")
+            if cached is None:
+                to_fetch.append(currency)
+            else:
+                rates[currency] = cached[0]
+                stamps.append(cached[1])
+
+        if to_fetch:
+            fetched_at = datetime.now(timezone.utc).timestamp()
+            quotes = await self._fetch_quotes(base, to_fetch)
+            for currency in to_fetch:
+                try:
+                    price = float(quotes[currency]["current"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if price > 0:
+                    rates[currency] = 1 / price
+                    stamps.append(fetched_at)
+                    self.cache.set(f"{base}/{currency}", [rates[currency], fetched_at])
+
+        as_of = datetime.fromtimestamp(min(stamps), timezone.utc).strftime("%Y-%m-%d %H:%M:%S") if stamps else None
+        missing = [c for c in dict.fromkeys(c.upper() for c in currencies) if c not in rates]
+        return {"base": base, "rates": rates, "as_of": as_of, "missing": missing, "fetched": 1 if to_fetch else 0}
+
+    async def _fetch_quotes(self, base: str, currencies: List[str]) -> Dict[str, Any]:
+        request_url = f"{self.proxy_url}/v1/market-data"
+        params = {"symbols": ",".join(currencies), "base": base}
+        async with aiohttp.ClientSession(trust_env=True) as session:
+            async with session.get(request_url, headers=self._headers, params=params, timeout=self._timeout) as response:
+                response.raise_for_status()
+                data = await response.json(content_type=None)
+        if isinstance(data, str):
+            data = json.loads(data)
+        if not isinstance(data, dict) or not data.get("success", False):
+            raise ValueError(f"FX rate request failed: {data}")
+        return data.get("rates", {})
+
+
+_fx_provider: Optional[FxRateProvider] = None
+
+
+def get_fx_provider(config: Dict[str, Any]) -> FxRateProvider:
+    """Get the FX rate provider shared by the sources, so they share cached rates"""
+    global _fx_provider
+    if _fx_provider is None:
+        _fx_provider = FxRateProvider(config)
+    return _fx_provider
+
+
+async def gather_with_fx(fx: FxRateProvider, base: str, currencies: List[str], base_fetch: Awaitable[Any]) -> Tuple[Any, Any]:
+    """Run the base price request and the FX snapshot concurrently, returning (base result, snapshot or exception)"""
+    base_result, snapshot = await asyncio.gather(base_fetch, fx.snapshot(base, currencies), return_exceptions=True)
+    if isinstance(base_result, BaseException):
+        raise base_result
+    if isinstance(snapshot, BaseException):
+        logger.warning(f"FX snapshot for {base} failed: {snapshot}")
+    return base_result, snapshot
+
+
+def derivation_provenance(currency: str, snapshot: Any) -> Dict[str, Any]:
+    """Describe how the prices of currency were obtained from a base price request and an FX snapshot"""
+    if not isinstance(snapshot, dict) or currency == snapshot["base"]:
+        return {"method": "api"}
+    return {"method": "derived", "base_currency": snapshot["base"], "fx_rate": snapshot["rates"][currency], "fx_as_of": snapshot["as_of"]}
+
+
+async def get_prices_multi(
+    fx: FxRateProvider,
+    fetch_price: PriceFetcher,
+    records_of: Callable[[Dict[str, Any]], Dict[str, Dict[str, Any]]],
+    fields: Sequence[str],
+    currency_codes: List[str],
+    base_currency: str = "USD",
+) -> Dict[str, Any]:
+    """Get price records in several currencies from one base currency request and one FX snapshot
+
+    The base prices and the FX snapshot are requested concurrently and the other currencies are derived locally with
+    convert_records. Currencies without an FX rate are requested directly with fetch_price.
+
+    Args:
+        fx: FX rate provider
+        fetch_price: Function requesting the prices in one currency
+        records_of: Function getting the price records by symbol from a successful fetch_price result
+        fields: Numeric fields of the records converted between currencies
+        currency_codes: Currency codes, e.g. ["USD", "EUR", "VND"]
+        base_currency: Currency the prices are fetched in
+
+    Returns:
+        Dict[str, Any]: The failed base result, or the records by currency, e.g.
+        {
+            "success": True,
+            "data": {
+                "base_currency": "USD",
+                "prices": {
+                    "EUR": {"records": {"COCOA": {"current": 8822.8, ...}}, "provenance": {"method": "derived", ...}}
+                },
+                "failed_currencies": [{"currency_code": "XYZ", "error": "..."}]
+            }
+        }
+
+    Raises:
+        Exceptions of the base currency request
+    """
+    base = str(base_currency or "").strip().upper()
+    currencies = list(dict.fromkeys(str(code).strip().upper() for code in currency_codes if str(code).strip()))
+    if not currencies:
+        return {"success": False, "error": "currency_codes is required, e.g. [\"USD\", \"EUR\"]"}
+
+    base_result, snapshot = await gather_with_fx(fx, base, currencies, fetch_price(base))
+    if not base_result["success"]:
+        return base_result
+
+    factors = snapshot["rates"] if isinstance(snapshot, dict) else {base: 1.0}
+    converted = convert_records(records_of(base_result), fields, {c: factors[c] for c in currencies if c in factors and c != base})
+    prices = {currency: {"records": records, "provenance": derivation_provenance(currency, snapshot)} for currency, records in converted.items()}
+    if base in currencies:
+        prices[base] = {"records": records_of(base_result), "provenance": {"method": "api"}}
+
+    # 没有汇率的币种直接请求
+    direct = [currency for currency in currencies if currency not in prices]
+    failed_currencies = []
+    for currency, result in zip(direct, await asyncio.gather(*(fetch_price(c) for c in direct))):
+        if result["success"]:
+            prices[currency] = {"records": records_of(result), "provenance": {"method": "api"}}
+        else:
+            failed_currencies.append({"currency_code": currency, "error": result["error"]})
+
+    return {
+        "success": True,
+        "data": {"base_currency": base, "prices": {c: prices[c] for c in currencies if c in prices}, "failed_currencies": failed_currencies},
+    }
@@ -0,0 +1,312 @@
+"""
+In-memory geohash index of locations and of the areas already searched around, used to answer nearby queries locally
+"""
+
+import math
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_BASE32_INDEX = {c: i for i, c in enumerate(_BASE32)}
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_MILE = 1.609344
+# 方位角名称对应的角度，nearby_search 结果只给出八方位
+BEARINGS = {
+    "north": 0.0,
+    "northeast": 45.0,
+    "east": 90.0,
+    "southeast": 135.0,
+    "south": 180.0,
+    "southwest": 225.0,
+    "west": 270.0,
+    "northwest": 315.0,
+}
+# 索引保留的地点数上限，超出后淘汰最久未更新的地点
+MAX_INDEXED_LOCATIONS = 50000
+
+
+def geohash_encode(latitude: float, longitude: float, precision: int) -> str:
+    """Encode a point as a geohash of precision characters"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        rng, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coordinate >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def geohash_bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """Get the (min_lat, min_lon, max_lat, max_lon) box of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _BASE32_INDEX[char]
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometers"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bearing_name(lat1: float, lon1: float, lat2: float, lon2: float) -> str:
+    """Compass direction from the first point to the second, as one of the eight BEARINGS names"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_lambda = math.radians(lon2 - lon1)
+    y = math.sin(d_lambda) * math.cos(phi2)
+    x = math.cos(phi1) * math.sin(phi2) - math.sin(phi1) * math.cos(phi2) * math.cos(d_lambda)
+    degrees = (math.degrees(math.atan2(y, x)) + 360) % 360
+    return list(BEARINGS)[int((degrees + 22.5) // 45) % 8]
+
+
+def destination_point(latitude: float, longitude: float, distance_km: float, bearing_degrees: float) -> Tuple[float, float]:
+    """Point reached from (latitude, longitude) after distance_km along bearing_degrees"""
+    delta = distance_km / EARTH_RADIUS_KM
+    theta = math.radians(bearing_degrees)
+    phi1 = math.radians(latitude)
+    lambda1 = math.radians(longitude)
+    phi2 = math.asin(math.sin(phi1) * math.cos(delta) + math.cos(phi1) * math.sin(delta) * math.cos(theta))
+    lambda2 = lambda1 + math.atan2(math.sin(theta) * math.sin(delta) * math.cos(phi1), math.cos(delta) - math.sin(phi1) * math.sin(phi2))
+    return math.degrees(phi2), (math.degrees(lambda2) + 540) % 360 - 180
+
+
+class GeoLocationIndex:
+    """Locations bucketed by geohash cell, plus a record of the cells already searched
+
+    Each location keeps the latest record seen for it, its coordinates (exact from location details, or estimated from
+    the distance and bearing of a nearby search result) and the search scopes it was returned for. A scope is a
+    category and language pair such as "hotels:en". A cell is covered for a scope once a nearby search was run from
+    its center, and coverage expires after coverage_ttl seconds. Queries whose cells are all covered can be answered
+    from the index alone. Locations with exact coordinates match every uncategorised ("*") scope, as details carry
+    no search scope. At most max_locations locations are kept, the least recently updated are dropped first.
+    """
+
+    def __init__(self, precision: int = 6, coverage_ttl: float = 86400, max_locations: int = MAX_INDEXED_LOCATIONS):
+        """Initialize the index
+
+        Args:
+            precision: Geohash length of the cells, 6 is about 1.2 km x 0.6 km
+            coverage_ttl: Seconds a searched cell stays covered
+            max_locations: Maximum number of locations kept
+        """
+        self.precision = precision
+        self.coverage_ttl = coverage_ttl
+        self.max_locations = max_locations
+        self._lock = threading.Lock()
+        # location_id -> {"record", "latitude", "longitude", "approximate", "scopes", "cell"}
+        self._locations: Dict[str, Dict[str, Any]] = {}
+        self._cells: Dict[str, Set[str]] = {}
+        # (geohash, scope) -> 覆盖过期时间
+        self._coverage: Dict[Tuple[str, str], float] = {}
+        self._counters = {"queries": 0, "local_hits": 0, "partial_hits": 0, "misses": 0, "cells_fetched": 0}
+
+    @staticmethod
+    def scope(category: Optional[str], language: str) -> str:
+        return f"{category or '*'}:{language}"
+
+    def add(
+        self,
+        location_id: str,
+        record: Optional[Dict[str, Any]] = None,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        approximate: bool = False,
+        scope: Optional[str] = None,
+    ) -> None:
+        """Add or update a location
+
+        Exact coordinates replace approximate ones but never the other way round, so a nearby result does not move
+        a location whose details were fetched.
+        """
+        location_id = str(location_id)
+        with self._lock:
+            # 重新插入到末尾，使字典顺序即更新顺序
+            entry = self._locations.pop(location_id, None)
+            if entry is None:
+                entry = {"record": None, "latitude": None, "longitude": None, "approximate": True, "scopes": set(), "cell": None}
+            self._locations[location_id] = entry
+            while len(self._locations) > self.max_locations:
+                self._drop(next(iter(self._locations)))
+            if record is not None:
+                entry["record"] = record
+            if scope:
+                entry["scopes"].add(scope)
+            if latitude is None or longitude is None:
+                return
+            if entry["latitude"] is not None and approximate and not entry["approximate"]:
+                return
+            self._remove_from_cell(location_id, entry)
+            entry.update(latitude=latitude, longitude=longitude, approximate=approximate)
+            entry["cell"] = geohash_encode(latitude, longitude, self.precision)
+            self._cells.setdefault(entry["cell"], set()).add(location_id)
+
+    def _drop(self, location_id: str) -> None:
+        self._remove_from_cell(location_id, self._locations.pop(location_id))
+
+    def _remove_from_cell(self, location_id: str, entry: Dict[str, Any]) -> None:
+        members = self._cells.get(entry["cell"]) if entry["cell"] is not None else None
+        if members is not None:
+            members.discard(location_id)
+            if not members:
+                del self._cells[entry["cell"]]
+
+    def add_nearby_results(self, latitude: float, longitude: float, results: Iterable[Dict[str, Any]], scope: str) -> None:
+        """Add the results of a nearby search run from (latitude, longitude), placing them by distance and bearing"""
+        for result in results:
+            location_id = result.get("location_id")
+            if not location_id:
+                continue
+            try:
+                distance_km = float(result.get("distance")) * KM_PER_MILE
+                bearing = BEARINGS[str(result.get("bearing", "")).lower()]
+            except (TypeError, ValueError, KeyError):
+                self.add(location_id, result, scope=scope)
+                continue
+            point = destination_point(latitude, longitude, distance_km, bearing)
+            self.add(location_id, result, point[0], point[1], approximate=True, scope=scope)
+
+    def cells_in_radius(self, latitude: float, longitude: float, radius_km: float) -> List[str]:
+        """Get the cells intersecting the circle of radius_km around a point"""
+        min_lat, min_lon, max_lat, max_lon = geohash_bounds(geohash_encode(latitude, longitude, self.precision))
+        cell_height = max_lat - min_lat
+        cell_width = max_lon - min_lon
+        lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+        # 靠近极点时经度跨度急剧增大，最多覆盖整圈
+        lon_delta = min(lat_delta / max(math.cos(math.radians(latitude)), 1e-6), 180.0)
+        cells: Set[str] = set()
+        lat = max(latitude - lat_delta, -90.0)
+        while lat <= min(latitude + lat_delta + cell_height, 90.0):
+            lon = longitude - lon_delta
+            while lon <= longitude + lon_delta + cell_width:
+                cell = geohash_encode(min(lat, 90.0), (lon + 540) % 360 - 180, self.precision)
+                if cell not in cells and self._cell_distance_km(cell, latitude, longitude) <= radius_km:
+                    cells.add(cell)
+                lon += cell_width
+            lat += cell_height
+        return list(cells)
+
+    def cell_of(self, latitude: float, longitude: float) -> str:
+        return geohash_encode(latitude, longitude, self.precision)
+
+    def is_covered(self, cell: str, scope: str) -> bool:
+        return self._coverage.get((cell, scope), 0) > time.time()
+
+    def mark_covered(self, cell: str, scope: str) -> None:
+        """Record that a nearby search for scope was run from inside cell"""
+        now = time.time()
+        with self._lock:
+            self._purge_coverage(now)
+            self._coverage[(cell, scope)] = now + self.coverage_ttl
+            self._counters["cells_fetched"] += 1
+
+    def _purge_coverage(self, now: float) -> None:
+        """Drop expired coverage entries, called with the lock held"""
+        for key in [key for key, expires in self._coverage.items() if expires <= now]:
+            del self._coverage[key]
+
+    def record_query(self, cells: int, uncovered: int) -> None:
+        """Count a query as a local hit, a partial hit or a miss by the number of cells it had to fetch"""
+        with self._lock:
+            self._counters["queries"] += 1
+            if uncovered == 0:
+                self._counters["local_hits"] += 1
+            elif uncovered < cells:
+                self._counters["partial_hits"] += 1
+            else:
+                self._counters["misses"] += 1
+
+    def nearby(self, latitude: float, longitude: float, radius_km: float, scope: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get the indexed locations within radius_km of a point, nearest first
+
+        Each record is a copy of the stored record with "distance" (miles, as a string like the API) and "bearing"
+        recomputed from the query point, and "approximate_position" telling whether the position is an estimate.
+        An uncategorised scope ("*:<language>") also matches locations with exact coordinates.
+        """
+        # 详情只给出精确坐标而没有搜索范围，未限定分类的查询也返回这些地点
+        any_category = scope is not None and scope.startswith("*:")
+        found = []
+        with self._lock:
+            for cell in self.cells_in_radius(latitude, longitude, radius_km):
+                for location_id in self._cells.get(cell, ()):
+                    entry = self._locations[location_id]
+                    if scope is not None and scope not in entry["scopes"] and not (any_category and not entry["approximate"]):
+                        continue
+                    distance_km = haversine_km(latitude, longitude, entry["latitude"], entry["longitude"])
+                    if distance_km <= radius_km:
+                        found.append((distance_km, location_id, entry))
+        found.sort(key=lambda item: item[0])
+        records = []
+        for distance_km, location_id, entry in found[:limit]:
+            record = dict(entry["record"] or {"location_id": location_id})
+            record["distance"] = f"{distance_km / KM_PER_MILE:.6f}"
+            record["bearing"] = bearing_name(latitude, longitude, entry["latitude"], entry["longitude"])
+            record["approximate_position"] = entry["approximate"]
+            records.append(record)
+        return records
+
+    def _cell_distance_km(self, cell: str, latitude: float, longitude: float) -> float:
+        """Distance from a point to the nearest point of a cell, 0 when inside it"""
+        min_lat, min_lon, max_lat, max_lon = geohash_bounds(cell)
+        # 将经度平移到离网格中心最近的一侧，处理跨越 ±180° 的情况
+        center_lon = (min_lon + max_lon) / 2
+        longitude = center_lon + (longitude - center_lon + 540) % 360 - 180
+        return haversine_km(latitude, longitude, min(max(latitude, min_lat), max_lat), min(max(longitude, min_lon), max_lon))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get index statistics
+
+        Returns:
+            Dict[str, Any]: Statistics, e.g.
+            {
+                "locations": 120,          # Indexed locations
+                "positioned": 95,          # Locations with coordinates
+                "covered_cells": 14,       # Unexpired (cell, scope) coverage entries
+                "queries": 40,             # Nearby queries served
+                "local_hits": 31,          # Queries answered without any request
+                "partial_hits": 5,         # Queries that fetched only part of their cells
+                "misses": 4,               # Queries that fetched all their cells
+                "cells_fetched": 22,       # Nearby searches run through the API, each covering one cell
+                "hit_rate": 0.775          # local_hits / queries
+            }
+        """
+        now = time.time()
+        with self._lock:
+            self._purge_coverage(now)
+            return {
+                "locations": len(self._locations),
+                "positioned": sum(1 for entry in self._locations.values() if entry["cell"] is not None),
+                "covered_cells": len(self._coverage),
+                **self._counters,
+                "hit_rate": round(self._counters["local_hits"] / self._counters["queries"], 4) if self._counters["queries"] else None,
+            }
@@ -0,0 +1,88 @@
+"""
+Incremental decoding of the items of one JSON array inside a streamed response body
+"""
+
+import codecs
+import json
+import re
+from typing import Any, List, Optional
+
+
+class JsonArrayStream:
+    """Decode the items of the array stored under key while a JSON document is still arriving
+
+    Text is fed chunk by chunk with feed(), which returns the items completed so far; each item is decoded on its own,
+    so the full document tree is never built and consumed text is released. Text before the array is kept so that,
+    if the key never appears (e.g. an error response), finish() can decode the whole document instead.
+    Only the first occurrence of the key is used, which suits documents where the key is unique.
+    """
+
+    _WHITESPACE = " \t\r\n"
+
+    def __init__(self, key: str):
+        self._key_pattern = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._search_from = 0
+        self._pos = 0
+        self.found = False
+        self.done = False
+        self.items_decoded = 0
+        self.bytes_fed = 0
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """Feed the next chunk of the body and return the array items completed by it"""
+        self.bytes_fed += len(chunk)
+        if self.done:
+            return []
+        self._buffer += self._text_decoder.decode(chunk)
+
+        if not self.found:
+            match = self._key_pattern.search(self._buffer, self._search_from)
+            if match is None:
+                # 键名可能跨块，下次从末尾附近继续查找
+                self._search_from = max(len(self._buffer) - 256, 0)
+                return []
+            self.found = True
+            self._buffer = self._buffer[match.end() :]
+            self._pos = 0
+
+        items = []
+        buffer = self._buffer
+        pos = self._pos
+        while True:
+            while pos < len(buffer) and (buffer[pos] in self._WHITESPACE or buffer[pos] == ","):
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == "]":
+                self.done = True
+                break
+            try:
+                item, end = self._decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # 当前元素尚未完整到达
+                break
+            items.append(item)
+            pos = end
+
+        self._buffer = buffer[pos:]
+        self._pos = 0
+        self.items_decoded += len(items)
+        return items
+
+    def finish(self) -> Optional[Any]:
+        """Signal the end of the body
+
+        Returns:
+            The whole decoded document if the key never appeared, otherwise None
+
+        Raises:
+            ValueError: The array was truncated or malformed
+        """
+        if not self.found:
+            return json.loads(self._buffer + self._text_decoder.decode(b"", final=True))
+        if not self.done:
+            raise ValueError(f"Incomplete JSON array after {self.items_decoded} items")
+        return None
@@ -0,0 +1,224 @@
+"""
+Local state shared by data sources: bounded seen-ID tracking, persistent key-value state and TTL caches
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger("local_cache")
+
+
+def atomic_write_json(path: str, data: object) -> None:
+    """Write JSON to path through a temporary file so readers never see a partial file"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def read_json(path: Optional[str], default: object) -> object:
+    """Read a JSON file, falling back to default when it is missing or unreadable"""
+    if not path or not os.path.exists(path):
+        return default
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable state file {path}: {e}")
+        return default
+
+
+class SeenIdStore:
+    """Bounded per-key record of IDs already seen
+
+    Each key (e.g. a stock symbol) keeps at most max_ids_per_key IDs, oldest evicted first, and at most
+    max_keys keys are tracked, least recently used evicted first. When path is given the store is loaded
+    from and saved to a JSON file.
+    """
+
+    def __init__(self, max_ids_per_key: int = 1000, max_keys: int = 10000, path: Optional[str] = None):
+        self.max_ids_per_key = max_ids_per_key
+        self.max_keys = max_keys
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._keys: "OrderedDict[str, OrderedDict[str, None]]" = OrderedDict()
+        for key, ids in dict(read_json(path, {})).items():
+            self._keys[key] = OrderedDict((i, None) for i in ids[-max_ids_per_key:])
+
+    def contains(self, key: str, item_id: str) -> bool:
+        """Check whether item_id was already seen under key"""
+        with self._lock:
+            return item_id in self._keys.get(key, ())
+
+    def has_key(self, key: str) -> bool:
+        """Check whether anything was recorded under key yet"""
+        with self._lock:
+            return key in self._keys
+
+    def add(self, key: str, item_ids: Iterable[str]) -> None:
+        """Record item_ids as seen under key (the key is created even if item_ids is empty)"""
+        with self._lock:
+            ids = self._keys.pop(key, None)
+            if ids is None:
+                ids = OrderedDict()
+            for item_id in item_ids:
+                ids.pop(item_id, None)
+                ids[item_id] = None
+            while len(ids) > self.max_ids_per_key:
+                ids.popitem(last=False)
+            self._keys[key] = ids
+            while len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+            self._dirty = True
+
+    def forget(self, key: Optional[str] = None) -> None:
+        """Forget the IDs of one key, or of every key"""
+        with self._lock:
+            if key is None:
+                self._keys.clear()
+            else:
+                self._keys.pop(key, None)
+            self._dirty = True
+
+    def save(self) -> None:
+        """Persist the store if it has a path and changed since the last save"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = {key: list(ids) for key, ids in self._keys.items()}
+            self._dirty = False
+        try:
+            atomic_write_json(self.path, snapshot)
+        except OSError as e:
+            logger.warning(f"Failed to save seen IDs to {self.path}: {e}")
+
+
+class JsonStateStore:
+    """Small persistent key-value store for resumable state such as pagination checkpoints
+
+    Values must be JSON serializable. When path is None the store only lives in memory.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._data: Dict[str, Any] = dict(read_json(path, {}))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._data.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._dirty = True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self._dirty = True
+
+    def save(self) -> None:
+        """Persist the store if it has a path and changed since the last save"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = json.loads(json.dumps(self._data))
+            self._dirty = False
+        try:
+            atomic_write_json(self.path, snapshot)
+        except OSError as e:
+            logger.warning(f"Failed to save state to {self.path}: {e}")
+
+
+class TtlCache:
+    """Bounded key-value cache whose entries expire ttl seconds after being set
+
+    The least recently used entry is evicted once max_entries is exceeded. Values must be JSON serializable when
+    path is given, in which case the cache is loaded from and saved to that JSON file.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 10000, path: Optional[str] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._counters = {"hits": 0, "misses": 0, "expired": 0}
+        now = time.time()
+        for key, (expires_at, value) in dict(read_json(path, {})).items():
+            if expires_at > now:
+                self._entries[key] = (expires_at, value)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a live entry, or default if it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return default
+            if entry[0] <= time.time():
+                del self._entries[key]
+                self._dirty = True
+                self._counters["expired"] += 1
+                self._counters["misses"] += 1
+                return default
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store value under key for ttl seconds (the cache ttl by default)"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time() + (self.ttl if ttl is None else ttl), value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._dirty = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._dirty = True
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics: entries, hits, misses and expired lookups"""
+        with self._lock:
+            return {"entries": len(self._entries), **self._counters}
+
+    def save(self) -> None:
+        """Persist the live entries if the cache has a path and changed since the last save"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            now = time.time()
+            snapshot = {key: [expires_at, value] for key, (expires_at, value) in self._entries.items() if expires_at > now}
+            self._dirty = False
+        try:
+            atomic_write_json(self.path, snapshot)
+        except OSError as e:
+            logger.warning(f"Failed to save cache to {self.path}: {e}")
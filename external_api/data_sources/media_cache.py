@@ -0,0 +1,305 @@
+"""
+Content-addressed local media cache with a concurrent, resumable download pipeline
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import posixpath
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import aiohttp
+
+from .local_cache import JsonStateStore
+
+logger = logging.getLogger("media_cache")
+
+# 流式下载的分块大小
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# 下载进度事件的最小间隔字节数
+PROGRESS_EVERY_BYTES = 256 * 1024
+
+
+def hash_file(path: str) -> Tuple[Any, int]:
+    """Hash a file with SHA-256, returning (hash object, size) so more data can still be fed to the hash"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+            size += len(block)
+    return digest, size
+
+
+def _content_range_size(value: Optional[str]) -> Optional[int]:
+    """Get the complete size from a Content-Range header such as "bytes */12345" """
+    if not value or "/" not in value:
+        return None
+    size = value.rsplit("/", 1)[1].strip()
+    return int(size) if size.isdigit() else None
+
+
+class MediaCache:
+    """Local media store where files are named by the SHA-256 of their content
+
+    Identical media referenced by different pins or URLs is stored once. An index maps each downloaded URL to its
+    content hash, and interrupted downloads are kept as partial files so they can be resumed with HTTP range requests.
+    Layout: root/objects/<2 hex>/<sha256><ext>, root/partial/<url hash>.part, root/index.json
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self.index = JsonStateStore(os.path.join(root_dir, "index.json"))
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """Get the cached file entry of url, or None if it was never downloaded or the file is gone"""
+        entry = self.index.get(url)
+        if entry is None:
+            return None
+        path = self.object_path(entry["sha256"], entry["ext"])
+        if not os.path.exists(path):
+            return None
+        return {**entry, "path": path}
+
+    def object_path(self, sha256: str, ext: str) -> str:
+        return os.path.join(self.root_dir, "objects", sha256[:2], f"{sha256}{ext}")
+
+    def partial_path(self, url: str) -> str:
+        return os.path.join(self.root_dir, "partial", hashlib.sha1(url.encode("utf-8")).hexdigest() + ".part")
+
+    def commit(self, url: str, partial_path: str, sha256: Optional[str] = None, size: Optional[int] = None) -> Dict[str, Any]:
+        """Move a completed download into the content-addressed store and index it
+
+        sha256 and size are computed from the file when not given; prefetch passes them from the hash it keeps
+        while downloading, so the file is not read again.
+        """
+        if sha256 is None or size is None:
+            digest, size = hash_file(partial_path)
+            sha256 = digest.hexdigest()
+        ext = posixpath.splitext(urlparse(url).path)[1].lower()[:8]
+        path = self.object_path(sha256, ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            # 内容相同的文件已存在，丢弃重复下载
+            os.remove(partial_path)
+        else:
+            os.replace(partial_path, path)
+        entry = {"sha256": sha256, "ext": ext, "bytes": size}
+        self.index.set(url, entry)
+        self.index.save()
+        return {**entry, "path": path}
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics: indexed URLs, stored objects and their total size"""
+        objects = 0
+        size = 0
+        objects_dir = os.path.join(self.root_dir, "objects")
+        for dirpath, _, filenames in os.walk(objects_dir):
+            for name in filenames:
+                objects += 1
+                size += os.path.getsize(os.path.join(dirpath, name))
+        return {"root_dir": self.root_dir, "urls": len(self.index), "objects": objects, "bytes": size}
+
+
+async def prefetch(
+    cache: MediaCache,
+    urls: List[str],
+    headers: Optional[Dict[str, str]] = None,
+    max_concurrency: int = 4,
+    byte_budget: Optional[int] = None,
+    timeout: float = 60,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Download urls into cache with a bounded worker pool, yielding progress events
+
+    Events are dicts with an "event" key:
+        cached     {"url", "path", "bytes"}               already in the cache, nothing downloaded
+        started    {"url", "total", "resumed_from"}       download started (total may be None)
+        progress   {"url", "bytes", "total"}              bytes received so far for this URL
+        completed  {"url", "path", "bytes", "sha256"}     file stored in the cache
+        skipped    {"url", "reason"}                      not downloaded because the byte budget is spent
+        failed     {"url", "error"}                       download failed, partial data is kept for resume
+
+    byte_budget caps the bytes downloaded by this call; a download that would exceed it is skipped, or stopped and
+    kept as a partial file when its size is unknown upfront. Stopping iteration early cancels the workers.
+    """
+    pending: "asyncio.Queue[str]" = asyncio.Queue()
+    for url in dict.fromkeys(u for u in urls if u):
+        pending.put_nowait(url)
+    events: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+    budget = {"remaining": byte_budget}
+
+    def _reserve(size: int) -> bool:
+        if budget["remaining"] is None:
+            return True
+        if size > budget["remaining"]:
+            return False
+        budget["remaining"] -= size
+        return True
+
+    async def _download(session: aiohttp.ClientSession, url: str) -> None:
+        cached = cache.lookup(url)
+        if cached is not None:
+            await events.put({"event": "cached", "url": url, "path": cached["path"], "bytes": cached["bytes"]})
+            return
+
+        partial_path = cache.partial_path(url)
+        os.makedirs(os.path.dirname(partial_path), exist_ok=True)
+        resume_from = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+        request_headers = dict(headers or {})
+        if resume_from:
+            request_headers["Range"] = f"bytes={resume_from}-"
+
+        async with session.get(url, headers=request_headers, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            if response.status != 416 or not resume_from:
+                await _receive(url, response, partial_path, resume_from)
+                return
+            if _content_range_size(response.headers.get("Content-Range")) == resume_from:
+                # 已下载部分即为完整文件，在线程中计算哈希避免阻塞事件循环
+                entry = await asyncio.to_thread(cache.commit, url, partial_path)
+                await events.put({"event": "completed", "url": url, **entry})
+                return
+        # 部分文件比对象大或对象已变化，丢弃后从头下载
+        os.remove(partial_path)
+        await _download(session, url)
+
+    async def _receive(url: str, response: aiohttp.ClientResponse, partial_path: str, resume_from: int) -> None:
+        response.raise_for_status()
+        if response.status != 206:
+            # 服务器不支持断点续传，从头下载
+            resume_from = 0
+        remaining = response.content_length
+        total = remaining + resume_from if remaining is not None else None
+
+        if remaining is not None and not _reserve(remaining):
+            await events.put({"event": "skipped", "url": url, "reason": "byte_budget"})
+            return
+        await events.put({"event": "started", "url": url, "total": total, "resumed_from": resume_from})
+
+        # 边写边计算哈希，续传时先在线程中读入已下载部分
+        if resume_from:
+            digest, _ = await asyncio.to_thread(hash_file, partial_path)
+        else:
+            digest = hashlib.sha256()
+        received = resume_from
+        last_report = received
+        with open(partial_path, "ab" if resume_from else "wb") as f:
+            async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                if remaining is None and not _reserve(len(chunk)):
+                    await events.put({"event": "skipped", "url": url, "reason": "byte_budget"})
+                    return
+                f.write(chunk)
+                digest.update(chunk)
+                received += len(chunk)
+                if received - last_report >= PROGRESS_EVERY_BYTES:
+                    last_report = received
+                    await events.put({"event": "progress", "url": url, "bytes": received, "total": total})
+
+        entry = cache.commit(url, partial_path, digest.hexdigest(), received)
+        await events.put({"event": "completed", "url": url, **entry})
+
+    async def _worker(session: aiohttp.ClientSession) -> None:
+        while True:
+            try:
+                url = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                await _download(session, url)
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                await events.put({"event": "failed", "url": url, "error": f"Request timeout (timeout={timeout}s)"})
+            except Exception as e:
+                logger.warning(f"Media download of {url} failed: {e}")
+                await events.put({"event": "failed", "url": url, "error": str(e)})
+
+    async with aiohttp.ClientSession(trust_env=True) as session:
+        workers = [asyncio.create_task(_worker(session)) for _ in range(max(1, min(max_concurrency, pending.qsize())))]
+
+        async def _close_when_done() -> None:
+            await asyncio.gather(*workers, return_exceptions=True)
+            await events.put(None)
+
+        closer = asyncio.create_task(_close_when_done())
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield event
+        finally:
+            for task in workers + [closer]:
+                task.cancel()
+            await asyncio.gather(*workers, closer, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    from aiohttp import web
+
+    # 本地 HTTP 服务自检：断点续传、内容去重、416 校验和提前结束时取消下载
+    BODY = os.urandom(300000)
+
+    async def _serve(request: web.Request) -> web.StreamResponse:
+        if request.match_info["name"] == "slow.mp4":
+            await asyncio.sleep(30)
+        requested = request.headers.get("Range")
+        if requested:
+            start = int(requested[len("bytes=") :].rstrip("-"))
+            if start >= len(BODY):
+                return web.Response(status=416, headers={"Content-Range": f"bytes */{len(BODY)}"})
+            return web.Response(status=206, body=BODY[start:], headers={"Content-Range": f"bytes {start}-{len(BODY) - 1}/{len(BODY)}"})
+        return web.Response(body=BODY)
+
+    async def _events(cache: MediaCache, urls: List[str]) -> List[Dict[str, Any]]:
+        return [event async for event in prefetch(cache, urls) if event["event"] != "progress"]
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/{name}", _serve)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        base = f"http://127.0.0.1:{runner.addresses[0][1]}"
+        try:
+            cache = MediaCache(tempfile.mkdtemp())
+
+            # 续传：已有前 100000 字节的部分文件
+            url = f"{base}/a.jpg"
+            os.makedirs(os.path.dirname(cache.partial_path(url)), exist_ok=True)
+            with open(cache.partial_path(url), "wb") as f:
+                f.write(BODY[:100000])
+            events = await _events(cache, [url])
+            assert events[0] == {"event": "started", "url": url, "total": len(BODY), "resumed_from": 100000}, events
+            assert events[-1]["sha256"] == hashlib.sha256(BODY).hexdigest(), events
+
+            # 去重：内容相同的另一个 URL 只保存一份
+            events = await _events(cache, [f"{base}/b.jpg", url])
+            assert sorted(e["event"] for e in events) == ["cached", "completed", "started"], events
+            assert cache.stats()["objects"] == 1 and cache.stats()["urls"] == 2
+
+            # 416：部分文件恰为完整文件时直接提交，比对象大时丢弃后重新下载
+            for name, partial in (("c.jpg", BODY), ("d.jpg", BODY + b"stale")):
+                url = f"{base}/{name}"
+                with open(cache.partial_path(url), "wb") as f:
+                    f.write(partial)
+                events = await _events(cache, [url])
+                assert events[-1]["event"] == "completed" and events[-1]["bytes"] == len(BODY), events
+
+            # 提前结束：未完成的下载被取消
+            stream = prefetch(cache, [f"{base}/e.jpg", f"{base}/slow.mp4"], max_concurrency=2)
+            async for event in stream:
+                if event["event"] == "completed":
+                    break
+            await stream.aclose()
+            leaked = [t for t in asyncio.all_tasks() if t.get_coro().__qualname__.startswith("prefetch.")]
+            assert not leaked, f"download tasks leaked: {leaked}"
+            print("ok:", cache.stats())
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(main())
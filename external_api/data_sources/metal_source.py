@@ -5,15 +5,22 @@ Metal data source implementation
 import asyncio
 import json
 import logging
+import os
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 import aiohttp
 
 from .base import BaseAPI
+from .fx_rates import get_fx_provider, get_prices_multi
+from .payload_log import get_payload_logger
+from .price_recorder import DEFAULT_SAMPLE_INTERVAL, PriceRecorder, PriceSampler, create_multi_currency_sampler, recorded_history
 
 logger = logging.getLogger("metal_source")
 
+# 多币种换算时按汇率换算的价格字段
+METAL_PRICE_FIELDS = ("bid", "mid", "high", "low")
+
 
 class MetalSource(BaseAPI):
     """Metal price data source based on Metal API"""
@@ -34,6 +41,12 @@ class MetalSource(BaseAPI):
             "X-Biz-Id": "matrix-agent",
             "X-Request-Timeout": str(config["timeout"] - 5),
         }
+        self._payload_log = get_payload_logger(config)
+        self._fx = get_fx_provider(config)
+        # 本地价格历史，配置了 cache_dir 时启用
+        self.price_recorder: Optional[PriceRecorder] = None
+        if config.get("cache_dir"):
+            self.price_recorder = PriceRecorder(os.path.join(config["cache_dir"], "metal_history"))
 
     @property
     def source_name(self) -> str:
@@ -108,7 +121,7 @@ class MetalSource(BaseAPI):
             if not isinstance(data, dict):
                 raise ValueError(f"Invalid API response format: {data}")
 
-            print(data)
+            self._payload_log.log(self.source_name, "metal_price", data)
             result = {}
             for metal, info in data.get("data", {}).items():
                 metal_info = {
@@ -144,6 +157,126 @@ class MetalSource(BaseAPI):
             logger.exception(e)
             return {"success": False, "error": error_msg}
 
+    async def get_metal_price_multi(self, currency_codes: List[str], base_currency: str = "USD") -> Dict[str, Any]:
+        """
+        Get metal prices in several currencies at once.
+
+        Prices are fetched once in base_currency together with one FX snapshot, and the other currencies are derived
+        locally, so N currencies cost about 2 requests. Currencies without an FX rate are fetched directly.
+        Each currency is tagged with how its prices were obtained.
+
+        Args:
+            currency_codes(List[str]): Currency codes, e.g. ["USD", "EUR", "CNY"]
+            base_currency(str): Currency the prices are fetched in, default "USD"
+
+        Returns:
+            Dict[str, Any]: Dictionary containing the prices by currency, e.g.
+            {
+                "success": True,
+                "data": {
+                    "base_currency": "USD",
+                    "prices": {
+                        "USD": {
+                            "data": {"gold": {"currency": "USD", "name": "Gold", "bid": 3318.3, "mid": 3319.3, ...}},  # Same as get_metal_price data
+                            "provenance": {"method": "api"}  # Fetched from the API
+                        },
+                        "EUR": {
+                            "data": {"gold": {"currency": "EUR", "name": "Gold", "bid": 3052.84, "mid": 3053.76, ...}},
+                            "provenance": {              # Derived from the base currency prices
+                                "method": "derived",
+                                "base_currency": "USD",
+                                "fx_rate": 0.92,         # Units of EUR per USD
+                                "fx_as_of": "2025-04-25 08:00:00"  # UTC time of the FX rate
+                            }
+                        }
+                    },
+                    "failed_currencies": [           # Currencies whose prices could not be obtained
+                        {"currency_code": "XYZ", "error": "..."}
+                    ]
+                }
+            }
+        """
+        try:
+            result = await self._get_prices_multi(currency_codes, base_currency)
+        except Exception as e:
+            error_msg = f"Error occurred while getting metal prices: {str(e)}"
+            logger.error(error_msg)
+            logger.exception(e)
+            return {"success": False, "error": error_msg}
+        if not result["success"]:
+            return result
+
+        prices = {}
+        for currency, entry in result["data"]["prices"].items():
+            # 换算得到的记录仍带着基准币种，改为目标币种
+            for info in entry["records"].values():
+                info["currency"] = currency
+            prices[currency] = {"data": entry["records"], "provenance": entry["provenance"]}
+        return {"success": True, "data": {**result["data"], "prices": prices}}
+
+    async def _get_prices_multi(self, currency_codes: List[str], base_currency: str = "USD") -> Dict[str, Any]:
+        """Get metal price records by currency, see fx_rates.get_prices_multi"""
+        return await get_prices_multi(self._fx, self.get_metal_price, lambda result: result["data"]["data"], METAL_PRICE_FIELDS, currency_codes, base_currency)
+
+    def create_price_sampler(self, currency_codes: Optional[List[str]] = None, interval: float = DEFAULT_SAMPLE_INTERVAL) -> PriceSampler:
+        """Create a sampler recording metal mid prices into the local price history.
+        Each round requests the prices once through get_metal_price_multi and appends one sample per metal and
+        currency, so get_metal_price_history can answer without any request.
+
+        Args:
+            currency_codes(List[str]): Currency codes to record, defaults to ["USD"]
+            interval(float): Seconds between rounds, defaults to 300
+
+        Returns:
+            PriceSampler: Sampler; start() runs it in the background, stop() stops it, run(max_rounds) runs in place
+
+        Raises:
+            ValueError: cache_dir is not configured
+        """
+        currencies = currency_codes or ["USD"]
+        return create_multi_currency_sampler(self.price_recorder, lambda: self._get_prices_multi(currencies), "mid", self._history_symbol, interval)
+
+    async def get_metal_price_history(
+        self,
+        metal: str,
+        currency_code: str = "USD",
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        interval: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Get the recorded mid price history of a metal, read from the local price history without any request.
+
+        History exists only for the metals and currencies recorded by a sampler from create_price_sampler().
+
+        Args:
+            metal(str): Metal type as returned by get_metal_price, e.g. "gold"
+            currency_code(str): Currency code, e.g. "USD"
+            start(str): Start time (UTC, inclusive), "YYYY-MM-DD HH:MM:SS" or "YYYY-MM-DD", defaults to the oldest sample
+            end(str): End time (UTC, exclusive), same format, defaults to the latest sample
+            interval(str): OHLC bucket size, one of "1m", "5m", "15m", "30m", "1h", "4h", "1d", "1wk"; raw samples if omitted
+
+        Returns:
+            Dict[str, Any]: Dictionary containing the history, e.g.
+            {
+                "success": True,
+                "data": {
+                    "symbol": "gold/USD",
+                    "interval": "1h",
+                    "count": 1,
+                    "bars": [                  # "samples": [{"time": ..., "price": ...}] when interval is omitted
+                        {"time": "2025-04-25 17:00:00", "open": 3319.3, "high": 3321.0, "low": 3317.9, "close": 3320.4, "samples": 12}
+                    ]
+                }
+            }
+        """
+        return recorded_history(self.price_recorder, self._history_symbol(metal, currency_code), start, end, interval)
+
+    @staticmethod
+    def _history_symbol(metal: str, currency_code: str) -> str:
+        """Symbol of a metal in the price history, normalised the same way when recording and reading"""
+        return f"{metal.strip().lower()}/{currency_code.strip().upper()}"
+
     def _parse_time(self, time_str: str) -> str:
         """Parse time string"""
         # "2025-04-25T17:00:00Z"
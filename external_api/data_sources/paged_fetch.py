@@ -0,0 +1,155 @@
+"""
+Bounded-window page fetching that stops at the first short page, shared by the paginated search sources
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# 单页请求函数：(page, page_size) -> {"success": bool, "data": [...]} 或 {"success": False, "error": str}
+PageFetcher = Callable[[int, int], Awaitable[Dict[str, Any]]]
+
+
+def plan_pages(num_results: int, max_page_size: int) -> List[Tuple[int, int]]:
+    """Split num_results into (page, page_size) requests, the last page holding the remainder"""
+    if num_results <= 0:
+        return []
+    page_size = min(num_results, max_page_size)
+    plan = [(page, page_size) for page in range(1, num_results // page_size + 1)]
+    if num_results % page_size:
+        plan.append((len(plan) + 1, num_results % page_size))
+    return plan
+
+
+def new_page_stats(plan: List[Tuple[int, int]]) -> Dict[str, Any]:
+    """Initial paging statistics of a plan, see iter_pages"""
+    return {"pages_planned": len(plan), "pages_requested": 0, "pages_completed": 0, "pages_cancelled": 0, "pages_saved": 0, "last_page": None}
+
+
+async def iter_pages(
+    fetch_page: PageFetcher, plan: List[Tuple[int, int]], window: int, stats: Optional[Dict[str, Any]] = None
+) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """Fetch the planned pages with at most window requests in flight, yielding (page, result) as pages complete
+
+    Pages are issued in order. A successful page with fewer results than it asked for is the last page: no page after
+    it is issued, pages after it still in flight are cancelled and their results are dropped. Failed pages do not end
+    the search. Requests still in flight when the generator is closed are cancelled and awaited, so a consumer that
+    stops early should close it (e.g. with contextlib.aclosing).
+
+    Args:
+        fetch_page: Function fetching one page
+        plan: (page, page_size) requests from plan_pages
+        window: Maximum number of pages in flight
+        stats: Optional dict filled with the paging statistics, e.g.
+            {
+                "pages_planned": 25,     # Pages needed if every page were full
+                "pages_requested": 6,    # Pages issued
+                "pages_completed": 4,    # Pages whose response arrived
+                "pages_cancelled": 2,    # Issued pages cancelled after the last page was found
+                "pages_saved": 21,       # Planned pages never issued or cancelled
+                "last_page": 3           # First short page, None if every page was full
+            }
+    """
+    stats = stats if stats is not None else {}
+    stats.update(new_page_stats(plan))
+    sizes = dict(plan)
+    last_page = plan[-1][0] if plan else 0
+    pending: Dict[asyncio.Future, int] = {}
+    dropped: List[asyncio.Future] = []
+    next_index = 0
+    try:
+        while True:
+            while next_index < len(plan) and len(pending) < window and plan[next_index][0] <= last_page:
+                page, page_size = plan[next_index]
+                next_index += 1
+                pending[asyncio.ensure_future(fetch_page(page, page_size))] = page
+                stats["pages_requested"] += 1
+            if not pending:
+                break
+
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=lambda t: pending[t]):
+                page = pending.pop(task)
+                stats["pages_completed"] += 1
+                if page > last_page:
+                    continue
+                result = task.result()
+                if result["success"] and len(result["data"]) < sizes[page]:
+                    # 短页即最后一页，取消其后的预取请求
+                    last_page = page
+                    stats["last_page"] = page
+                    for other, other_page in list(pending.items()):
+                        if other_page > last_page and not other.done():
+                            other.cancel()
+                            dropped.append(other)
+                            del pending[other]
+                            stats["pages_cancelled"] += 1
+                yield page, result
+    finally:
+        for task in pending:
+            task.cancel()
+        # 等待被取消的请求结束，避免泄漏连接
+        if pending or dropped:
+            await asyncio.gather(*pending, *dropped, return_exceptions=True)
+            stats["pages_cancelled"] += sum(1 for task in pending if task.cancelled())
+        stats["pages_saved"] = stats["pages_planned"] - stats["pages_requested"] + stats["pages_cancelled"]
+
+
+async def iter_page_items(
+    fetch_page: PageFetcher,
+    plan: List[Tuple[int, int]],
+    window: int,
+    key: str,
+    limit: int,
+    ordered: bool = True,
+    stats: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Fetch pages like iter_pages and yield their items one by one, skipping items already yielded
+
+    Args:
+        fetch_page: Function fetching one page
+        plan: (page, page_size) requests from plan_pages
+        window: Maximum number of pages in flight
+        key: Item field identifying duplicates, items without it are never treated as duplicates
+        limit: Maximum number of items yielded
+        ordered: Yield in page order, each page as soon as it and all pages before it have arrived; otherwise yield
+            pages in arrival order. Failed pages are skipped in both modes
+        stats: Optional dict filled with the paging statistics, see iter_pages
+    """
+    seen = set()
+    buffered: Dict[int, List[Dict[str, Any]]] = {}
+    next_page = 1
+    yielded = 0
+    pages = iter_pages(fetch_page, plan, window, stats)
+    try:
+        async for page, result in pages:
+            buffered[page] = result["data"] if result["success"] else []
+            # 顺序模式只产出从 next_page 起连续到达的页
+            ready = []
+            if ordered:
+                while next_page in buffered:
+                    ready.append(buffered.pop(next_page))
+                    next_page += 1
+            else:
+                ready.append(buffered.pop(page))
+            for items in ready:
+                for item in items:
+                    item_key = item.get(key)
+                    if item_key is not None:
+                        if item_key in seen:
+                            continue
+                        seen.add(item_key)
+                    yield item
+                    yielded += 1
+                    if yielded >= limit:
+                        return
+    finally:
+        # 调用方提前结束迭代时取消未完成的分页请求
+        await pages.aclose()
+
+
+async def fetch_pages(fetch_page: PageFetcher, plan: List[Tuple[int, int]], window: int) -> Tuple[List[Tuple[int, Dict[str, Any]]], Dict[str, Any]]:
+    """Fetch pages like iter_pages and collect them, returning ([(page, result)] in page order, stats)"""
+    stats: Dict[str, Any] = {}
+    results = [item async for item in iter_pages(fetch_page, plan, window, stats)]
+    results.sort(key=lambda item: item[0])
+    return results, stats
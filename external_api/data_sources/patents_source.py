@@ -2,17 +2,21 @@
 专利数据源实现
 """
 
-import asyncio
 import logging
-import math
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 import aiohttp
 
 from .base import BaseAPI
+from .paged_fetch import PageFetcher, fetch_pages, iter_page_items, plan_pages
 
 logger = logging.getLogger("patents_source")
 
+# 每页最大数量
+MAX_PAGE_SIZE = 50
+# 同时在途的分页请求数
+MAX_CONCURRENT_PAGES = 3
+
 
 class PatentSource(BaseAPI):
     """Patent data source"""
@@ -143,7 +147,15 @@ class PatentSource(BaseAPI):
                                 "publicationNumber": "...",
                                 "pdfUrl": "..."
                             }
-                        ]
+                        ],
+                        "paging": {              # Page requests; pages after the first short page are not fetched
+                            "pages_planned": 10,
+                            "pages_requested": 4,
+                            "pages_completed": 3,
+                            "pages_cancelled": 1,
+                            "pages_saved": 7,    # Pages never requested or cancelled
+                            "last_page": 2       # First page with fewer results than requested, None if all were full
+                        }
                     }
                 }
         """
@@ -165,49 +177,16 @@ class PatentSource(BaseAPI):
         #     ...     print(f"Search succeeded, {len(result['data']['patents'])} results returned")
         # """
         try:
-            # 关键词裁剪
-            keywords = query.split(" ")
-            if len(keywords) > 5:
-                query = " ".join(keywords[:5])
-
-            # 限制最大结果数
-            if num_results > 500:
-                num_results = 500
-
-            # 计算分页
-            MAX_PAGE_SIZE = 50
-            page_size = min(num_results, MAX_PAGE_SIZE)
-            total_pages = math.ceil(num_results / page_size)
-
-            # 并发请求所有页面
-            tasks = []
-            for page in range(1, total_pages + 1):
-                # 最后一页可能需要调整数量
-                if page == total_pages and num_results % page_size != 0:
-                    current_page_size = num_results % page_size
-                else:
-                    current_page_size = page_size
-
-                tasks.append(
-                    self._fetch_patents_page(
-                        query=query,
-                        assignee=assignee,
-                        page_size=current_page_size,
-                        page=page,
-                        start_time=start_time,
-                        end_time=end_time,
-                    )
-                )
-
-            # 等待所有请求完成
-            results = await asyncio.gather(*tasks)
+            # 有界窗口分页请求，遇到短页即停止
+            fetch_page, plan = self._page_request(query, assignee, num_results, start_time, end_time)
+            results, page_stats = await fetch_pages(fetch_page, plan, MAX_CONCURRENT_PAGES)
 
             # 合并结果
             all_patents = []
             has_error = False
             error_msgs = []
 
-            for result in results:
+            for _, result in results:
                 if result["success"]:
                     all_patents.extend(result["data"])
                 else:
@@ -221,7 +200,70 @@ class PatentSource(BaseAPI):
             # 限制返回数量
             all_patents = all_patents[:num_results]
 
-            return {"success": True, "data": {"patents": all_patents}}
+            return {"success": True, "data": {"patents": all_patents, "paging": page_stats}}
         except Exception as e:
             logger.error(f"search_patents error: {e}")
             return {"success": False, "error": str(e)}
+
+    async def iter_patents(
+        self,
+        query: str,
+        assignee: Optional[str] = None,
+        num_results: int = 10,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+        ordered: bool = True,
+        stats: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream patents of a search as their pages arrive.
+
+        Same parameters and paging as search_patents, but each patent is yielded as soon as its page is ready instead
+        of after the slowest page. Patents already yielded (same publicationNumber) are skipped. Breaking out of the
+        loop early cancels the page requests still in flight.
+
+        Args:
+            query(str): Search keywords. up to 5.
+            assignee(str): The assignee of the patents, e.g. "Apple Inc.".
+            num_results(int): Maximum number of patents yielded, default is 10, max is 500
+            start_time(str): Start date YYYYMMDD, optional.
+            end_time(str): End date YYYYMMDD, optional.
+            ordered(bool): Yield in search result order (a page is yielded once all pages before it arrived), default
+                True; False yields pages in arrival order
+            stats(dict): Optional dict filled with the paging statistics of search_patents
+
+        Yields:
+            Dict[str, Any]: Patents, same fields as in search_patents
+        """
+        fetch_page, plan = self._page_request(query, assignee, num_results, start_time, end_time)
+        patents = iter_page_items(fetch_page, plan, MAX_CONCURRENT_PAGES, "publicationNumber", min(num_results, 500), ordered, stats)
+        try:
+            async for patent in patents:
+                yield patent
+        finally:
+            await patents.aclose()
+
+    def _page_request(
+        self, query: str, assignee: Optional[str], num_results: int, start_time: Optional[str], end_time: Optional[str]
+    ) -> Tuple[PageFetcher, List[Tuple[int, int]]]:
+        """Build the page fetcher and the page plan of a patent search"""
+        # 关键词裁剪
+        keywords = query.split(" ")
+        if len(keywords) > 5:
+            query = " ".join(keywords[:5])
+
+        # 限制最大结果数
+        if num_results > 500:
+            num_results = 500
+
+        async def _fetch(page: int, page_size: int) -> Dict[str, Any]:
+            return await self._fetch_patents_page(
+                query=query,
+                assignee=assignee,
+                page_size=page_size,
+                page=page,
+                start_time=start_time,
+                end_time=end_time,
+            )
+
+        return _fetch, plan_pages(num_results, MAX_PAGE_SIZE)
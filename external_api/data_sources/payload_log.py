@@ -0,0 +1,265 @@
+"""
+Sampled, size-capped logging of upstream payloads shared by all data sources
+"""
+
+import atexit
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger("payload_log")
+
+# 截断标记后缀，说明被省略的内容长度
+_TRUNCATED = "...<truncated {} {}>"
+
+
+def parse_sample_rates(spec: Optional[str]) -> Tuple[float, Dict[str, float]]:
+    """Parse a sample rate spec like "0.01" or "pinterest=0.1,metal=1,*=0" into (default rate, per-source rates)"""
+    default = 0.0
+    rates: Dict[str, float] = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, sep, value = part.rpartition("=")
+        try:
+            rate = min(max(float(value), 0.0), 1.0)
+        except ValueError:
+            logger.warning(f"Ignoring invalid payload log sample rate: {part}")
+            continue
+        if not sep or name.strip() == "*":
+            default = rate
+        else:
+            rates[name.strip()] = rate
+    return default, rates
+
+
+def shrink(value: Any, max_string: int, max_items: int, max_depth: int) -> Tuple[Any, bool]:
+    """Build a bounded copy of a JSON-like payload
+
+    Strings longer than max_string are cut, lists and dicts keep their first max_items entries and nesting deeper
+    than max_depth is replaced by a summary, so the cost does not depend on the payload size.
+
+    Returns:
+        The bounded copy and whether anything was cut
+    """
+    if isinstance(value, str):
+        if len(value) > max_string:
+            return value[:max_string] + _TRUNCATED.format(len(value) - max_string, "chars"), True
+        return value, False
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value, False
+    if max_depth <= 0:
+        size = len(value) if hasattr(value, "__len__") else 0
+        return f"<{type(value).__name__} of {size}>", True
+
+    truncated = False
+    if isinstance(value, dict):
+        result: Dict[str, Any] = {}
+        for i, (k, v) in enumerate(value.items()):
+            if i >= max_items:
+                result["..."] = _TRUNCATED.format(len(value) - max_items, "keys")
+                truncated = True
+                break
+            result[str(k)], cut = shrink(v, max_string, max_items, max_depth - 1)
+            truncated = truncated or cut
+        return result, truncated
+    if isinstance(value, (list, tuple)):
+        items = []
+        for v in value[:max_items]:
+            item, cut = shrink(v, max_string, max_items, max_depth - 1)
+            items.append(item)
+            truncated = truncated or cut
+        if len(value) > max_items:
+            items.append(_TRUNCATED.format(len(value) - max_items, "items"))
+            truncated = True
+        return items, truncated
+    return shrink(repr(value), max_string, max_items, max_depth)
+
+
+class PayloadLogger:
+    """Payload debug log with per-source sampling and a background writer
+
+    The caller only pays for the sampling decision and a bounded copy of sampled payloads (see shrink); serialization,
+    the per-record byte cap, the global byte rate cap and writing happen on a daemon thread. Records are JSON lines
+    {"time", "source", "label", "truncated", "payload"} appended to path, or emitted at INFO on the "payload_log"
+    logger when no path is set. When the queue is full records are dropped instead of blocking the caller.
+    """
+
+    def __init__(
+        self,
+        sample_rates: Optional[Dict[str, float]] = None,
+        default_rate: float = 0.0,
+        path: Optional[str] = None,
+        max_bytes: int = 16 * 1024,
+        max_string: int = 512,
+        max_items: int = 20,
+        max_depth: int = 6,
+        bytes_per_second: int = 256 * 1024,
+        queue_size: int = 1000,
+    ):
+        """Initialize the payload logger
+
+        Args:
+            sample_rates: Fraction of payloads logged per source name, e.g. {"pinterest": 0.1}
+            default_rate: Fraction of payloads logged for sources not in sample_rates, 0 disables them
+            path: JSON lines file to append to, None to emit through the "payload_log" logger
+            max_bytes: Maximum size of one serialized record, longer records are cut
+            max_string: Maximum length of a string inside a payload
+            max_items: Maximum number of entries kept per list or dict
+            max_depth: Maximum nesting depth kept
+            bytes_per_second: Maximum average write rate, records over the budget are dropped
+            queue_size: Maximum number of records waiting for the writer thread
+        """
+        self.sample_rates = dict(sample_rates or {})
+        self.default_rate = default_rate
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_string = max_string
+        self.max_items = max_items
+        self.max_depth = max_depth
+        self.bytes_per_second = bytes_per_second
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        # 写入速率令牌桶，最多积累一秒的额度
+        self._allowance = float(bytes_per_second)
+        self._last_refill = time.monotonic()
+        self._counters = {"seen": 0, "sampled": 0, "written": 0, "truncated": 0, "dropped_queue": 0, "dropped_rate": 0, "bytes_written": 0}
+
+    def enabled(self, source: str) -> bool:
+        """Check whether any payload of source can be logged"""
+        return self.sample_rates.get(source, self.default_rate) > 0
+
+    def log(self, source: str, label: str, payload: Any) -> bool:
+        """Log payload if it is sampled
+
+        Args:
+            source: Data source name, used to pick the sample rate, e.g. "pinterest"
+            label: What the payload is, e.g. "pins"
+            payload: JSON-like payload
+
+        Returns:
+            Whether the payload was queued for writing
+        """
+        self._counters["seen"] += 1
+        rate = self.sample_rates.get(source, self.default_rate)
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return False
+        self._counters["sampled"] += 1
+        bounded, truncated = shrink(payload, self.max_string, self.max_items, self.max_depth)
+        record = {"time": time.time(), "source": source, "label": label, "truncated": truncated, "payload": bounded}
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._counters["dropped_queue"] += 1
+            return False
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Wait until the queued records are written"""
+        if self._thread is None:
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            time.sleep(0.01)
+
+    def close(self) -> None:
+        """Write the queued records and stop the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get logging statistics: payloads seen, sampled, written, truncated, dropped, and bytes written"""
+        return {**self._counters, "queued": self._queue.qsize()}
+
+    def _ensure_writer(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="payload-log", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        stream = None
+        try:
+            while True:
+                record = self._queue.get()
+                try:
+                    if record is None:
+                        return
+                    line = self._serialize(record)
+                    if not self._take_allowance(len(line)):
+                        self._counters["dropped_rate"] += 1
+                        continue
+                    if self.path:
+                        if stream is None:
+                            stream = open(self.path, "a", encoding="utf-8")
+                        stream.write(line + "\n")
+                        stream.flush()
+                    else:
+                        logger.info(line)
+                    self._counters["written"] += 1
+                    self._counters["bytes_written"] += len(line)
+                except Exception as e:
+                    logger.warning(f"Failed to write payload log record: {e}")
+                finally:
+                    self._queue.task_done()
+        finally:
+            if stream is not None:
+                stream.close()
+
+    def _serialize(self, record: Dict[str, Any]) -> str:
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        if len(line) > self.max_bytes:
+            # 超出单条上限时改为记录截断后的文本
+            payload_text = json.dumps(record["payload"], ensure_ascii=False, default=str)
+            record["truncated"] = True
+            record["payload"] = ""
+            budget = max(self.max_bytes - len(json.dumps(record, ensure_ascii=False)) - 64, 0)
+            record["payload"] = payload_text[:budget] + _TRUNCATED.format(len(payload_text) - budget, "chars")
+            line = json.dumps(record, ensure_ascii=False, default=str)
+        if record["truncated"]:
+            self._counters["truncated"] += 1
+        return line
+
+    def _take_allowance(self, size: int) -> bool:
+        now = time.monotonic()
+        self._allowance = min(self._allowance + (now - self._last_refill) * self.bytes_per_second, float(self.bytes_per_second))
+        self._last_refill = now
+        if size > self._allowance:
+            return False
+        self._allowance -= size
+        return True
+
+
+_payload_logger: Optional[PayloadLogger] = None
+_payload_logger_lock = threading.Lock()
+
+
+def get_payload_logger(config: Optional[Dict[str, Any]] = None) -> PayloadLogger:
+    """Get the payload logger shared by all data sources, created from config on the first call
+
+    Config keys: payload_log_sample_rates (spec for parse_sample_rates, payloads are not logged when unset) and
+    payload_log_path (JSON lines file, None to use the "payload_log" logger).
+    """
+    global _payload_logger
+    if _payload_logger is None:
+        with _payload_logger_lock:
+            if _payload_logger is None:
+                config = config or {}
+                default_rate, rates = parse_sample_rates(config.get("payload_log_sample_rates"))
+                _payload_logger = PayloadLogger(rates, default_rate, path=config.get("payload_log_path"))
+                atexit.register(_payload_logger.close)
+    return _payload_logger
@@ -5,15 +5,23 @@ Pinterest data source implementation
 import asyncio
 import json
 import logging
+import os
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 import aiohttp
 
 from .base import BaseAPI
+from .compact_records import CompactRecords
+from .media_cache import MediaCache, prefetch
+from .payload_log import get_payload_logger
 
 logger = logging.getLogger("pinterest_source")
 
+# 结果附带媒体下载时的默认并发数和单次下载字节上限
+MEDIA_PREFETCH_CONCURRENCY = 4
+MEDIA_PREFETCH_BYTE_BUDGET = 200 * 1024 * 1024
+
 
 class PinterestSource(BaseAPI):
     """Pinterest data source"""
@@ -29,6 +37,11 @@ class PinterestSource(BaseAPI):
             "X-Biz-Id":"matrix-agent",
             "X-Request-Timeout": str(config["timeout"]-5),
             }
+        self._payload_log = get_payload_logger(config)
+        # 按内容哈希存放的本地媒体缓存，配置了 cache_dir 时启用
+        self.media_cache: Optional[MediaCache] = None
+        if config.get("cache_dir"):
+            self.media_cache = MediaCache(os.path.join(config["cache_dir"], "pinterest_media"))
 
     @property
     def source_name(self) -> str:
@@ -39,7 +52,13 @@ class PinterestSource(BaseAPI):
         return {"name": self.source_name, "description": "Pinterest data source, provides user and pin search features for Pinterest."}
 
     async def search_pins(
-        self, keyword: str, num: int = 10, nextPageCursor: Optional[str] = None, sort: str = "relevance"
+        self,
+        keyword: str,
+        num: int = 10,
+        nextPageCursor: Optional[str] = None,
+        sort: str = "relevance",
+        compact: bool = False,
+        download_media: bool = False,
     ) -> Dict[str, Any]:
         """
         Search related pins.
@@ -51,6 +70,8 @@ class PinterestSource(BaseAPI):
             num(int): Number of results per page, e.g. 10
             nextPageCursor(str): Pagination cursor for next page, default None for first page
             sort(str): Sort order, default "relevance", options: "relevance" or "recent"
+            compact(bool): Return pins as a memory-compact CompactRecords list, records are converted to dicts on access, default False
+            download_media(bool): Also download pin images and 720p videos into the local media cache and add a "media" summary (see prefetch_media), default False
 
         Returns:
             Dict[str, Any]: Dictionary containing pin search results, e.g.
@@ -91,7 +112,8 @@ class PinterestSource(BaseAPI):
                             "full_name": "FursnPaws | Dogs | Cats" # Creator display name
                         }
                     ],
-                    "cursor": "cursor123"      # Next page cursor
+                    "cursor": "cursor123",     # Next page cursor
+                    "media": {...}             # Only with download_media=True, same as prefetch_media data
                 }
             }
         """
@@ -135,8 +157,13 @@ class PinterestSource(BaseAPI):
                 raise ValueError(f"API response missing data field: {data}")
 
             pins = self._parse_pins(data)
+            if compact:
+                pins = CompactRecords(pins, shared_fields=("pinner",))
 
-            return {"success": True, "data": {"keyword": keyword, "count": len(pins), "pins": pins, "cursor": data.get("nextPageCursor")}}
+            result = {"success": True, "data": {"keyword": keyword, "count": len(pins), "pins": pins, "cursor": data.get("nextPageCursor")}}
+            if download_media:
+                result["data"]["media"] = await self._attach_media(result["data"])
+            return result
 
         except asyncio.TimeoutError:
             error_msg = f"Request timeout (timeout={self._timeout}s)"
@@ -152,12 +179,13 @@ class PinterestSource(BaseAPI):
             logger.exception(e)
             return {"success": False, "error": error_msg}
 
-    async def get_user_info(self, username: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+    async def get_user_info(self, username: str, user_id: Optional[str] = None, download_media: bool = False) -> Dict[str, Any]:
         """
         Get detailed information of a Pinterest user.
 
         Args:
             username (str): Pinterest username, not display name
+            download_media (bool): Also download the avatar and recent pin images into the local media cache and add a "media" summary (see prefetch_media), default False
 
         Returns:
             Dict[str, Any]: Dictionary containing user info, e.g.
@@ -171,7 +199,8 @@ class PinterestSource(BaseAPI):
                     "pin_count": 6459, # Number of pins published by user
                     "follower_count": 2385, # Number of followers
                     "last_pin_save_time": "2025-04-25 01:31:38", # Last pin publish time
-                    "recent_pin_images": ["https://xxxx.jpg", ...] # Recent pin image urls
+                    "recent_pin_images": ["https://xxxx.jpg", ...], # Recent pin image urls
+                    "media": {...} # Only with download_media=True, same as prefetch_media data
                 }
             }
         """
@@ -209,7 +238,10 @@ class PinterestSource(BaseAPI):
                 raise ValueError(f"Invalid API response format: {data}")
 
             # Build return data
-            return {"success": True, "data": self._parse_user_info(data)}
+            user = self._parse_user_info(data)
+            if download_media and user:
+                user["media"] = await self._attach_media(user)
+            return {"success": True, "data": user}
 
         except asyncio.TimeoutError:
             error_msg = f"Request timeout (timeout={self._timeout}s)"
@@ -225,6 +257,135 @@ class PinterestSource(BaseAPI):
             logger.exception(e)
             return {"success": False, "error": error_msg}
 
+    async def iter_prefetch_media(
+        self,
+        data: Dict[str, Any],
+        include_videos: bool = True,
+        max_concurrency: int = MEDIA_PREFETCH_CONCURRENCY,
+        byte_budget: Optional[int] = MEDIA_PREFETCH_BYTE_BUDGET,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Download the media of search_pins or get_user_info results into the local media cache, streaming progress.
+
+        Files are stored by content hash, so media shared by several pins is downloaded and stored once, and URLs
+        already in the cache are not downloaded again. Interrupted downloads resume where they stopped on the next call.
+
+        Args:
+            data(dict): The "data" of a search_pins or get_user_info result (the full result dict is also accepted)
+            include_videos(bool): Also download the 720p mp4 video of video pins, default True
+            max_concurrency(int): Maximum number of concurrent downloads, default 4
+            byte_budget(int): Maximum number of bytes downloaded by this call, None for no limit, default 200 MB
+
+        Yields:
+            Dict[str, Any]: Progress events, e.g.
+            {"event": "started", "url": "https://xxx.jpg", "total": 123456, "resumed_from": 0}
+            {"event": "progress", "url": "https://xxx.mp4", "bytes": 524288, "total": 2097152}
+            {"event": "completed", "url": "https://xxx.jpg", "path": "/xxx/objects/ab/abcd....jpg", "bytes": 123456, "sha256": "abcd...", "ext": ".jpg"}
+            {"event": "cached", "url": "https://xxx.jpg", "path": "/xxx/objects/ab/abcd....jpg", "bytes": 123456}
+            {"event": "skipped", "url": "https://xxx.mp4", "reason": "byte_budget"}
+            {"event": "failed", "url": "https://xxx.jpg", "error": "..."}
+
+        Raises:
+            ValueError: The media cache is disabled because cache_dir is not configured
+        """
+        if self.media_cache is None:
+            raise ValueError("Media cache is disabled, cache_dir is not configured")
+        urls = self._media_urls(data, include_videos)
+        events = prefetch(self.media_cache, urls, max_concurrency=max_concurrency, byte_budget=byte_budget, timeout=self._timeout)
+        try:
+            async for event in events:
+                yield event
+        finally:
+            # 调用方提前结束迭代时取消未完成的下载
+            await events.aclose()
+
+    async def prefetch_media(
+        self,
+        data: Dict[str, Any],
+        include_videos: bool = True,
+        max_concurrency: int = MEDIA_PREFETCH_CONCURRENCY,
+        byte_budget: Optional[int] = MEDIA_PREFETCH_BYTE_BUDGET,
+    ) -> Dict[str, Any]:
+        """
+        Download the media of search_pins or get_user_info results into the local media cache.
+
+        Same as iter_prefetch_media but waits for every download and returns a summary.
+
+        Args:
+            data(dict): The "data" of a search_pins or get_user_info result (the full result dict is also accepted)
+            include_videos(bool): Also download the 720p mp4 video of video pins, default True
+            max_concurrency(int): Maximum number of concurrent downloads, default 4
+            byte_budget(int): Maximum number of bytes downloaded by this call, None for no limit, default 200 MB
+
+        Returns:
+            Dict[str, Any]: Dictionary containing the download summary, e.g.
+            {
+                "success": True,
+                "data": {
+                    "files": {"https://xxx.jpg": "/xxx/objects/ab/abcd....jpg"},  # Local path of every available url
+                    "downloaded": 3,               # Files downloaded by this call
+                    "cached": 2,                   # Files already in the cache
+                    "bytes_downloaded": 456789,    # Bytes received by this call
+                    "skipped": ["https://xxx.mp4"],  # Urls not downloaded because of the byte budget
+                    "failed": [{"url": "https://xxx.jpg", "error": "..."}]  # Failed downloads
+                }
+            }
+        """
+        if self.media_cache is None:
+            return {"success": False, "error": "Media cache is disabled, cache_dir is not configured"}
+        try:
+            return {"success": True, "data": await self._attach_media(data, include_videos, max_concurrency, byte_budget)}
+        except Exception as e:
+            error_msg = f"Error occurred while prefetching media: {str(e)}"
+            logger.error(error_msg)
+            logger.exception(e)
+            return {"success": False, "error": error_msg}
+
+    async def _attach_media(
+        self,
+        data: Dict[str, Any],
+        include_videos: bool = True,
+        max_concurrency: int = MEDIA_PREFETCH_CONCURRENCY,
+        byte_budget: Optional[int] = MEDIA_PREFETCH_BYTE_BUDGET,
+    ) -> Dict[str, Any]:
+        """Run a prefetch to completion and summarize its events"""
+        summary: Dict[str, Any] = {"files": {}, "downloaded": 0, "cached": 0, "bytes_downloaded": 0, "skipped": [], "failed": []}
+        if self.media_cache is None:
+            summary["error"] = "Media cache is disabled, cache_dir is not configured"
+            return summary
+        started: Dict[str, int] = {}
+        async for event in self.iter_prefetch_media(data, include_videos, max_concurrency, byte_budget):
+            url = event["url"]
+            if event["event"] == "started":
+                started[url] = event["resumed_from"]
+            elif event["event"] == "completed":
+                summary["files"][url] = event["path"]
+                summary["downloaded"] += 1
+                summary["bytes_downloaded"] += event["bytes"] - started.get(url, 0)
+            elif event["event"] == "cached":
+                summary["files"][url] = event["path"]
+                summary["cached"] += 1
+            elif event["event"] == "skipped":
+                summary["skipped"].append(url)
+            elif event["event"] == "failed":
+                summary["failed"].append({"url": url, "error": event["error"]})
+        return summary
+
+    def _media_urls(self, data: Dict[str, Any], include_videos: bool) -> List[str]:
+        """Collect the media urls of pins or of a user, in result order"""
+        if "success" in data and isinstance(data.get("data"), dict):
+            data = data["data"]
+        urls: List[str] = []
+        for pin in data.get("pins") or []:
+            urls.append(pin.get("images", {}).get("url", ""))
+            # m3u8 只是播放列表，仅下载 mp4 视频
+            if include_videos:
+                urls.append((pin.get("videos", {}).get("V_720P") or {}).get("url", ""))
+        if data.get("image_url"):
+            urls.append(data["image_url"])
+        urls.extend(data.get("recent_pin_images") or [])
+        return [url for url in dict.fromkeys(urls) if url]
+
     def _format_date(self, date_str: Optional[str]) -> Optional[str]:
         """Format date string"""
         if not date_str:
@@ -238,9 +399,7 @@ class PinterestSource(BaseAPI):
             return date_str
 
     def _parse_pins(self, data: dict[str, Any]) -> list[dict[str, Any]]:
-        print(f"xwy-pins, {data}")
-        print("-" * 100)
-        print("\n")
+        self._payload_log.log(self.source_name, "pins", data)
         pins = []
         for pin_data in data.get("data", []):
             if not isinstance(pin_data, dict):
@@ -296,9 +455,7 @@ class PinterestSource(BaseAPI):
 
     def _parse_user_info(self, resp: dict[str, Any]) -> dict[str, Any]:
         data = resp.get("data", [])
-        print(f"xwy-user, {data}")
-        print("-" * 100)
-        print("\n")
+        self._payload_log.log(self.source_name, "user_info", data)
         if len(data) <= 0:
             return {}
 
@@ -0,0 +1,346 @@
+"""
+Fixed-size on-disk ring buffers of sampled prices, with a background sampler and OHLC downsampling
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+logger = logging.getLogger("price_recorder")
+
+# 单个价格样本的存储结构
+SAMPLE_DTYPE = np.dtype([("timestamp", "<i8"), ("price", "<f8")])
+# 每个品种默认保留的样本数，5 分钟采样约可保存一年
+DEFAULT_CAPACITY = 100000
+# 默认采样间隔（秒）
+DEFAULT_SAMPLE_INTERVAL = 300
+# 降采样区间名称对应的秒数
+BUCKET_SECONDS = {"1m": 60, "5m": 300, "15m": 900, "30m": 1800, "1h": 3600, "4h": 14400, "1d": 86400, "1wk": 7 * 86400}
+
+# 采样函数：返回 {品种: 价格}
+SampleFetcher = Callable[[], Awaitable[Dict[str, float]]]
+# 未配置 cache_dir 时价格历史不可用的错误信息
+HISTORY_DISABLED_ERROR = "Price history is disabled, cache_dir is not configured"
+
+
+def parse_time(value: Optional[str]) -> Optional[int]:
+    """Parse "YYYY-MM-DD HH:MM:SS" or "YYYY-MM-DD" (UTC) into a unix timestamp, None stays None
+
+    Raises:
+        ValueError: The value has another format
+    """
+    if value is None or value == "":
+        return None
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+        try:
+            return int(datetime.strptime(value, fmt).replace(tzinfo=timezone.utc).timestamp())
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid time {value!r}, expected YYYY-MM-DD HH:MM:SS or YYYY-MM-DD")
+
+
+def format_time(timestamp: int) -> str:
+    return datetime.fromtimestamp(int(timestamp), timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def downsample_ohlc(samples: np.ndarray, bucket_seconds: int) -> np.ndarray:
+    """Aggregate chronological samples into OHLC buckets aligned to multiples of bucket_seconds
+
+    Returns:
+        np.ndarray: Structured array with fields timestamp (bucket start), open, high, low, close, count
+    """
+    dtype = np.dtype([("timestamp", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"), ("count", "<i8")])
+    if len(samples) == 0:
+        return np.empty(0, dtype=dtype)
+    buckets = samples["timestamp"] // bucket_seconds * bucket_seconds
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(samples)]
+    prices = samples["price"]
+    result = np.empty(len(starts), dtype=dtype)
+    result["timestamp"] = buckets[starts]
+    result["open"] = prices[starts]
+    result["close"] = prices[ends - 1]
+    result["high"] = np.maximum.reduceat(prices, starts)
+    result["low"] = np.minimum.reduceat(prices, starts)
+    result["count"] = ends - starts
+    return result
+
+
+class _RingSeries:
+    """Ring buffer of one symbol: a memory-mapped sample array plus a memory-mapped [head, count] header"""
+
+    def __init__(self, path: str, capacity: int):
+        data_path = f"{path}.npy"
+        meta_path = f"{path}.meta.npy"
+        if os.path.exists(data_path) and os.path.exists(meta_path):
+            self.data = open_memmap(data_path, mode="r+")
+            self.meta = open_memmap(meta_path, mode="r+")
+        else:
+            self.data = open_memmap(data_path, mode="w+", dtype=SAMPLE_DTYPE, shape=(capacity,))
+            self.meta = open_memmap(meta_path, mode="w+", dtype="<i8", shape=(2,))
+        self.capacity = self.data.shape[0]
+
+    @property
+    def count(self) -> int:
+        return int(self.meta[1])
+
+    def last_timestamp(self) -> Optional[int]:
+        if self.count == 0:
+            return None
+        return int(self.data[(int(self.meta[0]) - 1) % self.capacity]["timestamp"])
+
+    def append(self, timestamp: int, price: float) -> None:
+        head = int(self.meta[0])
+        self.data[head] = (timestamp, price)
+        self.meta[0] = (head + 1) % self.capacity
+        self.meta[1] = min(self.count + 1, self.capacity)
+
+    def ordered(self) -> np.ndarray:
+        """Get the samples oldest first"""
+        head, count = int(self.meta[0]), self.count
+        if count < self.capacity:
+            return self.data[:count]
+        return np.concatenate([self.data[head:], self.data[:head]])
+
+    def flush(self) -> None:
+        self.data.flush()
+        self.meta.flush()
+
+
+class PriceRecorder:
+    """Per-symbol fixed-size price history stored as memory-mapped NumPy ring buffers
+
+    Each symbol (e.g. "gold/USD") has capacity samples of (timestamp, price); once full the oldest samples are
+    overwritten. Samples must arrive in time order, older ones are ignored.
+    """
+
+    def __init__(self, root_dir: str, capacity: int = DEFAULT_CAPACITY):
+        """Initialize the recorder
+
+        Args:
+            root_dir: Directory of the ring buffer files, created on first write
+            capacity: Samples kept per symbol, used when a symbol's buffer is created
+        """
+        self.root_dir = root_dir
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._series: Dict[str, _RingSeries] = {}
+        self._samples_written = 0
+
+    def _get_series(self, symbol: str, create: bool) -> Optional[_RingSeries]:
+        series = self._series.get(symbol)
+        if series is None:
+            path = os.path.join(self.root_dir, quote(symbol, safe=""))
+            if not create and not os.path.exists(f"{path}.npy"):
+                return None
+            os.makedirs(self.root_dir, exist_ok=True)
+            series = self._series[symbol] = _RingSeries(path, self.capacity)
+        return series
+
+    def record(self, symbol: str, price: float, timestamp: Optional[int] = None) -> bool:
+        """Append one sample, returns False if it is not newer than the last sample of the symbol"""
+        timestamp = int(time.time() if timestamp is None else timestamp)
+        with self._lock:
+            series = self._get_series(symbol, create=True)
+            last = series.last_timestamp()
+            if last is not None and timestamp <= last:
+                return False
+            series.append(timestamp, float(price))
+            self._samples_written += 1
+            return True
+
+    def query(self, symbol: str, start: Optional[int] = None, end: Optional[int] = None) -> np.ndarray:
+        """Get the samples of symbol within [start, end), oldest first, as a SAMPLE_DTYPE array"""
+        with self._lock:
+            series = self._get_series(symbol, create=False)
+            if series is None:
+                return np.empty(0, dtype=SAMPLE_DTYPE)
+            samples = series.ordered()
+            timestamps = samples["timestamp"]
+            lo = 0 if start is None else int(np.searchsorted(timestamps, start, side="left"))
+            hi = len(samples) if end is None else int(np.searchsorted(timestamps, end, side="left"))
+            return np.array(samples[lo:hi])
+
+    def ohlc(self, symbol: str, bucket_seconds: int, start: Optional[int] = None, end: Optional[int] = None) -> np.ndarray:
+        """Get OHLC buckets of bucket_seconds for the samples of symbol within [start, end)"""
+        return downsample_ohlc(self.query(symbol, start, end), bucket_seconds)
+
+    def symbols(self) -> List[str]:
+        """List the recorded symbols"""
+        if not os.path.isdir(self.root_dir):
+            return []
+        return sorted(unquote(name[: -len(".npy")]) for name in os.listdir(self.root_dir) if name.endswith(".npy") and not name.endswith(".meta.npy"))
+
+    def flush(self) -> None:
+        """Write pending samples to disk"""
+        with self._lock:
+            for series in self._series.values():
+                series.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get recorder statistics
+
+        Returns:
+            Dict[str, Any]: Statistics, e.g.
+            {
+                "root_dir": "/data/cache/metal_history",
+                "capacity": 100000,            # Samples kept per symbol
+                "samples_written": 288,        # Samples recorded by this instance
+                "symbols": {
+                    "gold/USD": {"samples": 288, "first": "2025-04-25 00:00:00", "last": "2025-04-25 23:55:00"}
+                }
+            }
+        """
+        symbols = {}
+        for symbol in self.symbols():
+            samples = self.query(symbol)
+            symbols[symbol] = {
+                "samples": len(samples),
+                "first": format_time(samples["timestamp"][0]) if len(samples) else None,
+                "last": format_time(samples["timestamp"][-1]) if len(samples) else None,
+            }
+        return {"root_dir": self.root_dir, "capacity": self.capacity, "samples_written": self._samples_written, "symbols": symbols}
+
+    def history(self, symbol: str, start: Optional[str] = None, end: Optional[str] = None, interval: Optional[str] = None) -> Dict[str, Any]:
+        """Build the result of a history request: raw samples, or OHLC buckets when interval is given"""
+        try:
+            start_ts, end_ts = parse_time(start), parse_time(end)
+            if interval is not None and interval not in BUCKET_SECONDS:
+                raise ValueError(f"Invalid interval {interval!r}, options: {list(BUCKET_SECONDS)}")
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
+
+        if interval is None:
+            samples = self.query(symbol, start_ts, end_ts)
+            points = [{"time": format_time(ts), "price": float(price)} for ts, price in zip(samples["timestamp"], samples["price"])]
+            return {"success": True, "data": {"symbol": symbol, "count": len(points), "samples": points}}
+
+        bars = self.ohlc(symbol, BUCKET_SECONDS[interval], start_ts, end_ts)
+        points = [
+            {"time": format_time(bar["timestamp"]), "open": float(bar["open"]), "high": float(bar["high"]), "low": float(bar["low"]), "close": float(bar["close"]), "samples": int(bar["count"])}
+            for bar in bars
+        ]
+        return {"success": True, "data": {"symbol": symbol, "interval": interval, "count": len(points), "bars": points}}
+
+
+class PriceSampler:
+    """Background task calling a fetch function every interval seconds and recording the returned prices"""
+
+    def __init__(self, recorder: PriceRecorder, fetch: SampleFetcher, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self.recorder = recorder
+        self.interval = interval
+        self._fetch = fetch
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        self._counters = {"rounds": 0, "samples": 0, "errors": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> asyncio.Task:
+        """Run the sampling loop in a background task"""
+        if not self.running:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self) -> None:
+        """Stop the sampling loop and flush the recorder"""
+        self._stopping.set()
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run(self, max_rounds: Optional[int] = None) -> None:
+        """Sample until stopped, or for max_rounds rounds"""
+        rounds = 0
+        try:
+            while not self._stopping.is_set() and (max_rounds is None or rounds < max_rounds):
+                started = time.monotonic()
+                await self.sample_once()
+                rounds += 1
+                if max_rounds is not None and rounds >= max_rounds:
+                    break
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=max(self.interval - (time.monotonic() - started), 0))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.recorder.flush()
+
+    async def sample_once(self) -> Tuple[int, int]:
+        """Fetch and record one round of prices, returns (recorded, failed)"""
+        self._counters["rounds"] += 1
+        try:
+            prices = await self._fetch()
+        except Exception as e:
+            self._counters["errors"] += 1
+            logger.error(f"Price sampling failed: {str(e)}")
+            return 0, 1
+        now = int(time.time())
+        recorded = 0
+        for symbol, price in prices.items():
+            if price is not None and self.recorder.record(symbol, price, now):
+                recorded += 1
+        self._counters["samples"] += recorded
+        return recorded, 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get sampler statistics: running state, interval, rounds, samples recorded and failed rounds"""
+        return {"running": self.running, "interval": self.interval, **self._counters}
+
+
+def create_multi_currency_sampler(
+    recorder: Optional[PriceRecorder],
+    fetch_multi: Callable[[], Awaitable[Dict[str, Any]]],
+    price_field: str,
+    symbol_of: Callable[[str, str], str],
+    interval: float = DEFAULT_SAMPLE_INTERVAL,
+) -> PriceSampler:
+    """Create a sampler recording one price field of multi-currency price records
+
+    Args:
+        recorder: Recorder of the source, None when cache_dir is not configured
+        fetch_multi: Function returning a fx_rates.get_prices_multi result
+        price_field: Record field sampled, e.g. "current"
+        symbol_of: Function building the history symbol from (record symbol, currency)
+        interval: Seconds between rounds
+
+    Raises:
+        ValueError: cache_dir is not configured
+    """
+    if recorder is None:
+        raise ValueError(HISTORY_DISABLED_ERROR)
+
+    async def _sample() -> Dict[str, float]:
+        result = await fetch_multi()
+        if not result["success"]:
+            raise ValueError(result["error"])
+        prices = {}
+        for currency, entry in result["data"]["prices"].items():
+            for symbol, record in entry["records"].items():
+                try:
+                    prices[symbol_of(symbol, currency)] = float(record[price_field])
+                except (KeyError, TypeError, ValueError):
+                    continue
+        return prices
+
+    return PriceSampler(recorder, _sample, interval)
+
+
+def recorded_history(
+    recorder: Optional[PriceRecorder], symbol: str, start: Optional[str] = None, end: Optional[str] = None, interval: Optional[str] = None
+) -> Dict[str, Any]:
+    """Build the result of a history request, or an error result when the source has no recorder"""
+    if recorder is None:
+        return {"success": False, "error": HISTORY_DISABLED_ERROR}
+    return recorder.history(symbol, start, end, interval)
@@ -4,15 +4,20 @@
 
 import asyncio
 import logging
-import math
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 import aiohttp
 
 from .base import BaseAPI
+from .paged_fetch import PageFetcher, fetch_pages, iter_page_items, plan_pages
 
 logger = logging.getLogger("scholar_source")
 
+# 最大每页数量,api有限制
+MAX_PAGE_SIZE = 20
+# 同时在途的分页请求数
+MAX_CONCURRENT_PAGES = 4
+
 
 class ScholarSource(BaseAPI):
     """Academic data source
@@ -142,7 +147,15 @@ class ScholarSource(BaseAPI):
                                 "citedBy": "...",
                                 "pdfUrl": "..."
                             }
-                        ]
+                        ],
+                        "paging": {              # Page requests; pages after the first short page are not fetched
+                            "pages_planned": 25,
+                            "pages_requested": 6,
+                            "pages_completed": 4,
+                            "pages_cancelled": 2,
+                            "pages_saved": 21,   # Pages never requested or cancelled
+                            "last_page": 3       # First page with fewer results than requested, None if all were full
+                        }
                     }
                 }
         """
@@ -163,49 +176,18 @@ class ScholarSource(BaseAPI):
         #     ...     print(f"Search succeeded, {len(result['data']['papers'])} results returned")
         # """
         try:
-            # 限制最大结果数
-            if num_results > 500:
-                num_results = 500
-
-            # 计算分页
-            MAX_PAGE_SIZE = 20  # 最大每页数量,api有限制
-            page_size = min(num_results, MAX_PAGE_SIZE)
-            total_pages = math.ceil(num_results / page_size)
-
-            # 并发请求所有页面
-            tasks = []
-            for page in range(1, total_pages + 1):
-                # 最后一页可能需要调整数量
-                if page == total_pages and num_results % page_size != 0:
-                    current_page_size = num_results % page_size
-                else:
-                    current_page_size = page_size
-
-                tasks.append(
-                    self._fetch_scholar_page(
-                        query=query,
-                        page_size=current_page_size,
-                        page=page,
-                        start_year=start_year,
-                        end_year=end_year,
-                    )
-                )
-
-            # 等待所有请求完成
-            results = await asyncio.gather(*tasks)
+            # 有界窗口分页请求，遇到短页即停止
+            fetch_page, plan = self._page_request(query, num_results, start_year, end_year)
+            results, page_stats = await fetch_pages(fetch_page, plan, MAX_CONCURRENT_PAGES)
 
             # 合并结果
             all_papers = []
             has_error = False
             error_msgs = []
-            successful_pages = 0
 
-            for i, result in enumerate(results):
-                page_num = i + 1
+            for page_num, result in results:
                 if result["success"]:
-                    page_results = result["data"]
-                    all_papers.extend(page_results)
-                    successful_pages += 1
+                    all_papers.extend(result["data"])
                 else:
                     has_error = True
                     error_msgs.append(f"Page {page_num}: {result['error']}")
@@ -217,7 +199,62 @@ class ScholarSource(BaseAPI):
             # 限制返回数量
             all_papers = all_papers[:num_results]
 
-            return {"success": True, "data": {"papers": all_papers}}
+            return {"success": True, "data": {"papers": all_papers, "paging": page_stats}}
         except Exception as e:
             logger.error(f"search_scholar error: {e}")
             return {"success": False, "error": str(e)}
+
+    async def iter_scholar(
+        self,
+        query: str,
+        num_results: int = 10,
+        start_year: Optional[str] = None,
+        end_year: Optional[str] = None,
+        ordered: bool = True,
+        stats: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream academic papers of a search as their pages arrive.
+
+        Same parameters and paging as search_scholar, but each paper is yielded as soon as its page is ready instead
+        of after the slowest page. Papers already yielded (same link) are skipped. Breaking out of the loop early
+        cancels the page requests still in flight.
+
+        Args:
+            query(str): Search keywords.
+            num_results(int): Maximum number of papers yielded, default is 10, max is 500.
+            start_year(str): Start year, YYYY, default is None.
+            end_year(str): End year, YYYY, default is None.
+            ordered(bool): Yield in search result order (a page is yielded once all pages before it arrived), default
+                True; False yields pages in arrival order
+            stats(dict): Optional dict filled with the paging statistics of search_scholar
+
+        Yields:
+            Dict[str, Any]: Papers, same fields as in search_scholar
+        """
+        fetch_page, plan = self._page_request(query, num_results, start_year, end_year)
+        papers = iter_page_items(fetch_page, plan, MAX_CONCURRENT_PAGES, "link", min(num_results, 500), ordered, stats)
+        try:
+            async for paper in papers:
+                yield paper
+        finally:
+            await papers.aclose()
+
+    def _page_request(
+        self, query: str, num_results: int, start_year: Optional[str], end_year: Optional[str]
+    ) -> Tuple[PageFetcher, List[Tuple[int, int]]]:
+        """Build the page fetcher and the page plan of a scholar search"""
+        # 限制最大结果数
+        if num_results > 500:
+            num_results = 500
+
+        async def _fetch(page: int, page_size: int) -> Dict[str, Any]:
+            return await self._fetch_scholar_page(
+                query=query,
+                page_size=page_size,
+                page=page,
+                start_year=start_year,
+                end_year=end_year,
+            )
+
+        return _fetch, plan_pages(num_results, MAX_PAGE_SIZE)
@@ -2,16 +2,38 @@
 TripAdvisor Officical API data source implementation
 """
 
+import asyncio
+import copy
+import json
 import logging
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Union
 
 import httpx
 
 from .base import BaseAPI
+from .geo_index import GeoLocationIndex, geohash_bounds
+from .local_cache import TtlCache
 
 logger = logging.getLogger("tripadvisor_official_source")
 
+# 地点聚合请求中各部分对应的接口后缀及解析方法名
+BUNDLE_SECTIONS = {
+    "details": ("details", "_parse_location_details"),
+    "reviews": ("reviews", "_parse_reviews"),
+    "photos": ("photos", "_parse_photos"),
+}
+# 使用 ETag/Last-Modified 条件请求的部分
+CONDITIONAL_SECTIONS = {"details", "photos"}
+# 本地索引补齐附近搜索时，单次查询最多补抓的网格数
+MAX_NEARBY_CELL_FETCHES = 16
+# 长连接客户端的连接池上限
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE_CONNECTIONS = 10
+KEEPALIVE_EXPIRY = 30
+# 条件请求校验信息（ETag/Last-Modified）及对应解析结果的保留时间
+CONDITIONAL_CACHE_TTL = 7 * 86400
+
 
 class TripAdvisorSource(BaseAPI):
     """TripAdvisor official API data source"""
@@ -27,7 +49,58 @@ class TripAdvisorSource(BaseAPI):
             "X-Biz-Id":"matrix-agent",
             "X-Request-Timeout": str(config["timeout"]-5),
         }
+        # 已获取地点及已搜索区域的本地空间索引
+        self.geo_index = GeoLocationIndex()
+        # 详情和照片的条件请求缓存：请求 -> {"etag", "last_modified", "data"}
+        self.conditional_cache = TtlCache(CONDITIONAL_CACHE_TTL, max_entries=2000)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client_closer: Optional[asyncio.Task] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the long-lived client of the running event loop, creating it on first use"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            # 连接绑定在创建它的事件循环上，事件循环变化后关闭旧客户端并重建
+            self._discard_client()
+            self._client = httpx.AsyncClient(
+                # 与代理之间使用 HTTP/2 多路复用，依赖 httpx[http2]
+                http2=True,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS, keepalive_expiry=KEEPALIVE_EXPIRY
+                ),
+            )
+            self._client_loop = loop
+            # 事件循环结束时（asyncio.run 会取消剩余任务）在该循环上关闭客户端
+            self._client_closer = loop.create_task(self._close_when_cancelled(self._client))
+        return self._client
 
+    @staticmethod
+    async def _close_when_cancelled(client: httpx.AsyncClient) -> None:
+        try:
+            await asyncio.Future()
+        finally:
+            await client.aclose()
+
+    def _discard_client(self) -> None:
+        """Drop the current client, closing it on its own event loop if that loop is still open"""
+        client, loop, closer = self._client, self._client_loop, self._client_closer
+        self._client = self._client_loop = self._client_closer = None
+        if client is None or client.is_closed or closer is None or closer.done():
+            return
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(closer.cancel)
+
+    async def aclose(self) -> None:
+        """Close the long-lived HTTP client, a new one is created on the next request"""
+        closer = self._client_closer
+        if closer is not None and self._client_loop is asyncio.get_running_loop():
+            self._client = self._client_loop = self._client_closer = None
+            closer.cancel()
+            await asyncio.gather(closer, return_exceptions=True)
+        else:
+            self._discard_client()
 
     async def _make_api_request(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Make a request to the Tripadvisor Content API"""
@@ -36,10 +109,51 @@ class TripAdvisorSource(BaseAPI):
         if params is None:
             params = {}
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers, params=params)
-            response.raise_for_status()
-            return response.json()
+        response = await self._get(url, self.headers, params)
+        response.raise_for_status()
+        return response.json()
+
+    async def _get(self, url: str, headers: Dict[str, str], params: Dict[str, Any]) -> httpx.Response:
+        """Send a GET request over the long-lived client"""
+        try:
+            return await self._get_client().get(url, headers=headers, params=params)
+        except httpx.TimeoutException as e:
+            raise TimeoutError(f"Request timeout (timeout={self.timeout}s)") from e
+
+    async def _fetch_revalidated(self, endpoint: str, params: Dict[str, Any], parser: Callable[[Dict[str, Any]], Any]) -> Any:
+        """Make a request and parse its response, revalidating a previous response with ETag/Last-Modified
+
+        When the API answers 304 Not Modified a copy of the previously parsed result is returned, without a body
+        download or a parse.
+
+        Raises:
+            ValueError: The API returned no data
+        """
+        url = f"{self.proxy_url}/api/v1/{endpoint}"
+        key = f"{endpoint}?{json.dumps(params, sort_keys=True)}"
+        cached = self.conditional_cache.get(key)
+        headers = dict(self.headers)
+        if cached is not None:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        response = await self._get(url, headers, params)
+        if response.status_code == 304 and cached is not None:
+            # 返回副本，调用方修改结果不影响缓存
+            return copy.deepcopy(cached["data"])
+        response.raise_for_status()
+
+        data = response.json()
+        if not data:
+            raise ValueError("No data returned from Tripadvisor API")
+        parsed = parser(data)
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self.conditional_cache.set(key, {"etag": etag, "last_modified": last_modified, "data": copy.deepcopy(parsed)})
+        return parsed
 
     @property
     def source_name(self) -> str:
@@ -165,18 +279,100 @@ class TripAdvisorSource(BaseAPI):
 
         try:
             data = await self._make_api_request("location/nearby_search", params)
+            # 记录已搜索区域，供 search_nearby_locations_indexed 本地应答
+            scope = self.geo_index.scope(category, language)
+            self.geo_index.mark_covered(self.geo_index.cell_of(latitude, longitude), scope)
             if not data:
                 return {"success": False, "error": "No data returned from Tripadvisor API"}
 
             if not data.get("data", None):
                 return {"success": False, "error": "No data returned from Tripadvisor API"}
 
+            self.geo_index.add_nearby_results(latitude, longitude, data.get("data", []), scope)
             return {"success": True, "data": data.get("data", [])}
 
         except Exception as e:
             logger.error(f"Error searching nearby locations: {e}")
             return {"success": False, "error": str(e)}
 
+    async def search_nearby_locations_indexed(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float = 1.0,
+        language: str = "en",
+        category: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Search for locations near a specific latitude/longitude, answering from the local spatial index when possible.
+
+        The area around the point is split into grid cells of about 1.2 km x 0.6 km. Cells already searched in the
+        last day (by this method or search_nearby_locations, with the same category and language) are answered
+        locally, and only uncovered cells are searched through the API, from their centers. Distances and bearings
+        are recomputed from the query point; positions of locations whose details were never fetched are estimated
+        from the distance and compass bearing reported by the API. Without a category, locations whose details were
+        fetched are returned too. Each API search returns only the nearest locations, so in dense areas some locations
+        of a covered cell may be missing.
+
+        Args:
+            latitude(float): Latitude coordinate
+            longitude(float): Longitude coordinate
+            radius_km(float): Search radius in kilometers (default: 1.0)
+            language(str): Language code (default: 'en')
+            category(str): Optional category filter ('hotels', 'attractions', 'restaurants')
+            limit(int): Maximum number of locations returned, nearest first (default: all)
+
+        Returns:
+            Dict[str, Any]: Dictionary containing the search results, e.g.
+            {
+                "success": True,               # Whether successful
+                "data": [                      # Same fields as search_nearby_locations, nearest first
+                    {
+                        "location_id": "13189438", # Location ID
+                        "name": "Hotel Xcaret Mexico", # Location name
+                        "distance": "0.412300", # Distance from the query point in miles
+                        "bearing": "southeast", # Direction from the query point
+                        "approximate_position": True, # Whether the location position is estimated
+                        "address_obj": {...} # Location address
+                    },
+                    ...
+                ],
+                "coverage": {
+                    "cells": 6,                # Cells intersecting the search radius
+                    "fetched": 2,              # Cells searched through the API by this call
+                    "failed": 0,               # Cells whose search failed, their locations may be missing
+                    "skipped": 0               # Uncovered cells over the per-call fetch limit
+                }
+            }
+        """
+        scope = self.geo_index.scope(category, language)
+        cells = self.geo_index.cells_in_radius(latitude, longitude, radius_km)
+        uncovered = [cell for cell in cells if not self.geo_index.is_covered(cell, scope)]
+        self.geo_index.record_query(len(cells), len(uncovered))
+        to_fetch = uncovered[:MAX_NEARBY_CELL_FETCHES]
+
+        async def _fetch_cell(cell: str) -> bool:
+            min_lat, min_lon, max_lat, max_lon = geohash_bounds(cell)
+            await self.search_nearby_locations((min_lat + max_lat) / 2, (min_lon + max_lon) / 2, language, category)
+            return self.geo_index.is_covered(cell, scope)
+
+        try:
+            fetched = await asyncio.gather(*(_fetch_cell(cell) for cell in to_fetch))
+            return {
+                "success": True,
+                "data": self.geo_index.nearby(latitude, longitude, radius_km, scope, limit),
+                "coverage": {
+                    "cells": len(cells),
+                    "fetched": sum(fetched),
+                    "failed": len(fetched) - sum(fetched),
+                    "skipped": len(uncovered) - len(to_fetch),
+                },
+            }
+        except Exception as e:
+            logger.error(f"Error searching nearby locations from index: {e}")
+            return {"success": False, "error": str(e)}
+
     async def get_location_details(
         self,
         locationId: int,
@@ -277,11 +473,9 @@ class TripAdvisorSource(BaseAPI):
         location_id_str = str(locationId)
 
         try:
-            data = await self._make_api_request(f"location/{location_id_str}/details", params)
-            if not data:
-                return {"success": False, "error": "No data returned from Tripadvisor API"}
-
-            return {"success": True, "data": self._parse_location_details(data)}
+            details = await self._fetch_revalidated(f"location/{location_id_str}/details", params, self._parse_location_details)
+            self._index_location_details(details)
+            return {"success": True, "data": details}
         except Exception as e:
             logger.error(f"Error getting location details: {e}")
             return {"success": False, "error": str(e)}
@@ -403,15 +597,111 @@ class TripAdvisorSource(BaseAPI):
         location_id_str = str(locationId)
 
         try:
-            data = await self._make_api_request(f"location/{location_id_str}/photos", params)
-            if not data:
-                return {"success": False, "error": "No data returned from Tripadvisor API"}
-
-            return {"success": True, "data": self._parse_photos(data)}
+            photos = await self._fetch_revalidated(f"location/{location_id_str}/photos", params, self._parse_photos)
+            return {"success": True, "data": photos}
         except Exception as e:
             logger.error(f"Error getting location photos: {e}")
             return {"success": False, "error": str(e)}
 
+    async def get_location_bundle(
+        self,
+        locationIds: Union[int, str, List[Union[int, str]]],
+        language: str = "en",
+        sections: Optional[List[str]] = None,
+        max_concurrency: int = 8,
+    ) -> Dict[str, Any]:
+        """
+        Get the details, reviews and photos of one or many locations in one call.
+
+        All sections of all locations are fetched concurrently over the shared connection pool and parsed as they arrive.
+        A failing section does not discard the others: it is set to None and its error is reported in "errors".
+
+        Args:
+            locationIds(List[int]): Tripadvisor location ID or list of IDs (can be string or integer)
+            language(str): Language code (default: 'en')
+            sections(List[str]): Sections to fetch, any of 'details', 'reviews', 'photos' (default: all)
+            max_concurrency(int): Maximum number of concurrent requests (default: 8)
+
+        Returns:
+            Dict[str, Any]: Dictionary containing the bundles by location ID, e.g.
+            {
+                "success": True,               # False only if every location failed
+                "data": {
+                    "locations": {
+                        "13189438": {
+                            "location_id": "13189438",
+                            "details": {...},  # Same as get_location_details data, None if it failed
+                            "reviews": [...],  # Same as get_location_reviews data, None if it failed
+                            "photos": [...],   # Same as get_location_photos data, None if it failed
+                            "errors": {"photos": "..."}  # Error of every failed section
+                        }
+                    },
+                    "failed_locations": [      # Locations whose sections all failed
+                        {"location_id": "123", "error": "..."}
+                    ]
+                }
+            }
+        """
+        if not isinstance(locationIds, (list, tuple)):
+            locationIds = [locationIds]
+        sections = list(dict.fromkeys(sections or BUNDLE_SECTIONS))
+        unknown = [section for section in sections if section not in BUNDLE_SECTIONS]
+        if unknown:
+            return {"success": False, "error": f"Unknown sections: {unknown}, options: {list(BUNDLE_SECTIONS)}"}
+
+        location_ids = list(dict.fromkeys(str(location_id) for location_id in locationIds))
+        bundles: Dict[str, Dict[str, Any]] = {
+            location_id: {"location_id": location_id, **{section: None for section in sections}, "errors": {}} for location_id in location_ids
+        }
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def _fetch(location_id: str, section: str) -> None:
+            endpoint, parser = BUNDLE_SECTIONS[section]
+            params = {"language": language}
+            try:
+                async with semaphore:
+                    if section in CONDITIONAL_SECTIONS:
+                        bundles[location_id][section] = await self._fetch_revalidated(
+                            f"location/{location_id}/{endpoint}", params, getattr(self, parser)
+                        )
+                    else:
+                        data = await self._make_api_request(f"location/{location_id}/{endpoint}", params)
+                        if not data:
+                            raise ValueError("No data returned from Tripadvisor API")
+                        # 每个部分到达后立即解析
+                        bundles[location_id][section] = getattr(self, parser)(data)
+                if section == "details":
+                    self._index_location_details(bundles[location_id][section])
+            except Exception as e:
+                logger.error(f"Error getting location {section} of {location_id}: {e}")
+                bundles[location_id]["errors"][section] = str(e)
+
+        try:
+            await asyncio.gather(*(_fetch(location_id, section) for location_id in location_ids for section in sections))
+        except Exception as e:
+            logger.error(f"Error getting location bundles: {e}")
+            return {"success": False, "error": str(e)}
+
+        failed_locations = [
+            {"location_id": location_id, "error": "; ".join(f"{section}: {error}" for section, error in bundle["errors"].items())}
+            for location_id, bundle in bundles.items()
+            if len(bundle["errors"]) == len(sections)
+        ]
+        if location_ids and len(failed_locations) == len(location_ids):
+            return {"success": False, "error": failed_locations[0]["error"]}
+        return {"success": True, "data": {"locations": bundles, "failed_locations": failed_locations}}
+
+    def _index_location_details(self, details: Dict[str, Any]) -> None:
+        """Store the exact position of a location in the spatial index"""
+        if not details.get("location_id"):
+            return
+        try:
+            latitude, longitude = float(details["latitude"]), float(details["longitude"])
+        except (TypeError, ValueError):
+            return
+        record = {"location_id": details["location_id"], "name": details["name"], "address_obj": details["address_obj"]}
+        self.geo_index.add(details["location_id"], record, latitude, longitude)
+
     def _parse_reviews(self, data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Parse location review data"""
         reviews = []
@@ -3,17 +3,29 @@ Twitter data source implementation
 """
 
 import asyncio
+import copy
 import json
 import logging
+import os
+import time
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 import aiohttp
 
 from .base import BaseAPI
+from .compact_records import CompactRecords
+from .local_cache import JsonStateStore, TtlCache
 
 logger = logging.getLogger("twitter_source")
 
+# 批量采集断点中保留的最近推文ID数量，恢复时用于跳过已产出的推文
+MAX_CHECKPOINT_IDS = 1000
+# 批量采集断点的有效期（秒），过期后重新从第一页采集
+CHECKPOINT_TTL = 86400
+# 用户资料缓存有效期（秒）
+USER_PROFILE_TTL = 3600
+
 
 class TwitterSource(BaseAPI):
     """Twitter data source"""
@@ -29,6 +41,16 @@ class TwitterSource(BaseAPI):
             "X-Biz-Id":"matrix-agent",
             "X-Request-Timeout": str(config["timeout"]-5),
             }
+        # 批量采集的分页断点，配置了 cache_dir 时持久化
+        checkpoint_path = os.path.join(config["cache_dir"], "twitter_search_checkpoints.json") if config.get("cache_dir") else None
+        self.search_checkpoints = JsonStateStore(checkpoint_path)
+        # 增量搜索的水位线（每个搜索已返回的最新推文）
+        watermarks_path = os.path.join(config["cache_dir"], "twitter_search_watermarks.json") if config.get("cache_dir") else None
+        self.search_watermarks = JsonStateStore(watermarks_path)
+        # 用户名与 user_id 的对应关系长期有效，持久化保存；用户资料会变化，只在内存中缓存一段时间
+        user_ids_path = os.path.join(config["cache_dir"], "twitter_user_ids.json") if config.get("cache_dir") else None
+        self.user_ids = JsonStateStore(user_ids_path)
+        self.user_profiles = TtlCache(ttl=USER_PROFILE_TTL, max_entries=5000)
 
     @property
     def source_name(self) -> str:
@@ -52,6 +74,7 @@ class TwitterSource(BaseAPI):
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
         cursor: Optional[str] = None,
+        compact: bool = False,
     ) -> Dict[str, Any]:
         """
         Search for tweets.
@@ -66,6 +89,7 @@ class TwitterSource(BaseAPI):
             start_date (Optional[str]): Start date, format: YYYY-MM-DD, default is None
             end_date (Optional[str]): End date, format: YYYY-MM-DD, default is None
             cursor (Optional[str]): Pagination cursor, used to get next page results, default is None for first page
+            compact (bool): Return tweets as a memory-compact CompactRecords list, records are converted to dicts on access, default is False
 
         Returns:
             Dict[str, Any]: Dictionary containing tweet search results, e.g.
@@ -124,80 +148,335 @@ class TwitterSource(BaseAPI):
         #     ...     print(f"Search failed: {result['error']}")
         # """
         try:
-            # 构建查询参数
-            params = {
-                "query": query,
-                "section": "top",
-                "limit": min(limit, 100),  # API限制最大100条
-            }
-
-            # 添加可选参数
-            if min_retweets is not None:
-                params["min_retweets"] = min_retweets
-            if min_likes is not None:
-                params["min_likes"] = min_likes
-            if min_replies is not None:
-                params["min_replies"] = min_replies
-            if start_date:
-                params["start_date"] = start_date
-            if end_date:
-                params["end_date"] = end_date
+            params = self._build_search_params(query, limit, min_retweets, min_likes, min_replies, start_date, end_date)
             if cursor:
                 params["continuation_token"] = cursor
 
-            request_url = f"{self.proxy_url}/search/search"
-
             # 使用aiohttp发送异步请求
             async with aiohttp.ClientSession(trust_env=True) as session:
-                async with session.get(request_url, headers=self.headers, params=params, timeout=self._timeout) as response:
-                    response.raise_for_status()
-                    # 解析响应
-                    data = await response.json(content_type=None)
+                data = await self._fetch_search_page(session, params)
 
-            # API返回的是JSON字符串，需要先解析
-            if isinstance(data, str):
-                data = json.loads(data)
+            tweets = self._parse_search_results(data["results"])
+            if compact:
+                tweets = CompactRecords(tweets, shared_fields=("author",))
 
-            if not isinstance(data, dict):
-                raise ValueError(f"Invalid API response format: {data}")
+            return {
+                "success": True,
+                "data": {"query": query, "count": len(tweets), "tweets": tweets, "cursor": data.get("continuation_token")},
+            }
 
-            if "results" not in data:
-                raise ValueError(f"Missing results field in API response: {data}")
+        except asyncio.TimeoutError:
+            error_msg = f"Request timeout (timeout={self._timeout}s)"
+            logger.error(error_msg)
+            return {"success": False, "error": error_msg}
+        except aiohttp.ClientError as e:
+            error_msg = f"HTTP request error: {str(e)}"
+            logger.error(error_msg)
+            return {"success": False, "error": error_msg}
+        except Exception as e:
+            error_msg = f"Error occurred while searching tweets: {str(e)}"
+            logger.error(error_msg)
+            logger.exception(e)
+            return {"success": False, "error": error_msg}
 
-            tweets = []
-            for result in data["results"]:
-                if not isinstance(result, dict):
-                    logger.warning(f"Skipping invalid tweet data: {result}")
-                    continue
-
-                tweet = {
-                    "id": str(result.get("tweet_id")),
-                    "created_at": self._format_date(result.get("creation_date")),
-                    "text": result.get("text", ""),
-                    "media_urls": result.get("media_urls", []) if isinstance(result.get("media_urls"), list) else [],
-                    "video_urls": result.get("video_urls", []) if isinstance(result.get("video_urls"), list) else [],
-                    "author": {
-                        "id": str(result.get("user", {}).get("user_id")),
-                        "name": result.get("user", {}).get("name"),
-                        "username": result.get("user", {}).get("username"),
-                        "followers_count": result.get("user", {}).get("follower_count", 0),
-                        "is_verified": result.get("user", {}).get("is_verified", False),
-                        "is_blue_verified": result.get("user", {}).get("is_blue_verified", False),
-                    },
-                    "public_metrics": {
-                        "retweet_count": result.get("retweet_count", 0),
-                        "reply_count": result.get("reply_count", 0),
-                        "like_count": result.get("favorite_count", 0),
-                        "quote_count": result.get("quote_count", 0),
-                        "view_count": result.get("views", 0),
-                        "bookmark_count": result.get("bookmark_count", 0),
-                    },
+    async def collect_tweets(
+        self,
+        query: str,
+        target_count: int = 1000,
+        time_budget: Optional[float] = None,
+        min_retweets: Optional[int] = None,
+        min_likes: Optional[int] = None,
+        min_replies: Optional[int] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        resume: bool = True,
+        compact: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Collect a large number of tweets for a search, beyond the 100 tweets of a single search_tweets page.
+
+        Pages are followed automatically and tweets are de-duplicated by ID. Collection stops once target_count
+        tweets were collected, the time budget is spent or the results are exhausted. When a collection is interrupted
+        by the time budget or an error, its pagination position is checkpointed for a day, so calling again with the
+        same search continues where it stopped. Completed collections start from the first page again.
+
+        Args:
+            query (str): Search keyword, e.g. "Tesla" or "#TSLA"
+            target_count (int): Number of tweets to collect, default is 1000
+            time_budget (Optional[float]): Maximum collection time in seconds, default is None for no limit
+            min_retweets (Optional[int]): Minimum number of retweets, default is None
+            min_likes (Optional[int]): Minimum number of likes, default is None
+            min_replies (Optional[int]): Minimum number of replies, default is None
+            start_date (Optional[str]): Start date, format: YYYY-MM-DD, default is None
+            end_date (Optional[str]): End date, format: YYYY-MM-DD, default is None
+            resume (bool): Continue from the checkpoint of an interrupted collection of the same search if there is one, default is True
+            compact (bool): Store tweets in a memory-compact CompactRecords list while collecting, records are converted to dicts on access, default is False
+
+        Returns:
+            Dict[str, Any]: Dictionary containing the collected tweets, e.g.
+            {
+                "success": True,               # False only if nothing could be collected
+                "data": {
+                    "query": "Tesla",          # Search keyword
+                    "count": 1000,             # Number of tweets collected
+                    "tweets": [...],           # Tweet list, same fields as search_tweets
+                    "pages": 11,               # Number of pages fetched
+                    "cursor": "cursor123",     # Cursor to continue from, None when results are exhausted
+                    "stop_reason": "target_reached",  # target_reached / time_budget / exhausted / error
+                    "error": None              # Error of the page that stopped the collection
                 }
-                tweets.append(tweet)
+            }
+        """
+        state: Dict[str, Any] = {}
+        tweets: Any = CompactRecords(shared_fields=("author",)) if compact else []
+        async for tweet in self.iter_search_tweets(
+            query,
+            target_count=target_count,
+            time_budget=time_budget,
+            min_retweets=min_retweets,
+            min_likes=min_likes,
+            min_replies=min_replies,
+            start_date=start_date,
+            end_date=end_date,
+            resume=resume,
+            state=state,
+        ):
+            tweets.append(tweet)
+
+        if not tweets and state.get("error"):
+            return {"success": False, "error": state["error"]}
+
+        return {
+            "success": True,
+            "data": {
+                "query": query,
+                "count": len(tweets),
+                "tweets": tweets,
+                "pages": state.get("pages", 0),
+                "cursor": state.get("cursor"),
+                "stop_reason": state.get("stop_reason"),
+                "error": state.get("error"),
+            },
+        }
+
+    async def iter_search_tweets(
+        self,
+        query: str,
+        target_count: int = 1000,
+        time_budget: Optional[float] = None,
+        min_retweets: Optional[int] = None,
+        min_likes: Optional[int] = None,
+        min_replies: Optional[int] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        resume: bool = True,
+        state: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream tweets of a search page by page, following cursors automatically.
+
+        Same stopping and checkpointing behaviour as collect_tweets; tweets are yielded as soon as their page is
+        parsed. Breaking out of the loop early checkpoints the position of the last yielded tweet.
+        If a state dict is passed it is filled with pages, cursor, stop_reason and error.
+        """
+        state = state if state is not None else {}
+        state.update({"pages": 0, "cursor": None, "stop_reason": None, "error": None})
+
+        params = self._build_search_params(query, 100, min_retweets, min_likes, min_replies, start_date, end_date)
+        checkpoint_key = json.dumps(params, sort_keys=True, ensure_ascii=False)
+        checkpoint = self.search_checkpoints.get(checkpoint_key) if resume else None
+        if checkpoint is not None and time.time() - checkpoint.get("saved_at", 0) > CHECKPOINT_TTL:
+            checkpoint = None
+
+        # 当前页的游标：本页未全部产出时，断点停留在本页，恢复后重新拉取并靠去重跳过已产出的推文
+        page_cursor = checkpoint["cursor"] if checkpoint else None
+        seen_ids = set(checkpoint["ids"]) if checkpoint else set()
+        recent_ids = list(checkpoint["ids"]) if checkpoint else []
+        next_cursor = page_cursor
+        page_done = True
+        yielded = 0
+        deadline = time.monotonic() + time_budget if time_budget is not None else None
+
+        try:
+            async with aiohttp.ClientSession(trust_env=True) as session:
+                while True:
+                    if yielded >= target_count:
+                        state["stop_reason"] = "target_reached"
+                        break
+                    if state["pages"] and not next_cursor:
+                        state["stop_reason"] = "exhausted"
+                        break
+                    remaining = deadline - time.monotonic() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        state["stop_reason"] = "time_budget"
+                        break
+
+                    page_params = dict(params)
+                    if next_cursor:
+                        page_params["continuation_token"] = next_cursor
+                    try:
+                        data = await asyncio.wait_for(self._fetch_search_page(session, page_params), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        if deadline is not None and time.monotonic() >= deadline:
+                            state["stop_reason"] = "time_budget"
+                        else:
+                            state["stop_reason"] = "error"
+                            state["error"] = f"Request timeout (timeout={self._timeout}s)"
+                            logger.error(state["error"])
+                        break
+                    except Exception as e:
+                        state["stop_reason"] = "error"
+                        state["error"] = f"Error occurred while searching tweets: {str(e)}"
+                        logger.error(state["error"])
+                        break
+
+                    state["pages"] += 1
+                    page_cursor, next_cursor = next_cursor, data.get("continuation_token")
+                    page_done = False
+                    tweets = self._parse_search_results(data["results"])
+                    if not tweets or next_cursor == page_cursor:
+                        # 空页或游标不再前进，说明结果已取完
+                        next_cursor = None
+                    for tweet in tweets:
+                        if tweet["id"] in seen_ids:
+                            continue
+                        if yielded >= target_count:
+                            break
+                        seen_ids.add(tweet["id"])
+                        recent_ids.append(tweet["id"])
+                        yielded += 1
+                        yield tweet
+                    else:
+                        page_done = True
+                        self._save_search_checkpoint(checkpoint_key, next_cursor, recent_ids, exhausted=not next_cursor)
+        finally:
+            state["cursor"] = next_cursor if page_done else page_cursor
+            # 只为被中断的采集（时间预算、错误或调用方提前结束）保留断点；停在第一页中途时游标为 None，仍需保留已产出的 id
+            finished = state["stop_reason"] in ("target_reached", "exhausted")
+            exhausted = page_done and state["pages"] > 0 and not next_cursor
+            # 恢复的游标在第一次请求就失败时可能已失效，丢弃断点，下次从第一页重新采集
+            stale_cursor = checkpoint is not None and state["pages"] == 0 and state["stop_reason"] == "error"
+            self._save_search_checkpoint(checkpoint_key, state["cursor"], recent_ids, exhausted=finished or exhausted or stale_cursor)
+
+    async def search_new_tweets(
+        self,
+        query: str,
+        limit: int = 100,
+        min_retweets: Optional[int] = None,
+        min_likes: Optional[int] = None,
+        min_replies: Optional[int] = None,
+        max_pages: int = 10,
+    ) -> Dict[str, Any]:
+        """
+        Search for tweets posted since the previous run of the same search, for scheduled polling.
+
+        The newest tweet returned by each run is stored locally as the high-water mark of the search. The next run
+        only requests the latest tweets from the day of that mark onwards and stops paginating as soon as it reaches
+        tweets at or below the mark. The first run of a search returns the latest tweets and sets the mark.
+
+        A run that hits limit or max_pages before reaching the mark keeps the old mark and records the id ranges it
+        already returned, so the next run skips those tweets and still fetches the ones in between. The mark advances
+        once a run reaches it.
+
+        Args:
+            query (str): Search keyword, e.g. "Tesla" or "#TSLA"
+            limit (int): Maximum number of new tweets to return, default is 100
+            min_retweets (Optional[int]): Minimum number of retweets, default is None
+            min_likes (Optional[int]): Minimum number of likes, default is None
+            min_replies (Optional[int]): Minimum number of replies, default is None
+            max_pages (int): Maximum number of pages to request, default is 10
+
+        Returns:
+            Dict[str, Any]: Dictionary containing the new tweets, e.g.
+            {
+                "success": True,
+                "data": {
+                    "query": "Tesla",          # Search keyword
+                    "count": 12,               # Number of new tweets
+                    "tweets": [...],           # New tweets, newest first, same fields as search_tweets
+                    "pages": 1,                # Number of pages requested
+                    "complete": True,          # False if limit or max_pages was hit before reaching the previous mark,
+                                               # the older new tweets are returned by the next run in that case
+                    "previous_mark": {"tweet_id": "1900000000000000000", "created_at": "2025-03-13 18:08:35"},
+                    "mark": {                  # Mark saved for the next run
+                        "tweet_id": "1900000000000000123",
+                        "created_at": "2025-03-13 19:20:11",
+                        "returned": []         # [lowest id, highest id] ranges above the mark already returned,
+                                               # only present while complete is False
+                    }
+                }
+            }
+        """
+        try:
+            params = self._build_search_params(query, limit, min_retweets, min_likes, min_replies, None, None, section="latest")
+            mark_key = json.dumps({k: v for k, v in params.items() if k != "limit"}, sort_keys=True, ensure_ascii=False)
+            previous_mark = self.search_watermarks.get(mark_key)
+            mark_id = int(previous_mark["tweet_id"]) if previous_mark else None
+            if previous_mark and previous_mark.get("created_at"):
+                # start_date 只精确到天，同一天内的旧推文由ID过滤
+                params["start_date"] = previous_mark["created_at"][:10]
+
+            # 上次未完成时已返回过的ID区间，本次跳过这些推文，继续补抓区间与水位线之间的推文
+            returned = [(int(low), int(high)) for low, high in (previous_mark or {}).get("returned", [])]
+
+            tweets: List[Dict[str, Any]] = []
+            seen_ids = set()
+            # 本次连续扫描过（返回或跳过）的推文ID范围及其中最新的推文
+            scanned: Optional[Tuple[int, int]] = None
+            newest = None
+            pages = 0
+            # 首次运行没有水位线，取到的最新推文即为完整结果
+            complete = mark_id is None
+            cursor = None
+            async with aiohttp.ClientSession(trust_env=True) as session:
+                while pages < max_pages and len(tweets) < limit:
+                    page_params = dict(params)
+                    if cursor:
+                        page_params["continuation_token"] = cursor
+                    data = await self._fetch_search_page(session, page_params)
+                    pages += 1
+
+                    page = self._parse_search_results(data["results"])
+                    reached_mark = False
+                    for tweet in page:
+                        tweet_id = int(tweet["id"]) if tweet["id"].isdigit() else None
+                        if mark_id is not None and tweet_id is not None and tweet_id <= mark_id:
+                            reached_mark = True
+                            continue
+                        if len(tweets) >= limit:
+                            break
+                        if tweet_id is not None:
+                            if scanned is None or tweet_id > scanned[1]:
+                                newest = tweet
+                            scanned = (min(tweet_id, scanned[0]), max(tweet_id, scanned[1])) if scanned else (tweet_id, tweet_id)
+                            if any(low <= tweet_id <= high for low, high in returned):
+                                continue
+                        if tweet["id"] not in seen_ids:
+                            seen_ids.add(tweet["id"])
+                            tweets.append(tweet)
+
+                    cursor = data.get("continuation_token")
+                    # 已到达水位线或结果取完时停止翻页
+                    if reached_mark or not page or not cursor:
+                        complete = True
+                        break
+
+            mark = self._next_search_mark(previous_mark, newest, returned, scanned, complete)
+            if mark != previous_mark:
+                self.search_watermarks.set(mark_key, mark)
+                self.search_watermarks.save()
 
             return {
                 "success": True,
-                "data": {"query": query, "count": len(tweets), "tweets": tweets, "cursor": data.get("continuation_token")},
+                "data": {
+                    "query": query,
+                    "count": len(tweets),
+                    "tweets": tweets,
+                    "pages": pages,
+                    "complete": complete,
+                    "previous_mark": previous_mark,
+                    "mark": mark,
+                },
             }
 
         except asyncio.TimeoutError:
@@ -209,14 +488,149 @@ class TwitterSource(BaseAPI):
             logger.error(error_msg)
             return {"success": False, "error": error_msg}
         except Exception as e:
-            error_msg = f"Error occurred while searching tweets: {str(e)}"
+            error_msg = f"Error occurred while searching new tweets: {str(e)}"
             logger.error(error_msg)
             logger.exception(e)
             return {"success": False, "error": error_msg}
 
+    @staticmethod
+    def _next_search_mark(
+        previous_mark: Optional[Dict[str, Any]],
+        newest: Optional[Dict[str, Any]],
+        returned: List[Tuple[int, int]],
+        scanned: Optional[Tuple[int, int]],
+        complete: bool,
+    ) -> Optional[Dict[str, Any]]:
+        """Build the watermark saved after a search_new_tweets run
+
+        A complete run moves the mark to the newest tweet it scanned. An incomplete run keeps the previous mark and
+        merges the id range it scanned into the returned ranges, so the tweets between those ranges and the mark are
+        fetched by the next run.
+        """
+        if complete:
+            if newest is None:
+                return previous_mark and {"tweet_id": previous_mark["tweet_id"], "created_at": previous_mark.get("created_at")}
+            return {"tweet_id": newest["id"], "created_at": newest["created_at"]}
+
+        if scanned is not None:
+            # 扫描范围内的推文均已返回，与其重叠的旧区间合并为一个区间
+            low, high = scanned
+            kept = []
+            for range_low, range_high in returned:
+                if range_high < low or range_low > high:
+                    kept.append((range_low, range_high))
+                else:
+                    low, high = min(low, range_low), max(high, range_high)
+            returned = sorted(kept + [(low, high)], reverse=True)
+        return {
+            "tweet_id": previous_mark["tweet_id"],
+            "created_at": previous_mark.get("created_at"),
+            "returned": [[str(low), str(high)] for low, high in returned],
+        }
+
+    def _save_search_checkpoint(self, checkpoint_key: str, cursor: Optional[str], recent_ids: List[str], exhausted: bool) -> None:
+        """Persist the pagination position of a bulk search, or drop it once the search needs no resuming
+
+        A None cursor means the position is still on the first page; the yielded ids are kept so that a resumed
+        search skips them.
+        """
+        if exhausted:
+            self.search_checkpoints.delete(checkpoint_key)
+        else:
+            del recent_ids[:-MAX_CHECKPOINT_IDS]
+            self.search_checkpoints.set(checkpoint_key, {"cursor": cursor, "ids": recent_ids, "saved_at": time.time()})
+        self.search_checkpoints.save()
+
+    def _build_search_params(
+        self,
+        query: str,
+        limit: int,
+        min_retweets: Optional[int],
+        min_likes: Optional[int],
+        min_replies: Optional[int],
+        start_date: Optional[str],
+        end_date: Optional[str],
+        section: str = "top",
+    ) -> Dict[str, Any]:
+        """Build the query parameters of a tweet search"""
+        # 构建查询参数
+        params = {
+            "query": query,
+            "section": section,
+            "limit": min(limit, 100),  # API限制最大100条
+        }
+
+        # 添加可选参数
+        if min_retweets is not None:
+            params["min_retweets"] = min_retweets
+        if min_likes is not None:
+            params["min_likes"] = min_likes
+        if min_replies is not None:
+            params["min_replies"] = min_replies
+        if start_date:
+            params["start_date"] = start_date
+        if end_date:
+            params["end_date"] = end_date
+        return params
+
+    async def _fetch_search_page(self, session: aiohttp.ClientSession, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Request one page of tweet search results"""
+        request_url = f"{self.proxy_url}/search/search"
+
+        async with session.get(request_url, headers=self.headers, params=params, timeout=self._timeout) as response:
+            response.raise_for_status()
+            # 解析响应
+            data = await response.json(content_type=None)
+
+        # API返回的是JSON字符串，需要先解析
+        if isinstance(data, str):
+            data = json.loads(data)
+
+        if not isinstance(data, dict):
+            raise ValueError(f"Invalid API response format: {data}")
+
+        if "results" not in data:
+            raise ValueError(f"Missing results field in API response: {data}")
+
+        return data
+
+    def _parse_search_results(self, results: List[Any]) -> List[Dict[str, Any]]:
+        """Parse the results of a tweet search page"""
+        tweets = []
+        for result in results:
+            if not isinstance(result, dict):
+                logger.warning(f"Skipping invalid tweet data: {result}")
+                continue
+
+            tweet = {
+                "id": str(result.get("tweet_id")),
+                "created_at": self._format_date(result.get("creation_date")),
+                "text": result.get("text", ""),
+                "media_urls": result.get("media_urls", []) if isinstance(result.get("media_urls"), list) else [],
+                "video_urls": result.get("video_urls", []) if isinstance(result.get("video_urls"), list) else [],
+                "author": {
+                    "id": str(result.get("user", {}).get("user_id")),
+                    "name": result.get("user", {}).get("name"),
+                    "username": result.get("user", {}).get("username"),
+                    "followers_count": result.get("user", {}).get("follower_count", 0),
+                    "is_verified": result.get("user", {}).get("is_verified", False),
+                    "is_blue_verified": result.get("user", {}).get("is_blue_verified", False),
+                },
+                "public_metrics": {
+                    "retweet_count": result.get("retweet_count", 0),
+                    "reply_count": result.get("reply_count", 0),
+                    "like_count": result.get("favorite_count", 0),
+                    "quote_count": result.get("quote_count", 0),
+                    "view_count": result.get("views", 0),
+                    "bookmark_count": result.get("bookmark_count", 0),
+                },
+            }
+            tweets.append(tweet)
+        return tweets
+
     async def get_user_info(self, username: str, user_id: Optional[str] = None) -> Dict[str, Any]:
         """
-        Get detailed information about a Twitter user.
+        Get detailed information about a Twitter user. Profiles fetched within the last hour are served from cache.
 
         Args:
             username (str): Twitter username without @ symbol
@@ -263,31 +677,17 @@ class TwitterSource(BaseAPI):
         #     ...     print(f"Failed to get user info: {result['error']}")
         # """
         try:
-            # 构建请求URL
-            request_url = f"{self.proxy_url}/user/details"
-
-            # 设置请求参数
-            params = {"username": username}
-
-            if user_id:
-                params["user_id"] = user_id
+            cached = self._get_cached_profile(username, user_id)
+            if cached is not None:
+                return {"success": True, "data": cached}
 
             # 使用aiohttp发送异步请求
             async with aiohttp.ClientSession(trust_env=True) as session:
-                async with session.get(request_url, headers=self.headers, params=params, timeout=self._timeout) as response:
-                    response.raise_for_status()
-                    # 解析响应
-                    data = await response.json(content_type=None)
-
-            # 解析响应数据
-            if isinstance(data, str):
-                data = json.loads(data)
-
-            if not isinstance(data, dict):
-                raise ValueError(f"Invalid API response format: {data}")
+                profile = await self._fetch_user_info(session, username, user_id)
+            self.user_ids.save()
 
             # 构建返回数据
-            return {"success": True, "data": self._parse_user_info(data)}
+            return {"success": True, "data": profile}
 
         except asyncio.TimeoutError:
             error_msg = f"Request timeout (timeout={self._timeout}s)"
@@ -303,8 +703,134 @@ class TwitterSource(BaseAPI):
             logger.exception(e)
             return {"success": False, "error": error_msg}
 
+    async def get_users_info(self, usernames: List[str], max_concurrency: int = 10) -> Dict[str, Any]:
+        """
+        Get detailed information about many Twitter users at once.
+
+        Recently fetched profiles are served from cache, the remaining users are fetched concurrently.
+
+        Args:
+            usernames (List[str]): Twitter usernames without @ symbol
+            max_concurrency (int): Maximum number of concurrent requests, default is 10
+
+        Returns:
+            Dict[str, Any]: Dictionary containing user information, e.g.
+            {
+                "success": True,               # False only if every user failed
+                "data": {
+                    "users": {                 # User information by username, same fields as get_user_info
+                        "elonmusk": {"id": "44196397", "username": "elonmusk", ...}
+                    },
+                    "cached": 1,               # Number of users served from cache
+                    "fetched": 0,              # Number of users fetched from the API
+                    "failed_users": [          # Failed user information
+                        {"username": "nonexistent", "error": "..."}
+                    ]
+                }
+            }
+        """
+        try:
+            users: Dict[str, Any] = {}
+            to_fetch = []
+            for username in dict.fromkeys(usernames):
+                cached = self._get_cached_profile(username)
+                if cached is not None:
+                    users[username] = cached
+                else:
+                    to_fetch.append(username)
+            cached_count = len(users)
+
+            failed_users = []
+            if to_fetch:
+                semaphore = asyncio.Semaphore(max_concurrency)
+
+                async def _fetch(session: aiohttp.ClientSession, username: str) -> Dict[str, Any]:
+                    async with semaphore:
+                        return await self._fetch_user_info(session, username, self.user_ids.get(self._username_key(username)))
+
+                async with aiohttp.ClientSession(trust_env=True) as session:
+                    results = await asyncio.gather(*[_fetch(session, username) for username in to_fetch], return_exceptions=True)
+                self.user_ids.save()
+
+                for username, result in zip(to_fetch, results):
+                    if isinstance(result, asyncio.TimeoutError):
+                        failed_users.append({"username": username, "error": f"Request timeout (timeout={self._timeout}s)"})
+                    elif isinstance(result, Exception):
+                        failed_users.append({"username": username, "error": str(result)})
+                    else:
+                        users[username] = result
+
+            if usernames and not users:
+                error_msg = "All user info requests failed:\n" + "\n".join([f"{f['username']}: {f['error']}" for f in failed_users])
+                return {"success": False, "error": error_msg}
+
+            return {
+                "success": True,
+                "data": {"users": users, "cached": cached_count, "fetched": len(users) - cached_count, "failed_users": failed_users},
+            }
+
+        except Exception as e:
+            error_msg = f"Error occurred while getting users info: {str(e)}"
+            logger.error(error_msg)
+            logger.exception(e)
+            return {"success": False, "error": error_msg}
+
+    async def _fetch_user_info(self, session: aiohttp.ClientSession, username: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """Request and parse a user profile, caching it together with the username/user_id mapping"""
+        # 构建请求URL
+        request_url = f"{self.proxy_url}/user/details"
+
+        # 设置请求参数
+        params = {"username": username}
+
+        if user_id:
+            params["user_id"] = user_id
+
+        async with session.get(request_url, headers=self.headers, params=params, timeout=self._timeout) as response:
+            response.raise_for_status()
+            # 解析响应
+            data = await response.json(content_type=None)
+
+        # 解析响应数据
+        if isinstance(data, str):
+            data = json.loads(data)
+
+        if not isinstance(data, dict):
+            raise ValueError(f"Invalid API response format: {data}")
+
+        profile = self._parse_user_info(data)
+        self._remember_user_id(profile["username"], profile["id"])
+        if profile["id"] != "None":
+            self.user_profiles.set(profile["id"], copy.deepcopy(profile))
+        return profile
+
+    def _username_key(self, username: str) -> str:
+        """Cache key of a username, handles are case-insensitive"""
+        return username.lstrip("@").lower()
+
+    def _remember_user_id(self, username: Optional[str], user_id: Optional[str]) -> None:
+        """Record a username/user_id pair in the resolution cache"""
+        if not username or not user_id or user_id == "None":
+            return
+        key = self._username_key(username)
+        if self.user_ids.get(key) != user_id:
+            self.user_ids.set(key, user_id)
+
+    def _get_cached_profile(self, username: str, user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Get a cached profile by user_id, or by the cached user_id of username"""
+        user_id = user_id or self.user_ids.get(self._username_key(username))
+        profile = self.user_profiles.get(user_id) if user_id else None
+        # 返回副本，调用方修改结果不影响缓存
+        return copy.deepcopy(profile) if profile is not None else None
+
     async def get_user_tweets(
-        self, username: str, limit: int = 10, user_id: Optional[str] = None, include_replies: bool = False, include_pinned: bool = False
+        self,
+        username: str,
+        limit: int = 10,
+        user_id: Optional[str] = None,
+        include_replies: bool = False,
+        include_pinned: bool = False,
+        compact: bool = False,
     ) -> Dict[str, Any]:
         """
         Get a list of tweets from a Twitter user.
@@ -312,9 +838,10 @@ class TwitterSource(BaseAPI):
         Args:
             username (str): Twitter username without @ symbol
             limit (int): Maximum number of tweets to return, default is 10
-            user_id (Optional[str]): Twitter user ID, default is None, if provided user_id, username will be ignored
+            user_id (Optional[str]): Twitter user ID, default is None (the cached user ID of username if known), if provided user_id, username will be ignored
             include_replies (bool): Whether to include reply tweets, default is False
             include_pinned (bool): Whether to include pinned tweets, default is False
+            compact (bool): Return tweets as a memory-compact CompactRecords list, records are converted to dicts on access, default is False
 
         Returns:
             Dict[str, Any]: Dictionary containing user tweet list, e.g.
@@ -380,6 +907,8 @@ class TwitterSource(BaseAPI):
                 "include_pinned": str(include_pinned).lower(),
             }
 
+            # 未提供 user_id 时使用缓存的解析结果，省去上游的用户名解析
+            user_id = user_id or self.user_ids.get(self._username_key(username))
             if user_id:
                 params["user_id"] = user_id
 
@@ -406,6 +935,16 @@ class TwitterSource(BaseAPI):
 
                 tweets.append(tweet)
 
+            # 顺带记录时间线作者的 user_id
+            for tweet in tweets:
+                if (tweet["user"]["username"] or "").lower() == self._username_key(username):
+                    self._remember_user_id(tweet["user"]["username"], tweet["user"]["id"])
+                    self.user_ids.save()
+                    break
+
+            if compact:
+                tweets = CompactRecords(tweets, shared_fields=("user",))
+
             return {
                 "success": True,
                 "data": {"username": username, "count": len(tweets), "tweets": tweets, "cursor": data.get("continuation_token")},
@@ -0,0 +1,440 @@
+"""
+Vectorized technical indicators on top of Yahoo Finance price data
+
+All functions operate along the last axis, so a 1-D array is a single series and a 2-D array of shape
+(n_symbols, n_bars) computes the indicator for many symbols at once. Rows of a 2-D batch must be aligned
+bar by bar (see align_columns) and contain no missing values.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+
+PRICE_COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+def prices_to_columns(prices: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Convert the price list returned by get_stock_price into columnar arrays
+
+    Args:
+        prices: data["prices"] of a get_stock_price result
+
+    Returns:
+        Dict[str, np.ndarray]: {"date": ..., "open": ..., "high": ..., "low": ..., "close": ..., "volume": ...}
+    """
+    columns: Dict[str, np.ndarray] = {"date": np.array([p["date"] for p in prices])}
+    for name in PRICE_COLUMNS:
+        columns[name] = np.array([np.nan if p[name] is None else p[name] for p in prices], dtype=float)
+    return columns
+
+
+def bars_to_columns(bars: np.ndarray) -> Dict[str, np.ndarray]:
+    """Convert a bar array from the local price store into columnar arrays
+
+    Args:
+        bars: Structured array with timestamp/open/high/low/close/volume fields
+
+    Returns:
+        Dict[str, np.ndarray]: One float array per field, plus the int64 "timestamp" column
+    """
+    columns = {"timestamp": np.asarray(bars["timestamp"])}
+    for name in PRICE_COLUMNS:
+        columns[name] = np.asarray(bars[name], dtype=float)
+    return columns
+
+
+def drop_missing_bars(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Remove the bars of 1-D columns whose high, low or close is missing
+
+    Yahoo returns null prices for some bars. The recursive indicators (EMA, RSI, MACD, ATR, VWAP) would carry such
+    a NaN into every later value, so those bars are dropped; every column, including "timestamp" or "date", is
+    filtered with the same mask and stays aligned.
+    """
+    mask = ~(np.isnan(_as_float(columns["high"])) | np.isnan(_as_float(columns["low"])) | np.isnan(_as_float(columns["close"])))
+    if mask.all():
+        return columns
+    return {name: np.asarray(values)[mask] for name, values in columns.items()}
+
+
+def align_columns(columns_by_symbol: Dict[str, Dict[str, np.ndarray]]) -> Tuple[List[str], np.ndarray, Dict[str, np.ndarray]]:
+    """Align several symbols on their common bars and stack them into 2-D arrays
+
+    Bars are matched on "timestamp" when every symbol has it, otherwise on "date".
+
+    Args:
+        columns_by_symbol: {symbol: columns}, columns as returned by prices_to_columns or bars_to_columns
+
+    Returns:
+        Tuple[List[str], np.ndarray, Dict[str, np.ndarray]]: (symbols in row order, common keys, {column: 2-D array})
+    """
+    symbols = list(columns_by_symbol)
+    key = "timestamp" if all("timestamp" in c for c in columns_by_symbol.values()) else "date"
+
+    common = None
+    for columns in columns_by_symbol.values():
+        common = columns[key] if common is None else np.intersect1d(common, columns[key])
+    if common is None:
+        return symbols, np.array([]), {name: np.empty((0, 0)) for name in PRICE_COLUMNS}
+
+    stacked: Dict[str, List[np.ndarray]] = {name: [] for name in PRICE_COLUMNS}
+    for columns in columns_by_symbol.values():
+        _, _, index = np.intersect1d(common, columns[key], assume_unique=True, return_indices=True)
+        for name in PRICE_COLUMNS:
+            stacked[name].append(columns[name][index])
+    return symbols, common, {name: np.vstack(rows) for name, rows in stacked.items()}
+
+
+def _as_float(values: Any) -> np.ndarray:
+    return np.asarray(values, dtype=float)
+
+
+def _smooth_from(values: np.ndarray, alpha: float, previous: np.ndarray) -> np.ndarray:
+    """Continue exponential smoothing y[t] = alpha * x[t] + (1 - alpha) * y[t-1] from a previous value"""
+    zi = ((1.0 - alpha) * np.asarray(previous, dtype=float))[..., np.newaxis]
+    smoothed, _ = lfilter([alpha], [1.0, alpha - 1.0], values, axis=-1, zi=zi)
+    return smoothed
+
+
+def _smooth(values: np.ndarray, period: int, alpha: float) -> np.ndarray:
+    """Exponential smoothing seeded with the simple average of the first period values"""
+    out = np.full(values.shape, np.nan)
+    if values.shape[-1] < period:
+        return out
+    seed = values[..., :period].mean(axis=-1)
+    out[..., period - 1] = seed
+    if values.shape[-1] > period:
+        out[..., period:] = _smooth_from(values[..., period:], alpha, seed)
+    return out
+
+
+def _check_period(period: int) -> None:
+    if period < 1:
+        raise ValueError(f"period must be a positive integer, got {period}")
+
+
+def sma(values: Any, period: int) -> np.ndarray:
+    """Simple moving average, NaN until period bars are available"""
+    _check_period(period)
+    x = _as_float(values)
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] >= period:
+        out[..., period - 1 :] = sliding_window_view(x, period, axis=-1).mean(axis=-1)
+    return out
+
+
+def ema(values: Any, period: int) -> np.ndarray:
+    """Exponential moving average with alpha = 2 / (period + 1), seeded with the SMA of the first period bars"""
+    _check_period(period)
+    return _smooth(_as_float(values), period, 2.0 / (period + 1))
+
+
+def _rsi_from_averages(avg_gain: np.ndarray, avg_loss: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi_values = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    # 无下跌时 RSI 为 100，完全无波动时取 50
+    return np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), rsi_values)
+
+
+def rsi(close: Any, period: int = 14) -> np.ndarray:
+    """Relative strength index with Wilder smoothing, first value at index period"""
+    _check_period(period)
+    c = _as_float(close)
+    out = np.full(c.shape, np.nan)
+    if c.shape[-1] < 2:
+        return out
+    delta = np.diff(c, axis=-1)
+    avg_gain = _smooth(np.clip(delta, 0, None), period, 1.0 / period)
+    avg_loss = _smooth(np.clip(-delta, 0, None), period, 1.0 / period)
+    out[..., 1:] = _rsi_from_averages(avg_gain, avg_loss)
+    return out
+
+
+def macd(close: Any, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, np.ndarray]:
+    """Moving average convergence divergence
+
+    Returns:
+        Dict[str, np.ndarray]: {"macd": fast EMA - slow EMA, "signal": EMA of the MACD line, "histogram": macd - signal}
+    """
+    _check_period(signal)
+    c = _as_float(close)
+    line = ema(c, fast) - ema(c, slow)
+    signal_line = np.full(c.shape, np.nan)
+    start = max(fast, slow) - 1
+    if c.shape[-1] > start:
+        signal_line[..., start:] = _smooth(line[..., start:], signal, 2.0 / (signal + 1))
+    return {"macd": line, "signal": signal_line, "histogram": line - signal_line}
+
+
+def bollinger_bands(close: Any, period: int = 20, num_std: float = 2.0) -> Dict[str, np.ndarray]:
+    """Bollinger bands around the SMA using the population standard deviation of the window
+
+    Returns:
+        Dict[str, np.ndarray]: {"middle": ..., "upper": ..., "lower": ...}
+    """
+    _check_period(period)
+    c = _as_float(close)
+    middle = np.full(c.shape, np.nan)
+    std = np.full(c.shape, np.nan)
+    if c.shape[-1] >= period:
+        windows = sliding_window_view(c, period, axis=-1)
+        middle[..., period - 1 :] = windows.mean(axis=-1)
+        std[..., period - 1 :] = windows.std(axis=-1)
+    return {"middle": middle, "upper": middle + num_std * std, "lower": middle - num_std * std}
+
+
+def _true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray, previous_close: Optional[np.ndarray] = None) -> np.ndarray:
+    """True range; the first bar uses high - low unless the close before it is known"""
+    if previous_close is None:
+        prev = close[..., :-1]
+        tr = high - low
+        tr[..., 1:] = np.maximum.reduce([tr[..., 1:], np.abs(high[..., 1:] - prev), np.abs(low[..., 1:] - prev)])
+        return tr
+    prev = np.concatenate([np.asarray(previous_close, dtype=float)[..., np.newaxis], close[..., :-1]], axis=-1)
+    return np.maximum.reduce([high - low, np.abs(high - prev), np.abs(low - prev)])
+
+
+def atr(high: Any, low: Any, close: Any, period: int = 14) -> np.ndarray:
+    """Average true range with Wilder smoothing, first value at index period - 1"""
+    _check_period(period)
+    return _smooth(_true_range(_as_float(high), _as_float(low), _as_float(close)), period, 1.0 / period)
+
+
+def vwap(high: Any, low: Any, close: Any, volume: Any) -> np.ndarray:
+    """Cumulative volume weighted average of the typical price (high + low + close) / 3"""
+    typical = (_as_float(high) + _as_float(low) + _as_float(close)) / 3.0
+    v = _as_float(volume)
+    cum_volume = np.cumsum(v, axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(cum_volume > 0, np.cumsum(typical * v, axis=-1) / cum_volume, np.nan)
+
+
+def compute_indicators(
+    columns: Dict[str, Any],
+    sma_period: int = 20,
+    ema_period: int = 20,
+    rsi_period: int = 14,
+    macd_fast: int = 12,
+    macd_slow: int = 26,
+    macd_signal: int = 9,
+    bollinger_period: int = 20,
+    bollinger_std: float = 2.0,
+    atr_period: int = 14,
+) -> Dict[str, np.ndarray]:
+    """Compute every supported indicator for one series (1-D columns) or a batch of symbols (2-D columns)
+
+    Args:
+        columns: Columnar prices with high/low/close/volume, e.g. from prices_to_columns or align_columns
+
+    Returns:
+        Dict[str, np.ndarray]: Indicator arrays keyed by sma, ema, rsi, macd, macd_signal, macd_histogram,
+            bollinger_middle, bollinger_upper, bollinger_lower, atr and vwap, each shaped like columns["close"]
+    """
+    high, low, close, volume = (_as_float(columns[name]) for name in ("high", "low", "close", "volume"))
+    macd_values = macd(close, macd_fast, macd_slow, macd_signal)
+    bands = bollinger_bands(close, bollinger_period, bollinger_std)
+    return {
+        "sma": sma(close, sma_period),
+        "ema": ema(close, ema_period),
+        "rsi": rsi(close, rsi_period),
+        "macd": macd_values["macd"],
+        "macd_signal": macd_values["signal"],
+        "macd_histogram": macd_values["histogram"],
+        "bollinger_middle": bands["middle"],
+        "bollinger_upper": bands["upper"],
+        "bollinger_lower": bands["lower"],
+        "atr": atr(high, low, close, atr_period),
+        "vwap": vwap(high, low, close, volume),
+    }
+
+
+class _SmoothingState:
+    """Incremental counterpart of _smooth"""
+
+    def __init__(self, period: int, alpha: float):
+        self.period = period
+        self.alpha = alpha
+        self.value: Optional[np.ndarray] = None
+        self._warmup: Optional[np.ndarray] = None
+
+    def update(self, values: np.ndarray) -> np.ndarray:
+        if values.shape[-1] == 0:
+            return np.full(values.shape, np.nan)
+        if self.value is not None:
+            out = _smooth_from(values, self.alpha, self.value)
+            self.value = out[..., -1]
+            return out
+
+        # 尚未攒够 period 根K线，与缓存的数据一起重新计算种子值
+        buffered = values if self._warmup is None else np.concatenate([self._warmup, values], axis=-1)
+        out = _smooth(buffered, self.period, self.alpha)[..., -values.shape[-1] :]
+        if buffered.shape[-1] >= self.period:
+            self.value = out[..., -1]
+            self._warmup = None
+        else:
+            self._warmup = buffered
+        return out
+
+
+class _WindowState:
+    """Rolling window over the last period values, yields mean and population std"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self._tail: Optional[np.ndarray] = None
+
+    def update(self, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        buffered = values if self._tail is None else np.concatenate([self._tail, values], axis=-1)
+        count = values.shape[-1]
+        mean = np.full(values.shape, np.nan)
+        std = np.full(values.shape, np.nan)
+        if buffered.shape[-1] >= self.period and count:
+            windows = sliding_window_view(buffered, self.period, axis=-1)
+            ready = min(windows.shape[-2], count)
+            mean[..., count - ready :] = windows[..., -ready:, :].mean(axis=-1)
+            std[..., count - ready :] = windows[..., -ready:, :].std(axis=-1)
+        self._tail = buffered[..., max(buffered.shape[-1] - (self.period - 1), 0) :]
+        return mean, std
+
+
+class IndicatorEngine:
+    """Incrementally maintained indicators
+
+    Feed bars as they arrive with update(); only the new bars are processed, using the carried-over
+    smoothing values and rolling windows, and the output matches compute_indicators over the full history.
+    Inputs may be 1-D (one symbol) or 2-D (n_symbols, n_new_bars) as long as the shape of the leading axes
+    stays the same between calls.
+    """
+
+    def __init__(
+        self,
+        sma_period: int = 20,
+        ema_period: int = 20,
+        rsi_period: int = 14,
+        macd_fast: int = 12,
+        macd_slow: int = 26,
+        macd_signal: int = 9,
+        bollinger_period: int = 20,
+        bollinger_std: float = 2.0,
+        atr_period: int = 14,
+    ):
+        for period in (sma_period, ema_period, rsi_period, macd_fast, macd_slow, macd_signal, bollinger_period, atr_period):
+            _check_period(period)
+        self.bollinger_std = bollinger_std
+        self._sma = _WindowState(sma_period)
+        self._bollinger = _WindowState(bollinger_period)
+        self._ema = _SmoothingState(ema_period, 2.0 / (ema_period + 1))
+        self._macd_fast = _SmoothingState(macd_fast, 2.0 / (macd_fast + 1))
+        self._macd_slow = _SmoothingState(macd_slow, 2.0 / (macd_slow + 1))
+        self._macd_signal = _SmoothingState(macd_signal, 2.0 / (macd_signal + 1))
+        self._rsi_gain = _SmoothingState(rsi_period, 1.0 / rsi_period)
+        self._rsi_loss = _SmoothingState(rsi_period, 1.0 / rsi_period)
+        self._atr = _SmoothingState(atr_period, 1.0 / atr_period)
+        self._previous_close: Optional[np.ndarray] = None
+        self._cum_pv: Any = 0.0
+        self._cum_volume: Any = 0.0
+        self.bar_count = 0
+
+    def update(self, high: Any, low: Any, close: Any, volume: Any) -> Dict[str, np.ndarray]:
+        """Process newly arrived bars
+
+        Args:
+            high: High prices of the new bars
+            low: Low prices of the new bars
+            close: Close prices of the new bars
+            volume: Volumes of the new bars
+
+        Returns:
+            Dict[str, np.ndarray]: Indicator values for the new bars only, same keys as compute_indicators
+        """
+        h, l, c, v = _as_float(high), _as_float(low), _as_float(close), _as_float(volume)
+        count = c.shape[-1]
+        if count == 0:
+            return {name: np.full(c.shape, np.nan) for name in _INDICATOR_NAMES}
+
+        sma_values, _ = self._sma.update(c)
+        middle, std = self._bollinger.update(c)
+
+        fast = self._macd_fast.update(c)
+        slow = self._macd_slow.update(c)
+        line = fast - slow
+        signal_line = np.full(c.shape, np.nan)
+        # MACD 线前缀为 NaN，信号线只消费有效部分
+        valid = np.flatnonzero(~np.isnan(line).reshape(-1, count).any(axis=0))
+        if len(valid):
+            signal_line[..., valid[0] :] = self._macd_signal.update(line[..., valid[0] :])
+
+        rsi_values = np.full(c.shape, np.nan)
+        if self._previous_close is None:
+            delta = np.diff(c, axis=-1)
+            offset = 1
+        else:
+            delta = np.diff(np.concatenate([self._previous_close[..., np.newaxis], c], axis=-1), axis=-1)
+            offset = 0
+        avg_gain = self._rsi_gain.update(np.clip(delta, 0, None))
+        avg_loss = self._rsi_loss.update(np.clip(-delta, 0, None))
+        rsi_values[..., offset:] = _rsi_from_averages(avg_gain, avg_loss)
+
+        atr_values = self._atr.update(_true_range(h, l, c, self._previous_close))
+        self._previous_close = c[..., -1]
+
+        typical = (h + l + c) / 3.0
+        cum_pv = np.asarray(self._cum_pv)[..., np.newaxis] + np.cumsum(typical * v, axis=-1)
+        cum_volume = np.asarray(self._cum_volume)[..., np.newaxis] + np.cumsum(v, axis=-1)
+        self._cum_pv = cum_pv[..., -1]
+        self._cum_volume = cum_volume[..., -1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            vwap_values = np.where(cum_volume > 0, cum_pv / cum_volume, np.nan)
+
+        self.bar_count += count
+        return {
+            "sma": sma_values,
+            "ema": self._ema.update(c),
+            "rsi": rsi_values,
+            "macd": line,
+            "macd_signal": signal_line,
+            "macd_histogram": line - signal_line,
+            "bollinger_middle": middle,
+            "bollinger_upper": middle + self.bollinger_std * std,
+            "bollinger_lower": middle - self.bollinger_std * std,
+            "atr": atr_values,
+            "vwap": vwap_values,
+        }
+
+
+_INDICATOR_NAMES = (
+    "sma",
+    "ema",
+    "rsi",
+    "macd",
+    "macd_signal",
+    "macd_histogram",
+    "bollinger_middle",
+    "bollinger_upper",
+    "bollinger_lower",
+    "atr",
+    "vwap",
+)
+
+
+if __name__ == "__main__":
+    # 自检：单根缺失K线不应污染其后的指标
+    rng = np.random.default_rng(0)
+    close = 100 + np.cumsum(rng.normal(0, 1, 200))
+    bars = {
+        "timestamp": np.arange(200, dtype=np.int64),
+        "open": close.copy(),
+        "high": close + 1,
+        "low": close - 1,
+        "close": close.copy(),
+        "volume": np.full(200, 1000.0),
+    }
+    for name in ("open", "high", "low", "close"):
+        bars[name][50] = np.nan
+    cleaned = drop_missing_bars(bars)
+    indicators = compute_indicators(cleaned)
+    assert len(cleaned["timestamp"]) == 199 and 50 not in cleaned["timestamp"]
+    for name, values in indicators.items():
+        assert not np.isnan(values[60:]).any(), f"{name} has NaN after the missing bar"
+    print("ok: a missing bar does not poison later indicator values")
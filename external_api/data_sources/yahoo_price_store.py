@@ -0,0 +1,350 @@
+"""
+Local OHLCV bar store for Yahoo Finance price history
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+logger = logging.getLogger("yahoo_price_store")
+
+# 单根K线的存储结构
+BAR_DTYPE = np.dtype(
+    [
+        ("timestamp", "<i8"),
+        ("open", "<f8"),
+        ("high", "<f8"),
+        ("low", "<f8"),
+        ("close", "<f8"),
+        ("volume", "<i8"),
+    ]
+)
+
+# 每根K线覆盖的秒数，K线开盘后超过该时长即视为不可再变
+INTERVAL_SECONDS = {
+    "1m": 60,
+    "2m": 120,
+    "5m": 300,
+    "15m": 900,
+    "30m": 1800,
+    "60m": 3600,
+    "1d": 86400,
+    "1wk": 7 * 86400,
+    "1mo": 31 * 86400,
+}
+
+COVERAGE_FILE = "coverage.json"
+SEGMENT_PATTERN = re.compile(r"^seg-(\d{6})\.npy$")
+
+
+def merge_bars(*arrays: np.ndarray) -> np.ndarray:
+    """Merge bar arrays, de-duplicate by timestamp and sort chronologically
+
+    When the same timestamp appears more than once, the bar from the later array wins.
+
+    Args:
+        arrays: Bar arrays with BAR_DTYPE
+
+    Returns:
+        np.ndarray: Merged bars sorted by timestamp
+    """
+    non_empty = [a for a in arrays if len(a)]
+    if not non_empty:
+        return np.empty(0, dtype=BAR_DTYPE)
+    merged = np.concatenate(non_empty).astype(BAR_DTYPE, copy=False)
+    # 反转后取首次出现的位置，即保留原顺序中最后一次出现的K线
+    reversed_bars = merged[::-1]
+    _, index = np.unique(reversed_bars["timestamp"], return_index=True)
+    return reversed_bars[index]
+
+
+class PriceBarStore:
+    """Persistent per-(symbol, interval) OHLCV bar store
+
+    Each (symbol, interval) series lives in its own directory as append-only NumPy segment files plus a
+    coverage index of the [start, end) timestamp ranges already fetched from upstream. Segments are read
+    memory-mapped and merged on read; compact() folds them into a single segment.
+    Only settled bars (whose interval has fully elapsed) are persisted, so stored data never goes stale.
+    """
+
+    def __init__(self, root_dir: str):
+        """Initialize the bar store
+
+        Args:
+            root_dir: Directory in which all series are stored, created on first write
+        """
+        self.root_dir = root_dir
+        self._lock = threading.Lock()
+        self._requests = {"hits": 0, "partial_hits": 0, "misses": 0}
+        self._bars_written = 0
+
+    def _series_dir(self, symbol: str, interval: str) -> str:
+        """Get the directory of a (symbol, interval) series"""
+        return os.path.join(self.root_dir, quote(symbol.upper(), safe=""), interval)
+
+    def _load_coverage(self, series_dir: str) -> List[List[int]]:
+        """Load the sorted, non-overlapping coverage ranges of a series"""
+        path = os.path.join(series_dir, COVERAGE_FILE)
+        if not os.path.exists(path):
+            return []
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable coverage index {path}: {e}")
+            return []
+
+    def _save_coverage(self, series_dir: str, coverage: List[List[int]]) -> None:
+        """Atomically persist the coverage ranges of a series"""
+        path = os.path.join(series_dir, COVERAGE_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(coverage, f)
+        os.replace(tmp_path, path)
+
+    def _segment_files(self, series_dir: str) -> List[Tuple[int, str]]:
+        """List (sequence number, path) of the segments of a series, oldest first"""
+        if not os.path.isdir(series_dir):
+            return []
+        segments = []
+        for name in os.listdir(series_dir):
+            match = SEGMENT_PATTERN.match(name)
+            if match:
+                segments.append((int(match.group(1)), os.path.join(series_dir, name)))
+        return sorted(segments)
+
+    def _write_segment(self, path: str, bars: np.ndarray) -> None:
+        """Atomically write a segment file"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, bars)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _merge_ranges(ranges: List[List[int]]) -> List[List[int]]:
+        """Coalesce overlapping or adjacent ranges"""
+        merged: List[List[int]] = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        return merged
+
+    def missing_ranges(self, symbol: str, interval: str, start: int, end: int) -> List[Tuple[int, int]]:
+        """Compute the parts of [start, end) that are not covered by stored bars
+
+        Args:
+            symbol: Stock code
+            interval: Bar interval, e.g. 1d
+            start: Range start, unix timestamp (inclusive)
+            end: Range end, unix timestamp (exclusive)
+
+        Returns:
+            List[Tuple[int, int]]: Missing [start, end) ranges in chronological order
+        """
+        with self._lock:
+            coverage = self._load_coverage(self._series_dir(symbol, interval))
+
+            gaps = []
+            cursor = start
+            for covered_start, covered_end in coverage:
+                if covered_end <= cursor:
+                    continue
+                if covered_start >= end:
+                    break
+                if covered_start > cursor:
+                    gaps.append((cursor, covered_start))
+                cursor = covered_end
+                if cursor >= end:
+                    break
+            if cursor < end:
+                gaps.append((cursor, end))
+
+            if not gaps:
+                self._requests["hits"] += 1
+            elif gaps == [(start, end)]:
+                self._requests["misses"] += 1
+            else:
+                self._requests["partial_hits"] += 1
+            return gaps
+
+    def write(self, symbol: str, interval: str, bars: np.ndarray, start: int, end: int) -> int:
+        """Store bars fetched for [start, end) and mark the settled part of the range as covered
+
+        Args:
+            symbol: Stock code
+            interval: Bar interval, e.g. 1d
+            bars: Bars fetched from upstream for the range, with BAR_DTYPE
+            start: Fetched range start, unix timestamp (inclusive)
+            end: Fetched range end, unix timestamp (exclusive)
+
+        Returns:
+            int: Number of bars persisted
+        """
+        # 尚未收盘的K线仍可能变化，不落盘也不计入覆盖范围
+        settled_end = min(end, int(time.time()) - INTERVAL_SECONDS.get(interval, 86400))
+        if settled_end <= start:
+            return 0
+
+        bars = bars[(bars["timestamp"] >= start) & (bars["timestamp"] < settled_end)]
+        series_dir = self._series_dir(symbol, interval)
+
+        with self._lock:
+            os.makedirs(series_dir, exist_ok=True)
+            if len(bars):
+                segments = self._segment_files(series_dir)
+                next_seq = segments[-1][0] + 1 if segments else 1
+                self._write_segment(os.path.join(series_dir, f"seg-{next_seq:06d}.npy"), bars)
+                self._bars_written += len(bars)
+
+            coverage = self._load_coverage(series_dir)
+            coverage.append([start, settled_end])
+            self._save_coverage(series_dir, self._merge_ranges(coverage))
+
+        return len(bars)
+
+    def read(self, symbol: str, interval: str, start: int, end: int) -> np.ndarray:
+        """Read stored bars within [start, end)
+
+        Args:
+            symbol: Stock code
+            interval: Bar interval, e.g. 1d
+            start: Range start, unix timestamp (inclusive)
+            end: Range end, unix timestamp (exclusive)
+
+        Returns:
+            np.ndarray: De-duplicated bars sorted by timestamp, with BAR_DTYPE
+        """
+        with self._lock:
+            chunks = []
+            for _, path in self._segment_files(self._series_dir(symbol, interval)):
+                segment = np.load(path, mmap_mode="r")
+                mask = (segment["timestamp"] >= start) & (segment["timestamp"] < end)
+                chunks.append(np.array(segment[mask]))
+                del segment
+            return merge_bars(*chunks)
+
+    def compact(self, symbol: Optional[str] = None, interval: Optional[str] = None) -> Dict[str, Any]:
+        """Fold the segments of each series into a single de-duplicated segment
+
+        Args:
+            symbol: Only compact this stock code, default is all symbols
+            interval: Only compact this interval, default is all intervals
+
+        Returns:
+            Dict[str, Any]: Compaction summary, e.g.
+            {
+                "series": 2,             # Number of series compacted
+                "segments_removed": 14,  # Number of segment files removed
+                "bytes_before": 40960,   # Size of segment files before compaction
+                "bytes_after": 12288     # Size of segment files after compaction
+            }
+        """
+        summary = {"series": 0, "segments_removed": 0, "bytes_before": 0, "bytes_after": 0}
+        with self._lock:
+            for series_dir in self._iter_series_dirs(symbol, interval):
+                segments = self._segment_files(series_dir)
+                if len(segments) <= 1:
+                    continue
+
+                summary["bytes_before"] += sum(os.path.getsize(path) for _, path in segments)
+                merged = merge_bars(*[np.load(path) for _, path in segments])
+                base_path = os.path.join(series_dir, "seg-000000.npy")
+                self._write_segment(base_path, merged)
+                for _, path in segments:
+                    if path != base_path:
+                        os.remove(path)
+                        summary["segments_removed"] += 1
+
+                coverage = self._load_coverage(series_dir)
+                self._save_coverage(series_dir, self._merge_ranges(coverage))
+
+                summary["bytes_after"] += os.path.getsize(base_path)
+                summary["series"] += 1
+
+        logger.info(f"Compacted price store: {summary}")
+        return summary
+
+    def _iter_series_dirs(self, symbol: Optional[str] = None, interval: Optional[str] = None) -> List[str]:
+        """List the series directories matching the optional symbol/interval filter"""
+        if not os.path.isdir(self.root_dir):
+            return []
+        symbol_dirs = [quote(symbol.upper(), safe="")] if symbol else sorted(os.listdir(self.root_dir))
+        series_dirs = []
+        for symbol_dir in symbol_dirs:
+            symbol_path = os.path.join(self.root_dir, symbol_dir)
+            if not os.path.isdir(symbol_path):
+                continue
+            intervals = [interval] if interval else sorted(os.listdir(symbol_path))
+            for name in intervals:
+                if os.path.isdir(os.path.join(symbol_path, name)):
+                    series_dirs.append(os.path.join(symbol_path, name))
+        return series_dirs
+
+    def stats(self) -> Dict[str, Any]:
+        """Get store-level statistics
+
+        Returns:
+            Dict[str, Any]: Store statistics, e.g.
+            {
+                "root_dir": "/home/user/.cache/external_api/yahoo_prices",
+                "series_count": 1,          # Number of (symbol, interval) series
+                "segments": 3,              # Number of segment files
+                "bars": 1250,               # Number of stored bars (before de-duplication)
+                "bytes": 61440,             # Size on disk
+                "requests": {               # Lookups since the store was created
+                    "hits": 10,             # Fully served from disk
+                    "partial_hits": 2,      # Some ranges fetched from upstream
+                    "misses": 1             # Whole range fetched from upstream
+                },
+                "bars_written": 1250,       # Bars persisted since the store was created
+                "series": [
+                    {
+                        "symbol": "AAPL",
+                        "interval": "1d",
+                        "segments": 3,
+                        "bars": 1250,
+                        "bytes": 61440,
+                        "coverage": [[1704067200, 1735689600]]  # Covered [start, end) ranges
+                    }
+                ]
+            }
+        """
+        with self._lock:
+            series = []
+            for series_dir in self._iter_series_dirs():
+                segments = self._segment_files(series_dir)
+                bars = 0
+                for _, path in segments:
+                    bars += np.load(path, mmap_mode="r").shape[0]
+                size = sum(os.path.getsize(path) for _, path in segments)
+                interval_dir, interval = os.path.split(series_dir)
+                series.append(
+                    {
+                        "symbol": unquote(os.path.basename(interval_dir)),
+                        "interval": interval,
+                        "segments": len(segments),
+                        "bars": bars,
+                        "bytes": size,
+                        "coverage": self._load_coverage(series_dir),
+                    }
+                )
+
+            return {
+                "root_dir": self.root_dir,
+                "series_count": len(series),
+                "segments": sum(s["segments"] for s in series),
+                "bars": sum(s["bars"] for s in series),
+                "bytes": sum(s["bytes"] for s in series),
+                "requests": dict(self._requests),
+                "bars_written": self._bars_written,
+                "series": series,
+            }
@@ -4,15 +4,42 @@ Yahoo Finance data source implementation
 
 import asyncio
 import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 import aiohttp
+import numpy as np
 
 from .base import BaseAPI
+from .local_cache import SeenIdStore
+from .yahoo_indicators import bars_to_columns, compute_indicators, drop_missing_bars
+from .yahoo_price_store import BAR_DTYPE, PriceBarStore, merge_bars
+from .yahoo_watchlist import QuoteWatchlist, SimulatedClock
 
 logger = logging.getLogger("yahoo_finance_source")
 
+# 分钟级K线单次请求允许的最大时间跨度，超出后按窗口拆分并发拉取
+INTRADAY_WINDOW_SECONDS = {
+    "1m": 7 * 86400,
+    "2m": 30 * 86400,
+    "5m": 30 * 86400,
+    "15m": 60 * 86400,
+    "30m": 60 * 86400,
+    "60m": 180 * 86400,
+}
+# 窗口并发拉取的最大并发数
+MAX_CONCURRENT_WINDOWS = 4
+
+# 关注列表批量拉取行情的最大并发数
+MAX_CONCURRENT_QUOTES = 10
+
+# 组合请求期间共享的会话，由 get_company_snapshot 设置，子任务通过上下文继承
+_shared_session: ContextVar[Optional[aiohttp.ClientSession]] = ContextVar("yahoo_shared_session", default=None)
+
 
 class YahooFinanceSource(BaseAPI):
     """Yahoo Finance API data source implementation"""
@@ -32,6 +59,23 @@ class YahooFinanceSource(BaseAPI):
             "X-Biz-Id": "matrix-agent",
             "X-Request-Timeout": str(config["timeout"] - 5),
         }
+        # 本地K线存储，配置了 cache_dir 时启用
+        self.price_store: Optional[PriceBarStore] = None
+        if config.get("cache_dir"):
+            self.price_store = PriceBarStore(os.path.join(config["cache_dir"], "yahoo_prices"))
+        # 增量新闻轮询已返回过的新闻 uuid，按股票代码记录
+        news_seen_path = os.path.join(config["cache_dir"], "yahoo_news_seen.json") if config.get("cache_dir") else None
+        self.news_seen = SeenIdStore(max_ids_per_key=500, path=news_seen_path)
+
+    @asynccontextmanager
+    async def _session(self) -> AsyncIterator[aiohttp.ClientSession]:
+        """Yield the shared session of the current composite call, or a fresh one"""
+        session = _shared_session.get()
+        if session is not None and not session.closed:
+            yield session
+            return
+        async with aiohttp.ClientSession(trust_env=True) as session:
+            yield session
 
     @property
     def source_name(self) -> str:
@@ -62,7 +106,8 @@ class YahooFinanceSource(BaseAPI):
         events: str = "",
     ) -> Dict[str, Any]:
         """Get stock price data. Please set start_date, end_date, interval reasonably to avoid getting too much data,
-        which could cause request timeout or performance issues.
+        which could cause request timeout or performance issues. Long intraday ranges are split into windows that
+        are fetched concurrently, windows that fail are listed in failed_windows.
 
         Args:
             symbol: Stock code
@@ -94,66 +139,263 @@ class YahooFinanceSource(BaseAPI):
                             "close": 185.75,
                             "volume": 28975632
                         }
+                    ],
+                    "failed_windows": [            # Only present when the range was fetched in several windows
+                        {
+                            "start": "2024-01-01 00:00:00",  # Window start
+                            "end": "2024-01-08 00:00:00",    # Window end
+                            "error": "Request timeout (timeout=60s)"  # Error message
+                        }
                     ]
                 }
             }
         """
         try:
-            # Convert date string to timestamp
-            start_timestamp = int(datetime.strptime(start_date, "%Y-%m-%d").timestamp())
-            end_timestamp = int(datetime.strptime(end_date, "%Y-%m-%d").timestamp())
+            result = await self._load_bars(symbol, start_date, end_date, interval, events)
+            if not result["success"]:
+                return result
 
-            if start_timestamp > end_timestamp:
-                raise ValueError("start_date cannot be greater than end_date")
+            data = {"symbol": symbol, "prices": self._bars_to_prices(result["data"])}
+            if result["window_count"] > 1:
+                data["failed_windows"] = result["failed_windows"]
+            return {"success": True, "data": data}
 
-            # Build request parameters
-            params = {
-                "symbol": symbol,
-                "period1": start_timestamp,
-                "period2": end_timestamp,
-                "interval": interval,
-                "region": "US",  # Default use US area
-                "includePrePost": "false",
-                "useYfid": "true",
-                "includeAdjustedClose": "true",
+        except asyncio.TimeoutError:
+            error_msg = f"Request timeout (timeout={self._timeout}s)"
+            logger.error(error_msg)
+            return {"success": False, "error": error_msg}
+        except aiohttp.ClientError as e:
+            error_msg = f"HTTP request error: {str(e)}"
+            logger.error(error_msg)
+            return {"success": False, "error": error_msg}
+        except Exception as e:
+            logger.error(f"Error occurred while getting stock price data: {str(e)}")
+            logger.exception(e)
+            return {"success": False, "error": f"Unknown error: {str(e)}"}
+
+    async def _load_bars(self, symbol: str, start_date: str, end_date: str, interval: str, events: str = "") -> Dict[str, Any]:
+        """Load bars between two YYYY-MM-DD dates, from the local store when possible"""
+        # Convert date string to timestamp
+        start_timestamp = int(datetime.strptime(start_date, "%Y-%m-%d").timestamp())
+        end_timestamp = int(datetime.strptime(end_date, "%Y-%m-%d").timestamp())
+
+        if start_timestamp > end_timestamp:
+            raise ValueError("start_date cannot be greater than end_date")
+
+        # 事件数据不落盘，仅纯K线请求走本地存储
+        if self.price_store is not None and not events:
+            return await self._get_bars_with_store(symbol, start_timestamp, end_timestamp, interval)
+        return await self._get_bars_windowed(symbol, [(start_timestamp, end_timestamp)], interval, events)
+
+    async def _get_bars(self, symbol: str, period1: int, period2: int, interval: str, events: str = "") -> Dict[str, Any]:
+        """Fetch bars for [period1, period2) from upstream
+
+        Returns:
+            Dict[str, Any]: {"success": True, "data": bars} with bars as a BAR_DTYPE array, or {"success": False, "error": ...}
+        """
+        # Build request parameters
+        params = {
+            "symbol": symbol,
+            "period1": period1,
+            "period2": period2,
+            "interval": interval,
+            "region": "US",  # Default use US area
+            "includePrePost": "false",
+            "useYfid": "true",
+            "includeAdjustedClose": "true",
+        }
+
+        # If events parameter is provided, add to request
+        if events:
+            params["events"] = events
+
+        request_url = f"{self.proxy_url}/stock/v3/get-chart"
+
+        # Send request using aiohttp
+        async with self._session() as session:
+            async with session.get(request_url, headers=self.headers, params=params, timeout=self._timeout) as response:
+                response.raise_for_status()
+                # Parse the response
+                data = await response.json()
+
+        # Check if there is an error in API response
+        if data.get("chart", {}).get("error"):
+            return {"success": False, "error": str(data["chart"]["error"])}
+
+        return {"success": True, "data": self._parse_chart_bars(data["chart"]["result"][0])}
+
+    def _split_windows(self, period1: int, period2: int, interval: str) -> List[Tuple[int, int]]:
+        """Split [period1, period2) into ranges the upstream accepts in a single request"""
+        window = INTRADAY_WINDOW_SECONDS.get(interval)
+        if not window or period2 - period1 <= window:
+            return [(period1, period2)]
+        return [(start, min(start + window, period2)) for start in range(period1, period2, window)]
+
+    async def _get_bars_windowed(self, symbol: str, ranges: List[Tuple[int, int]], interval: str, events: str = "") -> Dict[str, Any]:
+        """Fetch bars for several ranges, splitting each into windows that are fetched concurrently
+
+        Returns:
+            Dict[str, Any]: Stitched result, e.g.
+            {
+                "success": True,
+                "data": bars,                    # De-duplicated BAR_DTYPE array
+                "windows": [(start, end, bars)], # Successfully fetched windows
+                "failed_windows": [...],         # Windows that failed, with error message
+                "window_count": 3                # Number of upstream requests issued
             }
+        """
+        windows = [window for start, end in ranges for window in self._split_windows(start, end, interval)]
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_WINDOWS)
 
-            # If events parameter is provided, add to request
-            if events:
-                params["events"] = events
+        async def _fetch_window(start: int, end: int) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    return await self._get_bars(symbol, start, end, interval, events)
+                except asyncio.TimeoutError:
+                    error_msg = f"Request timeout (timeout={self._timeout}s)"
+                except aiohttp.ClientError as e:
+                    error_msg = f"HTTP request error: {str(e)}"
+                except Exception as e:
+                    logger.exception(e)
+                    error_msg = f"Unknown error: {str(e)}"
+                logger.error(f"Failed to get {symbol} bars for window {start}-{end}: {error_msg}")
+                return {"success": False, "error": error_msg}
 
-            request_url = f"{self.proxy_url}/stock/v3/get-chart"
+        results = await asyncio.gather(*[_fetch_window(start, end) for start, end in windows])
+
+        fetched = []
+        failed_windows = []
+        for (start, end), result in zip(windows, results):
+            if result["success"]:
+                fetched.append((start, end, result["data"]))
+            else:
+                failed_windows.append(
+                    {
+                        "start": datetime.fromtimestamp(start).strftime("%Y-%m-%d %H:%M:%S"),
+                        "end": datetime.fromtimestamp(end).strftime("%Y-%m-%d %H:%M:%S"),
+                        "error": result["error"],
+                    }
+                )
 
-            # Send request using aiohttp
-            async with aiohttp.ClientSession(trust_env=True) as session:
-                async with session.get(request_url, headers=self.headers, params=params, timeout=self._timeout) as response:
-                    response.raise_for_status()
-                    # Parse the response
-                    data = await response.json()
+        if windows and not fetched:
+            if len(failed_windows) == 1:
+                return {"success": False, "error": failed_windows[0]["error"]}
+            error_msg = "All windows failed:\n" + "\n".join([f"{w['start']} - {w['end']}: {w['error']}" for w in failed_windows])
+            return {"success": False, "error": error_msg}
 
-            # Check if there is an error in API response
-            if data.get("chart", {}).get("error"):
-                return {"success": False, "error": str(data["chart"]["error"])}
+        return {
+            "success": True,
+            "data": merge_bars(*[bars for _, _, bars in fetched]),
+            "windows": fetched,
+            "failed_windows": failed_windows,
+            "window_count": len(windows),
+        }
 
-            # Parse response data
-            chart_data = data["chart"]["result"][0]
-            timestamps = chart_data["timestamp"]
-            quote = chart_data["indicators"]["quote"][0]
-
-            # Build price data list
-            prices = []
-            for i, timestamp in enumerate(timestamps):
-                price_data = {
-                    "date": datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d"),
-                    "open": quote["open"][i],
-                    "high": quote["high"][i],
-                    "low": quote["low"][i],
-                    "close": quote["close"][i],
-                    "volume": int(quote["volume"][i]),
+    async def _get_bars_with_store(self, symbol: str, period1: int, period2: int, interval: str) -> Dict[str, Any]:
+        """Serve bars for [period1, period2) from the local store, fetching only the missing ranges"""
+        store = self.price_store
+        gaps = store.missing_ranges(symbol, interval, period1, period2)
+
+        result = await self._get_bars_windowed(symbol, gaps, interval)
+        if not result["success"]:
+            return result
+
+        # 仅成功的窗口计入覆盖范围，失败窗口下次请求时重新拉取
+        for start, end, bars in result["windows"]:
+            store.write(symbol, interval, bars, start, end)
+
+        # 未收盘的K线不会落盘，需与刚拉取的数据合并
+        bars = merge_bars(store.read(symbol, interval, period1, period2), result["data"])
+        bars = bars[(bars["timestamp"] >= period1) & (bars["timestamp"] < period2)]
+        return {**result, "data": bars}
+
+    def _parse_chart_bars(self, chart_data: Dict[str, Any]) -> np.ndarray:
+        """Convert a chart result into a BAR_DTYPE array"""
+        # 无成交的区间上游不返回 timestamp 字段
+        timestamps = chart_data.get("timestamp") or []
+        quote = (chart_data.get("indicators", {}).get("quote") or [{}])[0]
+
+        bars = np.empty(len(timestamps), dtype=BAR_DTYPE)
+        bars["timestamp"] = timestamps
+        for field in ("open", "high", "low", "close"):
+            bars[field] = np.array(quote.get(field) or [None] * len(timestamps), dtype=float)
+        bars["volume"] = [int(v) if v is not None else 0 for v in (quote.get("volume") or [None] * len(timestamps))]
+        return bars
+
+    def _bars_to_prices(self, bars: np.ndarray) -> List[Dict[str, Any]]:
+        """Convert a BAR_DTYPE array into the price list returned by get_stock_price"""
+
+        def _value(v: float) -> Optional[float]:
+            return None if np.isnan(v) else float(v)
+
+        # Build price data list
+        prices = []
+        for bar in bars:
+            price_data = {
+                "date": datetime.fromtimestamp(int(bar["timestamp"])).strftime("%Y-%m-%d"),
+                "open": _value(bar["open"]),
+                "high": _value(bar["high"]),
+                "low": _value(bar["low"]),
+                "close": _value(bar["close"]),
+                "volume": int(bar["volume"]),
+            }
+            prices.append(price_data)
+        return prices
+
+    async def get_stock_indicators(self, symbol: str, start_date: str, end_date: str, interval: str = "1d") -> Dict[str, Any]:
+        """Compute technical indicators (SMA/EMA/RSI/MACD/Bollinger/ATR/VWAP) from stock price data.
+        Indicators need warm-up bars, so leading values are null; request enough history before the period of interest.
+        Bars without high, low or close prices are left out, so dates may skip them.
+
+        Args:
+            symbol(str): Stock code
+            start_date(str): Start date in YYYY-MM-DD format
+            end_date(str): End date in YYYY-MM-DD format
+            interval(str): Time interval, options: 1m|2m|5m|15m|30m|60m|1d|1wk|1mo, default: 1d
+
+        Returns:
+            Dict[str, Any]: Dictionary containing indicator series aligned with dates, e.g.
+            {
+                "success": True,
+                "data": {
+                    "symbol": "AAPL",
+                    "dates": ["2024-01-02", "2024-01-03"],  # Bar dates, chronological order
+                    "indicators": {                         # One value per bar, null during warm-up
+                        "sma": [None, 184.2],               # 20-bar simple moving average
+                        "ema": [None, 184.9],               # 20-bar exponential moving average
+                        "rsi": [None, 56.3],                # 14-bar RSI
+                        "macd": [None, 1.21],               # MACD line (12, 26)
+                        "macd_signal": [None, 0.98],        # MACD signal line (9)
+                        "macd_histogram": [None, 0.23],     # MACD histogram
+                        "bollinger_middle": [None, 184.2],  # Bollinger middle band (20)
+                        "bollinger_upper": [None, 190.1],   # Bollinger upper band (2 std)
+                        "bollinger_lower": [None, 178.3],   # Bollinger lower band (2 std)
+                        "atr": [None, 3.12],                # 14-bar average true range
+                        "vwap": [183.5, 183.9]              # Cumulative VWAP over the range
+                    },
+                    "latest": {"sma": 184.2, ...}           # Indicator values of the last bar
                 }
-                prices.append(price_data)
+            }
+        """
+        try:
+            result = await self._load_bars(symbol, start_date, end_date, interval)
+            if not result["success"]:
+                return result
+
+            # 上游缺失价格的K线会让递推类指标此后全部为 NaN，先剔除
+            columns = drop_missing_bars(bars_to_columns(result["data"]))
+            indicators = compute_indicators(columns)
+            series = {name: [None if np.isnan(v) else round(float(v), 6) for v in values] for name, values in indicators.items()}
 
-            return {"success": True, "data": {"symbol": symbol, "prices": prices}}
+            return {
+                "success": True,
+                "data": {
+                    "symbol": symbol,
+                    "dates": [datetime.fromtimestamp(int(ts)).strftime("%Y-%m-%d") for ts in columns["timestamp"]],
+                    "indicators": series,
+                    "latest": {name: values[-1] if values else None for name, values in series.items()},
+                },
+            }
 
         except asyncio.TimeoutError:
             error_msg = f"Request timeout (timeout={self._timeout}s)"
@@ -164,16 +406,17 @@ class YahooFinanceSource(BaseAPI):
             logger.error(error_msg)
             return {"success": False, "error": error_msg}
         except Exception as e:
-            logger.error(f"Error occurred while getting stock price data: {str(e)}")
+            logger.error(f"Error occurred while computing stock indicators: {str(e)}")
             logger.exception(e)
             return {"success": False, "error": f"Unknown error: {str(e)}"}
 
-    async def get_stock_news(self, symbol: str, region: str = "US", snippet_count: int = 10) -> Dict[str, Any]:
+    async def get_stock_news(self, symbol: str, region: str = "US", snippet_count: int = 10, only_new: bool = False) -> Dict[str, Any]:
         """获取股票相关的新闻数据
         Args:
             symbol(str): Stock code
             region(str): Region code, defaults to US
             snippet_count(int): Number of news items to return, defaults to 10
+            only_new(bool): Incremental mode, only return news whose uuid was not returned by a previous incremental call, defaults to False
         Returns:
             Dict[str, Any]: Dictionary containing stock news data, e.g.
             {
@@ -195,6 +438,77 @@ class YahooFinanceSource(BaseAPI):
                 }
             }
         """
+        result = await self._fetch_news(symbol, region, snippet_count, only_new)
+        if only_new:
+            self.news_seen.save()
+        return result
+
+    async def poll_stock_news(self, symbols: List[str], region: str = "US", snippet_count: int = 10, max_concurrency: int = 10) -> Dict[str, Any]:
+        """Incrementally poll news for many stocks concurrently, only returning news not seen by previous polls
+
+        Args:
+            symbols(List[str]): Stock code list
+            region(str): Region code, defaults to US
+            snippet_count(int): Number of news items to request per stock, defaults to 10
+            max_concurrency(int): Maximum number of concurrent requests, defaults to 10
+
+        Returns:
+            Dict[str, Any]: Dictionary containing the new news of each stock, e.g.
+            {
+                "success": True,
+                "data": {
+                    "news": {                  # New news items per stock, same fields as get_stock_news
+                        "AAPL": [{"title": "...", "uuid": "...", ...}],
+                        "MSFT": []
+                    },
+                    "new_count": 1,            # Total number of new news items
+                    "failed_symbols": [        # Failed stock information
+                        {"symbol": "XXXX", "error": "..."}
+                    ]
+                }
+            }
+        """
+        try:
+            semaphore = asyncio.Semaphore(max_concurrency)
+
+            async def _poll(symbol: str) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self._fetch_news(symbol, region, snippet_count, only_new=True)
+
+            async with aiohttp.ClientSession(trust_env=True) as session:
+                token = _shared_session.set(session)
+                try:
+                    tasks = [asyncio.create_task(_poll(symbol)) for symbol in symbols]
+                finally:
+                    _shared_session.reset(token)
+                results = await asyncio.gather(*tasks)
+            self.news_seen.save()
+
+            news = {}
+            failed_symbols = []
+            for symbol, result in zip(symbols, results):
+                if result["success"]:
+                    news[symbol] = result["data"]["simple_news"]
+                else:
+                    failed_symbols.append({"symbol": symbol, "error": result["error"]})
+
+            if symbols and len(failed_symbols) == len(symbols):
+                error_msg = "All stock news polling failed:\n" + "\n".join([f"{f['symbol']}: {f['error']}" for f in failed_symbols])
+                return {"success": False, "error": error_msg}
+
+            return {
+                "success": True,
+                "data": {"news": news, "new_count": sum(len(items) for items in news.values()), "failed_symbols": failed_symbols},
+            }
+
+        except Exception as e:
+            error_msg = f"Error occurred while polling stock news: {str(e)}"
+            logger.error(error_msg)
+            logger.exception(e)
+            return {"success": False, "error": error_msg}
+
+    async def _fetch_news(self, symbol: str, region: str, snippet_count: int, only_new: bool = False) -> Dict[str, Any]:
+        """Fetch and parse the news stream of a stock, recording returned uuids in incremental mode"""
         try:
             # 构建请求URL - 使用正确的新闻API端点
             request_url = f"{self.proxy_url}/news/v2/list"
@@ -204,7 +518,7 @@ class YahooFinanceSource(BaseAPI):
 
             # 发送POST请求
             try:
-                async with aiohttp.ClientSession(trust_env=True) as session:
+                async with self._session() as session:
                     # 使用POST请求，并设置空数据体
                     async with session.post(
                         request_url,
@@ -216,45 +530,31 @@ class YahooFinanceSource(BaseAPI):
                         response.raise_for_status()
                         data = await response.json()
 
-                        # 提取并处理新闻数据 - 根据实际响应格式调整
-                        stream_items = []
-                        # 检查响应结构中的main.stream路径
-                        if data.get("data") and data["data"].get("main") and data["data"]["main"].get("stream"):
-                            stream_items = data["data"]["main"]["stream"]
-
-                        # 转换为简化的新闻对象列表
-                        simple_news = []
-                        for stream_item in stream_items:
-                            content = stream_item.get("content", {})
-                            if not content:
-                                continue
-
-                            # 获取链接
-                            link = ""
-                            click_through_url = content.get("clickThroughUrl", {})
-                            if click_through_url and click_through_url.get("url"):
-                                link = click_through_url["url"]
-
-                            # 获取发布者
-                            publisher = ""
-                            if content.get("provider") and content["provider"].get("displayName"):
-                                publisher = content["provider"]["displayName"]
-
-                            # 创建简化的新闻项
-                            news_item = {
-                                "title": content.get("title", ""),
-                                "publisher": publisher,
-                                "publish_date": content.get("pubDate", ""),
-                                "link": link,
-                                "uuid": content.get("id", ""),
-                                "content_type": content.get("contentType", ""),
-                                "thumbnail": self._extract_thumbnail(content.get("thumbnail", {})),
-                                "tickers": self._extract_tickers(content.get("finance", {})),
-                            }
-                            simple_news.append(news_item)
-
-                        # 返回结构化的新闻列表
-                        return {"success": True, "data": {"symbol": symbol, "simple_news": simple_news}}
+                # 提取并处理新闻数据 - 根据实际响应格式调整
+                stream_items = []
+                # 检查响应结构中的main.stream路径
+                if data.get("data") and data["data"].get("main") and data["data"]["main"].get("stream"):
+                    stream_items = data["data"]["main"]["stream"]
+
+                # 转换为简化的新闻对象列表
+                seen_key = symbol.upper()
+                simple_news = []
+                for stream_item in stream_items:
+                    content = stream_item.get("content", {})
+                    if not content:
+                        continue
+
+                    # 新闻流按时间倒序，增量模式下遇到已见过的新闻即可停止解析
+                    if only_new and self.news_seen.contains(seen_key, content.get("id", "")):
+                        break
+
+                    simple_news.append(self._parse_news_content(content))
+
+                if only_new:
+                    self.news_seen.add(seen_key, reversed([news_item["uuid"] for news_item in simple_news if news_item["uuid"]]))
+
+                # 返回结构化的新闻列表
+                return {"success": True, "data": {"symbol": symbol, "simple_news": simple_news}}
 
             except asyncio.TimeoutError:
                 error_msg = f"请求超时 (timeout={self._timeout}秒)"
@@ -276,6 +576,31 @@ class YahooFinanceSource(BaseAPI):
             logger.exception(e)
             return {"success": False, "error": error_msg}
 
+    def _parse_news_content(self, content: Dict[str, Any]) -> Dict[str, Any]:
+        """将新闻流中的 content 转换为简化的新闻对象"""
+        # 获取链接
+        link = ""
+        click_through_url = content.get("clickThroughUrl", {})
+        if click_through_url and click_through_url.get("url"):
+            link = click_through_url["url"]
+
+        # 获取发布者
+        publisher = ""
+        if content.get("provider") and content["provider"].get("displayName"):
+            publisher = content["provider"]["displayName"]
+
+        # 创建简化的新闻项
+        return {
+            "title": content.get("title", ""),
+            "publisher": publisher,
+            "publish_date": content.get("pubDate", ""),
+            "link": link,
+            "uuid": content.get("id", ""),
+            "content_type": content.get("contentType", ""),
+            "thumbnail": self._extract_thumbnail(content.get("thumbnail", {})),
+            "tickers": self._extract_tickers(content.get("finance", {})),
+        }
+
     def _extract_thumbnail(self, thumbnail_data: Dict[str, Any]) -> str:
         """从缩略图数据中提取第一个可用的URL
 
@@ -356,7 +681,7 @@ class YahooFinanceSource(BaseAPI):
 
             # Send request
             try:
-                async with aiohttp.ClientSession(trust_env=True) as session:
+                async with self._session() as session:
                     async with session.get(request_url, headers=self.headers, params=params, timeout=self._timeout) as response:
                         response.raise_for_status()
                         data = await response.json()
@@ -409,6 +734,102 @@ class YahooFinanceSource(BaseAPI):
             logger.exception(e)
             return {"success": False, "error": error_msg}
 
+    def create_watchlist(
+        self,
+        symbols: List[str],
+        min_interval: float = 5.0,
+        max_interval: float = 300.0,
+        closed_interval: float = 1800.0,
+        max_batch: int = 20,
+        simulated: bool = False,
+    ) -> QuoteWatchlist:
+        """Create a watchlist streaming real-time quote changes of many stocks.
+        Each stock is polled on its own adaptive schedule: volatile stocks more often, quiet stocks less often,
+        stocks whose market is closed rarely. Stocks that fall due together are fetched as one concurrent batch.
+
+        Args:
+            symbols(List[str]): Stock code list
+            min_interval(float): Shortest poll interval in seconds, defaults to 5
+            max_interval(float): Longest poll interval in seconds while the market is open, defaults to 300
+            closed_interval(float): Poll interval in seconds while the market is closed, defaults to 1800
+            max_batch(int): Maximum number of stocks fetched in one batch, defaults to 20
+            simulated(bool): Use a simulated clock that advances instantly instead of sleeping, for tests
+
+        Returns:
+            QuoteWatchlist: Watchlist; start() runs it in the background and subscribe() returns an async iterator
+            of updates containing only the changed quote fields, e.g.
+            {
+                "symbol": "AAPL",
+                "time": 1712.5,                 # Clock time of the poll
+                "changed": {"price": 185.2, "volume": 45678912}
+            }
+        """
+        return QuoteWatchlist(
+            self._get_quotes,
+            symbols,
+            clock=SimulatedClock(time.time()) if simulated else None,
+            min_interval=min_interval,
+            max_interval=max_interval,
+            closed_interval=closed_interval,
+            max_batch=max_batch,
+        )
+
+    async def _get_quotes(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch the real-time quotes of a batch of stocks concurrently over one session"""
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_QUOTES)
+
+        async def _fetch(symbol: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._get_quote(symbol)
+
+        async with aiohttp.ClientSession(trust_env=True) as session:
+            token = _shared_session.set(session)
+            try:
+                tasks = [asyncio.create_task(_fetch(symbol)) for symbol in symbols]
+            finally:
+                _shared_session.reset(token)
+            results = await asyncio.gather(*tasks)
+        return dict(zip(symbols, results))
+
+    async def _get_quote(self, symbol: str) -> Dict[str, Any]:
+        """Fetch the real-time quote of a stock from the price module"""
+        try:
+            params = {"symbol": symbol, "modules": "price"}
+            request_url = f"{self.proxy_url}/stock/get-fundamentals"
+
+            async with self._session() as session:
+                async with session.get(request_url, headers=self.headers, params=params, timeout=self._timeout) as response:
+                    response.raise_for_status()
+                    data = await response.json()
+
+            if data.get("quoteSummary", {}).get("error"):
+                return {"success": False, "error": str(data["quoteSummary"]["error"])}
+
+            price = data["quoteSummary"]["result"][0]["price"]
+
+            def _raw(key: str) -> Optional[float]:
+                value = price.get(key)
+                return value.get("raw") if isinstance(value, dict) else value
+
+            return {
+                "success": True,
+                "data": {
+                    "price": _raw("regularMarketPrice"),
+                    "change": _raw("regularMarketChange"),
+                    "change_percent": _raw("regularMarketChangePercent"),
+                    "day_high": _raw("regularMarketDayHigh"),
+                    "day_low": _raw("regularMarketDayLow"),
+                    "volume": _raw("regularMarketVolume"),
+                    "market_time": _raw("regularMarketTime"),
+                    "market_state": price.get("marketState"),
+                },
+            }
+
+        except asyncio.TimeoutError:
+            return {"success": False, "error": f"Request timeout (timeout={self._timeout}s)"}
+        except Exception as e:
+            return {"success": False, "error": f"Error occurred while getting stock quote: {str(e)}"}
+
     async def get_multiple_stocks_price(
         self,
         symbols: List[str],
@@ -568,7 +989,7 @@ class YahooFinanceSource(BaseAPI):
             params = {"symbol": symbol}
 
             # Send request
-            async with aiohttp.ClientSession(trust_env=True) as session:
+            async with self._session() as session:
                 try:
                     async with session.get(request_url, headers=self.headers, params=params, timeout=self._timeout) as response:
                         # Check response status
@@ -709,7 +1130,7 @@ class YahooFinanceSource(BaseAPI):
                 params["lang"] = lang
 
             # Send request
-            async with aiohttp.ClientSession(trust_env=True) as session:
+            async with self._session() as session:
                 try:
                     async with session.get(request_url, headers=self.headers, params=params, timeout=self._timeout) as response:
                         # Check response status
@@ -852,7 +1273,7 @@ class YahooFinanceSource(BaseAPI):
 
             # Send request
             try:
-                async with aiohttp.ClientSession(trust_env=True) as session:
+                async with self._session() as session:
                     async with session.get(request_url, headers=self.headers, params=params, timeout=self._timeout) as response:
                         response.raise_for_status()
                         data = await response.json()
@@ -928,3 +1349,91 @@ class YahooFinanceSource(BaseAPI):
             logger.error(error_msg)
             logger.exception(e)
             return {"success": False, "error": error_msg}
+
+    async def get_company_snapshot(
+        self,
+        symbol: str,
+        region: str = "US",
+        news_count: int = 10,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Get a full company profile in one call: basic info, insights, statistics, financial data and news.
+        Sections are fetched concurrently over one shared connection pool; a section that fails or misses the
+        latency budget is returned as null with its error, the other sections are still returned.
+
+        Args:
+            symbol(str): Stock code
+            region(str): Region code used for news and statistics, defaults to US
+            news_count(int): Number of news items to return, defaults to 10
+            timeout(Optional[float]): Latency budget of the whole call in seconds, defaults to the source timeout
+
+        Returns:
+            Dict[str, Any]: Dictionary containing the merged company profile, e.g.
+            {
+                "success": True,                # False only if every section failed
+                "data": {
+                    "symbol": "AAPL",
+                    "info": {...},              # data of get_stock_info, null if failed
+                    "insights": {...},          # data of get_stock_insights, null if failed
+                    "statistics": {...},        # data of get_stock_statistics, null if failed
+                    "financial_data": {...},    # data of get_financial_data, null if failed
+                    "news": [...],              # simple_news of get_stock_news, null if failed
+                    "errors": {                 # Error message of each failed section
+                        "news": "Latency budget exceeded (timeout=10s)"
+                    },
+                    "elapsed": 1.42             # Wall time of the whole call in seconds
+                }
+            }
+        """
+        budget = timeout or self._timeout
+        started = time.monotonic()
+        sections = {
+            "info": lambda: self.get_stock_info(symbol),
+            "insights": lambda: self.get_stock_insights(symbol),
+            "statistics": lambda: self.get_stock_statistics(symbol, region=region),
+            "financial_data": lambda: self.get_financial_data(symbol),
+            "news": lambda: self.get_stock_news(symbol, region=region, snippet_count=news_count),
+        }
+
+        try:
+            async with aiohttp.ClientSession(trust_env=True) as session:
+                token = _shared_session.set(session)
+                try:
+                    # 子任务创建时复制当前上下文，从而复用同一个会话
+                    tasks = {name: asyncio.create_task(factory()) for name, factory in sections.items()}
+                finally:
+                    _shared_session.reset(token)
+
+                _, pending = await asyncio.wait(tasks.values(), timeout=budget)
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+
+            data: Dict[str, Any] = {"symbol": symbol}
+            errors = {}
+            for name, task in tasks.items():
+                data[name] = None
+                if task.cancelled():
+                    errors[name] = f"Latency budget exceeded (timeout={budget}s)"
+                elif task.exception() is not None:
+                    errors[name] = str(task.exception())
+                elif not task.result()["success"]:
+                    errors[name] = task.result()["error"]
+                else:
+                    section = task.result()["data"]
+                    data[name] = section["simple_news"] if name == "news" else section
+
+            data["errors"] = errors
+            data["elapsed"] = round(time.monotonic() - started, 3)
+
+            if len(errors) == len(sections):
+                error_msg = "All company snapshot sections failed:\n" + "\n".join([f"{name}: {error}" for name, error in errors.items()])
+                return {"success": False, "error": error_msg}
+
+            return {"success": True, "data": data}
+
+        except Exception as e:
+            error_msg = f"Error occurred while getting company snapshot: {str(e)}"
+            logger.error(error_msg)
+            logger.exception(e)
+            return {"success": False, "error": error_msg}
@@ -0,0 +1,344 @@
+"""
+Adaptive quote watchlist for Yahoo Finance: polls symbols on per-symbol schedules and publishes changed fields
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger("yahoo_watchlist")
+
+# 批量拉取函数：输入股票代码列表，返回 {symbol: {"success": bool, "data"/"error": ...}}
+BatchFetcher = Callable[[List[str]], Awaitable[Dict[str, Dict[str, Any]]]]
+
+# Yahoo marketState 取值中视为盘前/盘后交易时段的状态
+EXTENDED_MARKET_STATES = {"PRE", "PREPRE", "POST", "POSTPOST"}
+CLOSED_MARKET_STATES = {"CLOSED"}
+
+
+class MonotonicClock:
+    """Wall clock used by live watchlists"""
+
+    def time(self) -> float:
+        return time.monotonic()
+
+    async def wait(self, seconds: float, wakeup: asyncio.Event) -> None:
+        """Sleep for seconds, returning early when wakeup is set"""
+        try:
+            await asyncio.wait_for(wakeup.wait(), timeout=max(seconds, 0))
+        except asyncio.TimeoutError:
+            pass
+
+
+class SimulatedClock:
+    """Virtual clock for tests: waiting advances time instantly instead of sleeping"""
+
+    def __init__(self, start: float = 0.0):
+        self._now = start
+
+    def time(self) -> float:
+        return self._now
+
+    def advance(self, seconds: float) -> None:
+        self._now += max(seconds, 0)
+
+    async def wait(self, seconds: float, wakeup: asyncio.Event) -> None:
+        """Jump forward by seconds unless a wakeup is already pending"""
+        if not wakeup.is_set():
+            self.advance(seconds)
+        # 让出事件循环，订阅者得以消费已发布的更新
+        await asyncio.sleep(0)
+
+
+class _SymbolState:
+    """Polling schedule and last published snapshot of one symbol"""
+
+    __slots__ = ("interval", "next_due", "last_poll", "last_price", "rate", "snapshot", "polls", "errors", "updates")
+
+    def __init__(self, interval: float, next_due: float):
+        self.interval = interval
+        self.next_due = next_due
+        self.last_poll: Optional[float] = None
+        self.last_price: Optional[float] = None
+        # 价格变动速度的指数移动平均，单位为每秒绝对收益率
+        self.rate: Optional[float] = None
+        self.snapshot: Optional[Dict[str, Any]] = None
+        self.polls = 0
+        self.errors = 0
+        self.updates = 0
+
+
+class WatchlistSubscription:
+    """Async iterator over the updates published by a watchlist
+
+    Each update is a dict like {"symbol": "AAPL", "time": 1712.5, "changed": {"price": 185.2, "volume": 12345}}.
+    When the subscriber falls behind by more than max_queue updates the oldest ones are dropped.
+    Iteration ends when the watchlist stops or the subscription is closed.
+    """
+
+    _CLOSED = object()
+
+    def __init__(self, watchlist: "QuoteWatchlist", max_queue: int):
+        self._watchlist = watchlist
+        self._queue: Deque[Any] = deque()
+        self._max_queue = max_queue
+        self._ready = asyncio.Event()
+        self.dropped = 0
+
+    def _put(self, item: Any) -> None:
+        if item is not self._CLOSED and len(self._queue) >= self._max_queue:
+            self._queue.popleft()
+            self.dropped += 1
+        self._queue.append(item)
+        self._ready.set()
+
+    def close(self) -> None:
+        """Stop receiving updates"""
+        self._watchlist._subscribers.discard(self)
+        self._put(self._CLOSED)
+
+    def __aiter__(self) -> "WatchlistSubscription":
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        while not self._queue:
+            self._ready.clear()
+            await self._ready.wait()
+        item = self._queue.popleft()
+        if item is self._CLOSED:
+            # 保留结束标记，重复迭代时同样立即结束
+            self._queue.appendleft(item)
+            raise StopAsyncIteration
+        return item
+
+
+class QuoteWatchlist:
+    """Adaptive quote poller for a set of symbols
+
+    Every symbol has its own poll interval: volatile symbols are polled more often (roughly whenever the price is
+    expected to move by target_move), quiet ones back off towards max_interval, and symbols whose market is closed
+    are polled every closed_interval. Symbols that fall due together are fetched as one concurrent batch, and only
+    fields that changed since the previous poll are published to subscribers.
+    """
+
+    def __init__(
+        self,
+        fetch_batch: BatchFetcher,
+        symbols: Iterable[str] = (),
+        clock: Optional[Any] = None,
+        min_interval: float = 5.0,
+        max_interval: float = 300.0,
+        closed_interval: float = 1800.0,
+        target_move: float = 0.002,
+        extended_hours_factor: float = 2.0,
+        max_batch: int = 20,
+        batch_window: float = 1.0,
+        smoothing: float = 0.3,
+    ):
+        """Initialize the watchlist
+
+        Args:
+            fetch_batch: Coroutine fetching quotes for a list of symbols
+            symbols: Initial symbols to watch
+            clock: MonotonicClock (default) or SimulatedClock
+            min_interval: Shortest poll interval in seconds
+            max_interval: Longest poll interval in seconds while the market is open
+            closed_interval: Poll interval in seconds while the market is closed
+            target_move: Relative price move that should be observed between two polls, e.g. 0.002 for 0.2%
+            extended_hours_factor: Interval multiplier during pre/post market sessions
+            max_batch: Maximum number of symbols fetched in one batch
+            batch_window: Symbols falling due within this many seconds are pulled into the current batch
+            smoothing: Weight of the newest observation in the volatility moving average
+        """
+        self._fetch_batch = fetch_batch
+        self.clock = clock or MonotonicClock()
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.closed_interval = closed_interval
+        self.target_move = target_move
+        self.extended_hours_factor = extended_hours_factor
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.smoothing = smoothing
+
+        self._states: Dict[str, _SymbolState] = {}
+        self._subscribers: Set[WatchlistSubscription] = set()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+        self._counters = {"batches": 0, "polls": 0, "errors": 0, "updates": 0, "unchanged": 0}
+
+        for symbol in symbols:
+            self.add_symbol(symbol)
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._states)
+
+    def add_symbol(self, symbol: str) -> None:
+        """Start watching symbol, it is polled on the next scheduling round"""
+        if symbol not in self._states:
+            self._states[symbol] = _SymbolState(self.min_interval, self.clock.time())
+            self._wakeup.set()
+
+    def remove_symbol(self, symbol: str) -> None:
+        """Stop watching symbol"""
+        self._states.pop(symbol, None)
+
+    def subscribe(self, max_queue: int = 1000) -> WatchlistSubscription:
+        """Create an async iterator receiving the updates published from now on"""
+        subscription = WatchlistSubscription(self, max_queue)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def start(self) -> asyncio.Task:
+        """Run the polling loop in a background task"""
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self) -> None:
+        """Stop the polling loop and end every subscription"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run(self, until: Optional[float] = None, max_batches: Optional[int] = None) -> None:
+        """Run the polling loop until stopped, until the clock reaches until, or after max_batches batches
+
+        Subscriptions are ended when the loop returns.
+        """
+        batches = 0
+        try:
+            while not self._stopping:
+                now = self.clock.time()
+                if until is not None and now >= until:
+                    break
+                if max_batches is not None and batches >= max_batches:
+                    break
+
+                due = sorted((s for s, state in self._states.items() if state.next_due <= now), key=lambda s: self._states[s].next_due)
+                if due:
+                    # 即将到期的股票并入本批次，减少请求批次
+                    due += sorted(
+                        (s for s, state in self._states.items() if now < state.next_due <= now + self.batch_window),
+                        key=lambda s: self._states[s].next_due,
+                    )
+                else:
+                    self._wakeup.clear()
+                    next_due = min((state.next_due for state in self._states.values()), default=None)
+                    wake_at = next_due if next_due is not None else (until if until is not None else now + self.max_interval)
+                    if until is not None:
+                        wake_at = min(wake_at, until)
+                    await self.clock.wait(wake_at - now, self._wakeup)
+                    continue
+
+                await self._poll(due[: self.max_batch])
+                batches += 1
+        finally:
+            for subscription in list(self._subscribers):
+                subscription.close()
+
+    async def _poll(self, symbols: List[str]) -> None:
+        """Fetch one batch of due symbols, publish their changes and reschedule them"""
+        self._counters["batches"] += 1
+        try:
+            results = await self._fetch_batch(symbols)
+        except Exception as e:
+            logger.error(f"Watchlist batch fetch failed: {str(e)}")
+            results = {symbol: {"success": False, "error": str(e)} for symbol in symbols}
+
+        now = self.clock.time()
+        for symbol in symbols:
+            state = self._states.get(symbol)
+            if state is None:
+                continue
+            result = results.get(symbol) or {"success": False, "error": "No result returned"}
+            state.polls += 1
+            self._counters["polls"] += 1
+
+            if not result["success"]:
+                state.errors += 1
+                self._counters["errors"] += 1
+                state.interval = min(state.interval * 2, self.max_interval)
+                state.next_due = now + state.interval
+                logger.warning(f"Watchlist poll of {symbol} failed: {result.get('error')}")
+                continue
+
+            quote = result["data"]
+            self._reschedule(state, quote, now)
+            changed = {k: v for k, v in quote.items() if state.snapshot is None or state.snapshot.get(k) != v}
+            state.snapshot = quote
+            if not changed:
+                self._counters["unchanged"] += 1
+                continue
+
+            state.updates += 1
+            self._counters["updates"] += 1
+            update = {"symbol": symbol, "time": now, "changed": changed}
+            for subscription in list(self._subscribers):
+                subscription._put(update)
+
+    def _reschedule(self, state: _SymbolState, quote: Dict[str, Any], now: float) -> None:
+        """Update the volatility estimate of a symbol and compute its next poll time"""
+        price = quote.get("price")
+        if price and state.last_price and state.last_poll is not None and now > state.last_poll:
+            observed = abs(price / state.last_price - 1) / (now - state.last_poll)
+            state.rate = observed if state.rate is None else self.smoothing * observed + (1 - self.smoothing) * state.rate
+        if price:
+            state.last_price = price
+        state.last_poll = now
+
+        market_state = quote.get("market_state")
+        if market_state in CLOSED_MARKET_STATES:
+            state.interval = self.closed_interval
+        else:
+            if state.rate:
+                interval = self.target_move / state.rate
+            elif state.rate is None:
+                interval = self.min_interval
+            else:
+                # 价格没有变动，逐步放慢轮询
+                interval = state.interval * 2
+            if market_state in EXTENDED_MARKET_STATES:
+                interval *= self.extended_hours_factor
+            state.interval = min(max(interval, self.min_interval), self.max_interval)
+        state.next_due = now + state.interval
+
+    def stats(self) -> Dict[str, Any]:
+        """Get polling statistics
+
+        Returns:
+            Dict[str, Any]: Statistics, e.g.
+            {
+                "batches": 12,       # Batched fetches issued
+                "polls": 40,         # Symbol polls (successful or not)
+                "errors": 1,         # Failed symbol polls
+                "updates": 25,       # Updates published
+                "unchanged": 14,     # Polls where nothing changed
+                "dropped": 0,        # Updates dropped by slow subscribers
+                "symbols": {
+                    "AAPL": {"interval": 12.5, "next_due": 1830.2, "volatility": 0.00016, "polls": 20, "errors": 0, "updates": 15}
+                }
+            }
+        """
+        return {
+            **self._counters,
+            "dropped": sum(subscription.dropped for subscription in self._subscribers),
+            "symbols": {
+                symbol: {
+                    "interval": state.interval,
+                    "next_due": state.next_due,
+                    "volatility": state.rate,
+                    "polls": state.polls,
+                    "errors": state.errors,
+                    "updates": state.updates,
+                }
+                for symbol, state in self._states.items()
+            },
+        }